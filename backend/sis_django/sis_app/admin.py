@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff #, Pago
+from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff, GeneracionCuotasJob #, Pago
 
 # Registrar Usuario con UserAdmin personalizado
 @admin.register(Usuario)
@@ -30,4 +30,5 @@ admin.site.register(Actividad)
 admin.site.register(Inscripcion)
 #admin.site.register(Pago)
 admin.site.register(Cuota)
-admin.site.register(CompensacionStaff)
\ No newline at end of file
+admin.site.register(CompensacionStaff)
+admin.site.register(GeneracionCuotasJob)
\ No newline at end of file
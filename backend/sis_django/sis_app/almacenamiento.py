@@ -0,0 +1,181 @@
+"""
+Almacenamiento de comprobantes por contenido.
+
+Cada archivo se guarda con el SHA-256 de su contenido como nombre
+(comprobantes/ab/ab12...ef.pdf): la misma captura de una transferencia
+subida para varias cuotas queda una sola vez en disco. ArchivoComprobante
+cuenta cuántas cuotas apuntan a cada archivo; `delete` (lo que hace
+`cuota.comprobante.delete()`) descuenta una referencia y el archivo se
+borra recién cuando se va la última. La fila queda con 0 referencias hasta
+que `borrar_archivos` borra el archivo: si entretanto se vuelve a subir el
+mismo contenido, `_save` la toma (con el mismo lock) y el archivo se queda.
+Los comprobantes anteriores a este esquema no tienen contador y se borran
+con su única referencia.
+
+Los archivos no se sirven desde MEDIA_URL sino con `servir_comprobante`
+(/api/comprobantes/...), que delega el envío de los bytes al servidor web
+con X-Accel-Redirect (nginx) o X-Sendfile (Apache, lighttpd) según
+COMPROBANTES["SENDFILE"]. Sin servidor web delante (desarrollo), los manda
+Django con FileResponse.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+from collections import Counter
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.deconstruct import deconstructible
+
+DEFAULTS = {
+    "SENDFILE": None,                 # None, "x-accel-redirect" o "x-sendfile"
+    "SENDFILE_PREFIJO": "/protegido/",  # location interna de nginx que apunta a MEDIA_ROOT
+}
+
+DIRECTORIO = "comprobantes/"
+LARGO_HASH = 64
+
+
+def configuracion():
+    return {**DEFAULTS, **getattr(settings, "COMPROBANTES", {})}
+
+
+def _sha256(content):
+    """(hash hexadecimal, tamaño) del contenido, leído de a bloques."""
+    digest = hashlib.sha256()
+    tamanio = 0
+    for bloque in content.chunks():
+        digest.update(bloque)
+        tamanio += len(bloque)
+    return digest.hexdigest(), tamanio
+
+
+def hash_de(nombre):
+    """SHA-256 de un nombre guardado por contenido, o None (comprobantes anteriores)."""
+    base = os.path.splitext(posixpath.basename(nombre))[0]
+    return base if len(base) == LARGO_HASH and posixpath.dirname(nombre).endswith(base[:2]) else None
+
+
+@deconstructible
+class ComprobanteStorage(FileSystemStorage):
+    """FileSystemStorage (en MEDIA_ROOT) que nombra cada archivo por su SHA-256 y cuenta sus referencias."""
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final lo decide el contenido (ver _save): no hace falta buscar uno libre
+        return name
+
+    def _save(self, name, content):
+        from .models import ArchivoComprobante
+        digest, tamanio = _sha256(content)
+        extension = os.path.splitext(name)[1].lower()
+        nombre = posixpath.join(posixpath.dirname(name), digest[:2], f"{digest}{extension}")
+        with transaction.atomic():
+            archivo, _ = ArchivoComprobante.objects.select_for_update().get_or_create(
+                nombre=nombre, defaults={"tamanio": tamanio},
+            )
+            # Un archivo con este nombre tiene este mismo contenido
+            if not self.exists(nombre):
+                nombre = super()._save(nombre, content)
+            ArchivoComprobante.objects.filter(pk=archivo.pk).update(referencias=F("referencias") + 1)
+        return nombre
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        sin_referencias = self.liberar([name])
+        if sin_referencias:
+            transaction.on_commit(lambda: self.borrar_archivos(sin_referencias))
+
+    def liberar(self, nombres):
+        """
+        Descuenta una referencia por cada aparición de cada nombre y devuelve
+        los archivos que quedaron sin referencias, para borrarlos después del
+        commit con `borrar_archivos`. Sus filas quedan con 0 referencias.
+        """
+        from .models import ArchivoComprobante
+        cantidades = Counter(nombres)
+        sin_referencias = []
+        with transaction.atomic():
+            archivos = {
+                archivo.nombre: archivo
+                for archivo in ArchivoComprobante.objects.select_for_update().filter(nombre__in=list(cantidades))
+            }
+            for nombre, cantidad in cantidades.items():
+                archivo = archivos.get(nombre)
+                if archivo is not None and archivo.referencias > cantidad:
+                    ArchivoComprobante.objects.filter(pk=nombre).update(referencias=F("referencias") - cantidad)
+                    continue
+                sin_referencias.append(nombre)
+            ArchivoComprobante.objects.filter(nombre__in=[n for n in sin_referencias if n in archivos]).update(
+                referencias=0,
+            )
+        return sin_referencias
+
+    def borrar_archivos(self, nombres):
+        """
+        Borra del disco, junto con su fila, los archivos que siguen sin
+        referencias. Los que se volvieron a subir desde `liberar` se quedan.
+        """
+        from .models import ArchivoComprobante
+        for nombre in nombres:
+            with transaction.atomic():
+                archivo = ArchivoComprobante.objects.select_for_update().filter(nombre=nombre).first()
+                if archivo is not None and archivo.referencias > 0:
+                    continue
+                super().delete(nombre)
+                if archivo is not None:
+                    archivo.delete()
+
+    def url(self, name):
+        return reverse("comprobante-archivo", kwargs={"nombre": name.removeprefix(DIRECTORIO)})
+
+
+# =====================================================
+#        VISTA
+# =====================================================
+def servir_comprobante(request, nombre):
+    """
+    Vista de /api/comprobantes/<nombre>. Los bytes los manda el servidor web
+    (X-Accel-Redirect / X-Sendfile); Django sólo resuelve la ruta y los
+    encabezados. Los archivos guardados por contenido no cambian nunca: se
+    cachean sin vencimiento y el ETag es su hash. Son datos personales, así
+    que sólo en el navegador (private), nunca en un proxy o CDN compartido.
+    """
+    from .models import Cuota
+    storage = Cuota._meta.get_field("comprobante").storage
+    nombre = DIRECTORIO + nombre
+    try:
+        ruta = storage.path(nombre)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(ruta):
+        raise Http404
+
+    digest = hash_de(nombre)
+    etag = f'"{digest}"' if digest else None
+    response = get_conditional_response(request, etag=etag) if etag else None
+    if response is None:
+        modo = configuracion()["SENDFILE"]
+        if modo == "x-accel-redirect":
+            response = HttpResponse()
+            response["X-Accel-Redirect"] = quote(configuracion()["SENDFILE_PREFIJO"] + nombre)
+        elif modo == "x-sendfile":
+            response = HttpResponse()
+            response["X-Sendfile"] = ruta
+        else:
+            response = FileResponse(open(ruta, "rb"))
+        response["Content-Type"] = mimetypes.guess_type(ruta)[0] or "application/octet-stream"
+    if etag:
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+    else:
+        response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,167 @@
+"""
+Autenticación JWT sin consulta por request.
+
+`CookieJWTAuthentication` toma el access token de la cookie `access_token`
+(o del encabezado Authorization: Bearer) y arma un `UsuarioToken` con los
+claims firmados (id, roles y estado) en lugar de buscar el usuario y sus
+grupos en la base. La fila completa se lee recién cuando una vista accede a
+un atributo que no está en el token (o a `.usuario`), y se puede guardar en
+un LRU chico por proceso (settings.AUTENTICACION_CACHE_USUARIOS).
+
+Como todo JWT sin estado, un cambio de roles o una baja se reflejan recién
+cuando el usuario obtiene un token nuevo (al volver a loguearse).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.authentication import CSRFCheck
+from rest_framework.exceptions import PermissionDenied
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Usuario
+
+COOKIE_ACCESS = "access_token"
+
+
+# =====================================================
+#        LRU DE USUARIOS RECIENTES
+# =====================================================
+class CacheUsuarios:
+    """
+    LRU con vencimiento de usuarios completos (con sus grupos precargados),
+    por proceso. Se configura con settings.AUTENTICACION_CACHE_USUARIOS
+    ({"TAMANIO": n, "TTL": segundos}); TAMANIO 0 lo desactiva. signals.py
+    descarta la entrada cuando el usuario o sus grupos cambian.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usuarios = OrderedDict()  # pk -> (vence, usuario)
+
+    def _config(self):
+        config = getattr(settings, "AUTENTICACION_CACHE_USUARIOS", {})
+        return config.get("TAMANIO", 0), config.get("TTL", 60)
+
+    def obtener(self, pk):
+        tamanio, ttl = self._config()
+        if tamanio:
+            with self._lock:
+                entrada = self._usuarios.get(pk)
+                if entrada and entrada[0] > time.monotonic():
+                    self._usuarios.move_to_end(pk)
+                    return entrada[1]
+        usuario = Usuario.objects.prefetch_related("groups").get(pk=pk)
+        if tamanio:
+            with self._lock:
+                self._usuarios[pk] = (time.monotonic() + ttl, usuario)
+                self._usuarios.move_to_end(pk)
+                while len(self._usuarios) > tamanio:
+                    self._usuarios.popitem(last=False)
+        return usuario
+
+    def olvidar(self, pk):
+        with self._lock:
+            self._usuarios.pop(pk, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._usuarios.clear()
+
+
+usuarios_recientes = CacheUsuarios()
+
+
+# =====================================================
+#        USUARIO DEL TOKEN
+# =====================================================
+class UsuarioToken(TokenUser):
+    """
+    Usuario autenticado armado con los claims del access token. Expone lo
+    mismo que Usuario para roles (roles, es_admin, es_staff, es_socio) y
+    estado; cualquier otro atributo se busca en la fila completa.
+    """
+
+    @cached_property
+    def roles(self):
+        return frozenset(self.token.get("roles", ()))
+
+    @property
+    def es_admin(self):
+        return "admin" in self.roles
+
+    @property
+    def es_staff(self):
+        return "staff" in self.roles
+
+    @property
+    def es_socio(self):
+        return "socio" in self.roles
+
+    @cached_property
+    def is_staff(self):
+        return bool(self.roles & {"admin", "staff"})
+
+    @cached_property
+    def estado(self):
+        # Los tokens emitidos antes de agregar el claim no lo traen
+        if "estado" in self.token:
+            return self.token["estado"]
+        return self.usuario.estado
+
+    @cached_property
+    def usuario(self):
+        """Fila completa del usuario (una consulta, o ninguna si está en el LRU)."""
+        return usuarios_recientes.obtener(self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.usuario, attr)
+
+    def __str__(self):
+        return f"UsuarioToken {self.id}"
+
+
+class CookieJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT desde el encabezado Authorization o, si no viene, desde la cookie
+    httponly que setea LoginView. Con la cookie se exige el token CSRF en los
+    métodos no seguros, igual que SessionAuthentication.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        desde_cookie = raw_token is None
+        if desde_cookie:
+            raw_token = request.COOKIES.get(COOKIE_ACCESS)
+        if not raw_token:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if desde_cookie:
+            self.enforce_csrf(request)
+        return self.get_user(validated_token), validated_token
+
+    def enforce_csrf(self, request):
+        def dummy_get_response(request):
+            return None
+
+        check = CSRFCheck(dummy_get_response)
+        check.process_request(request)
+        motivo = check.process_view(request, None, (), {})
+        if motivo:
+            raise PermissionDenied(f"CSRF Failed: {motivo}")
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("El token no identifica a ningún usuario")
+        return UsuarioToken(validated_token)
@@ -0,0 +1,255 @@
+"""
+Benchmark de la API REST a través del cliente de pruebas de Django.
+
+Cada escenario es un request a un endpoint de la API (listado, detalle o
+acción de cada ViewSet). Por escenario se mide:
+
+- latencia p50/p95/máx. (ms) sobre varias iteraciones,
+- tiempo de CPU del proceso (ms, mediana): en los listados de 1.000 filas
+  es el costo de CPU por cada 1.000 filas serializadas,
+- cantidad de consultas SQL (la mayor entre las iteraciones, que es la
+  de la primera, con cachés frías),
+- pico de memoria (KB) de un request extra medido con tracemalloc.
+
+Los escenarios que escriben (POST) se ejecutan dentro de una transacción que
+se revierte, así que el benchmark no modifica los datos.
+
+Por defecto la caché de la API (cache_api.py) está apagada: se mide el
+cálculo de cada respuesta. Con `con_cache=True` las iteraciones después de la
+primera se resuelven desde la caché.
+
+`comparar` contrasta los resultados con una línea base guardada en JSON y
+devuelve las regresiones: más consultas que la base, o latencia/memoria por
+encima de la base más una tolerancia.
+"""
+import json
+import math
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .dashboard import invalidar_resumen
+from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff
+
+BASELINE_POR_DEFECTO = Path(__file__).resolve().parent / "benchmark_baseline.json"
+ITERACIONES = 20
+# Tolerancia relativa para latencia y memoria (0.5 = hasta 50% peor que la base)
+TOLERANCIA = 0.5
+# Márgenes absolutos para que los valores chicos no fallen por ruido
+MARGEN_MS = 5.0
+MARGEN_KB = 256.0
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (p entre 0 y 100)."""
+    ordenados = sorted(valores)
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[indice]
+
+
+def referencias():
+    """ids de ejemplo para armar las URLs de detalle y de las acciones."""
+    cuota = Cuota.objects.order_by("pk").first()
+    compensacion = CompensacionStaff.objects.order_by("pk").first()
+    return {
+        # Un socio con cuotas, para que su listado no salga vacío
+        "socio": cuota.usuario_socio_id if cuota else None,
+        "actividad": Actividad.objects.order_by("pk").values_list("pk", flat=True).first(),
+        "actividad_activa": Actividad.objects.filter(estado="activa").order_by("pk")
+                                             .values_list("pk", flat=True).first(),
+        "inscripcion": Inscripcion.objects.filter(estado="confirmada").order_by("pk")
+                                          .values_list("pk", flat=True).first(),
+        "cuota": cuota.pk if cuota else None,
+        "cuota_atrasada": Cuota.objects.filter(estado="atrasada").order_by("pk").values_list("pk", flat=True).first(),
+        "en_revision": list(
+            Cuota.objects.filter(estado="pendiente_revision").order_by("pk").values_list("pk", flat=True)[:100]
+        ) or None,
+        "compensacion": compensacion.pk if compensacion else None,
+        "periodo": compensacion.periodo if compensacion else None,
+        "liquidacion": {"mes": compensacion.periodo_mes, "anio": compensacion.periodo_anio} if compensacion else None,
+    }
+
+
+def escenarios(refs):
+    """
+    Lista de (nombre, método, url, datos). Se omiten los escenarios cuyas
+    referencias no existen en la base.
+    """
+    def detalle(nombre, ref):
+        return reverse(nombre, kwargs={"pk": refs[ref]})
+
+    lista = [
+        ("usuarios.list", "get", reverse("usuario-list"), None, []),
+        ("usuarios.retrieve", "get", lambda: detalle("usuario-detail", "socio"), None, ["socio"]),
+        ("usuarios.resumen_roles", "get", reverse("usuario-resumen-roles"), None, []),
+        ("usuarios.create", "post", reverse("usuario-list"), {
+            "first_name": "Carga", "last_name": "Benchmark", "email": "carga@club.test",
+            "dni": "7000000001", "grupo": "socio",
+        }, []),
+        ("actividades.list", "get", reverse("actividad-list"), None, []),
+        ("actividades.retrieve", "get", lambda: detalle("actividad-detail", "actividad"), None, ["actividad"]),
+        ("actividades.inscriptos", "get", lambda: detalle("actividad-inscriptos", "actividad"), None, ["actividad"]),
+        ("actividades.finalizar", "post", lambda: detalle("actividad-finalizar", "actividad_activa"), {},
+         ["actividad_activa"]),
+        ("inscripciones.list", "get", reverse("inscripcion-list"), None, []),
+        ("inscripciones.retrieve", "get", lambda: detalle("inscripcion-detail", "inscripcion"), None,
+         ["inscripcion"]),
+        ("inscripciones.cancelar", "post", lambda: detalle("inscripcion-cancelar", "inscripcion"), {},
+         ["inscripcion"]),
+        ("cuotas.list_pagina", "get", reverse("cuota-list") + "?page_size=100", None, []),
+        # Costo por 1.000 filas: todos los campos, y sólo las columnas de una tabla
+        ("cuotas.list_1000", "get", reverse("cuota-list") + "?page_size=1000", None, []),
+        ("cuotas.list_1000_campos", "get",
+         reverse("cuota-list") + "?page_size=1000&fields=id,usuario_socio,estado,fecha_vencimiento,valor_total,dias_atraso",
+         None, []),
+        ("cuotas.list_socio", "get", lambda: f"{reverse('cuota-list')}?usuario_socio={refs['socio']}", None,
+         ["socio"]),
+        ("cuotas.retrieve", "get", lambda: detalle("cuota-detail", "cuota"), None, ["cuota"]),
+        ("cuotas.atrasadas", "get", reverse("cuota-atrasadas") + "?page_size=100", None, []),
+        ("cuotas.antiguedad", "get", reverse("cuota-antiguedad"), None, []),
+        ("cuotas.registrar_pago", "post", lambda: detalle("cuota-registrar-pago", "cuota_atrasada"), {},
+         ["cuota_atrasada"]),
+        ("cuotas.revision", "get", reverse("cuota-revision") + "?page_size=100", None, []),
+        ("cuotas.aprobar_pagos", "post", reverse("cuota-aprobar-pagos"), {"ids": refs["en_revision"]},
+         ["en_revision"]),
+        ("compensaciones.list", "get", reverse("compensacion-list"), None, []),
+        ("compensaciones.retrieve", "get", lambda: detalle("compensacion-detail", "compensacion"), None,
+         ["compensacion"]),
+        ("compensaciones.por_periodo", "get",
+         lambda: f"{reverse('compensacion-por-periodo')}?periodo={refs['periodo']}", None, ["periodo"]),
+        # Liquidación anual: subtotales por staff de los doce meses
+        ("compensaciones.por_periodo_anio", "get",
+         lambda: f"{reverse('compensacion-por-periodo')}?desde={refs['periodo'][:4]}-01"
+                 f"&hasta={refs['periodo'][:4]}-12&agrupar=usuario_staff", None, ["periodo"]),
+        ("compensaciones.liquidar", "post", reverse("compensacion-liquidar"), refs["liquidacion"], ["liquidacion"]),
+        ("dashboard.resumen", "get", reverse("dashboard_resumen"), None, []),
+    ]
+    return [
+        (nombre, metodo, url() if callable(url) else url, datos)
+        for nombre, metodo, url, datos, requeridas in lista
+        if all(refs.get(r) is not None for r in requeridas)
+    ]
+
+
+def _request(cliente, metodo, url, datos):
+    if metodo == "get":
+        respuesta = cliente.get(url)
+        # Las respuestas en streaming se consumen para medir el trabajo completo
+        contenido = b"".join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+        return respuesta.status_code, len(contenido)
+    # Los escenarios de escritura se revierten para no alterar los datos ni las demás mediciones
+    with transaction.atomic():
+        respuesta = getattr(cliente, metodo)(url, datos, content_type="application/json")
+        transaction.set_rollback(True)
+    return respuesta.status_code, len(respuesta.content)
+
+
+def _consultas(capturadas):
+    """Consultas del request sin contar los savepoints (dependen de la transacción que lo envuelve)."""
+    return sum(1 for q in capturadas if "SAVEPOINT" not in q["sql"])
+
+
+def medir(cliente, metodo, url, datos, iteraciones):
+    latencias = []
+    cpu = []
+    consultas = 0
+    for _ in range(iteraciones):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio, inicio_cpu = time.perf_counter(), time.process_time()
+            estado, tamanio = _request(cliente, metodo, url, datos)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            cpu.append((time.process_time() - inicio_cpu) * 1000)
+        consultas = max(consultas, _consultas(capturadas))
+
+    tracemalloc.start()
+    try:
+        _request(cliente, metodo, url, datos)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "estado": estado,
+        "bytes": tamanio,
+        "consultas": consultas,
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "max_ms": round(max(latencias), 2),
+        "cpu_ms": round(percentil(cpu, 50), 2),
+        "memoria_kb": round(pico / 1024, 1),
+    }
+
+
+def ejecutar(iteraciones=ITERACIONES, filtro=None, con_cache=False):
+    """Corre todos los escenarios (o los que contengan `filtro`) y devuelve sus métricas."""
+    # localhost está en ALLOWED_HOSTS; 'testserver' sólo se admite dentro del runner de tests
+    cliente = Client(SERVER_NAME="localhost")
+    # Se arranca con el resumen del dashboard frío para medir también la consulta real
+    invalidar_resumen()
+    resultados = {}
+    # Sin la línea de log por request de la instrumentación (ensuciaría la salida)
+    instrumentacion = {**getattr(settings, "INSTRUMENTACION", {}), "LOG": False}
+    cache_api = {**getattr(settings, "CACHE_API", {}), "ACTIVO": con_cache}
+    with override_settings(INSTRUMENTACION=instrumentacion, CACHE_API=cache_api):
+        for nombre, metodo, url, datos in escenarios(referencias()):
+            if filtro and filtro not in nombre:
+                continue
+            resultados[nombre] = {"url": url, **medir(cliente, metodo, url, datos, iteraciones)}
+    return resultados
+
+
+def volumen():
+    """Cantidad de filas por modelo, para dejar constancia junto a los resultados."""
+    return {
+        "usuarios": Usuario.objects.count(),
+        "actividades": Actividad.objects.count(),
+        "inscripciones": Inscripcion.objects.count(),
+        "cuotas": Cuota.objects.count(),
+        "compensaciones": CompensacionStaff.objects.count(),
+    }
+
+
+def comparar(resultados, base, tolerancia=TOLERANCIA, solo_consultas=False):
+    """
+    Devuelve la lista de regresiones de `resultados` frente a la línea base.
+    Los escenarios que no figuran en la base se ignoran.
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        esperado = base.get("escenarios", {}).get(nombre)
+        if esperado is None:
+            continue
+        if actual["estado"] != esperado["estado"]:
+            regresiones.append(f"{nombre}: estado HTTP {actual['estado']} (base {esperado['estado']})")
+        if actual["consultas"] > esperado["consultas"]:
+            regresiones.append(f"{nombre}: {actual['consultas']} consultas (base {esperado['consultas']})")
+        if solo_consultas:
+            continue
+        limite_ms = esperado["p95_ms"] * (1 + tolerancia) + MARGEN_MS
+        if actual["p95_ms"] > limite_ms:
+            regresiones.append(f"{nombre}: p95 {actual['p95_ms']} ms (límite {limite_ms:.2f} ms)")
+        if "cpu_ms" in esperado:
+            limite_cpu = esperado["cpu_ms"] * (1 + tolerancia) + MARGEN_MS
+            if actual["cpu_ms"] > limite_cpu:
+                regresiones.append(f"{nombre}: CPU {actual['cpu_ms']} ms (límite {limite_cpu:.2f} ms)")
+        limite_kb = esperado["memoria_kb"] * (1 + tolerancia) + MARGEN_KB
+        if actual["memoria_kb"] > limite_kb:
+            regresiones.append(f"{nombre}: memoria {actual['memoria_kb']} KB (límite {limite_kb:.1f} KB)")
+    return regresiones
+
+
+def cargar_baseline(ruta=BASELINE_POR_DEFECTO):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_baseline(resultados, ruta=BASELINE_POR_DEFECTO, **meta):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "escenarios": resultados}, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,237 @@
+"""
+Benchmark de concurrencia: throughput de los listados más consultados
+atendidos por el handler WSGI (sync) y por el ASGI (async) de Django, con
+cientos de clientes concurrentes.
+
+Los dos handlers corren en este mismo proceso, sin servidor HTTP de por
+medio. Los clientes son tareas asyncio que repiten requests mientras dura la
+medición, cada uno esperando su respuesta antes de mandar la siguiente:
+
+- WSGI: un pool de `hilos_wsgi` threads atiende los requests con los
+  ViewSets sync, como un servidor WSGI con ese total de threads (gunicorn
+  --workers x --threads). Los clientes que no consiguen un thread esperan.
+- ASGI: el handler corre en el event loop, como un worker de uvicorn, y los
+  listados se atienden con las vistas async de lectura_async.py.
+
+Cada modo usa las rutas con que se despliega (ver LECTURA_ASYNC en settings),
+sin importar el valor de LECTURA_ASYNC en el proceso que mide.
+
+`latencia_db_ms` agrega una espera fija a cada consulta (un execute_wrapper
+instalado en cada conexión nueva) para simular la ida y vuelta a MySQL
+cuando se mide contra una base SQLite local, donde las consultas no esperan
+red. Por defecto la caché de la API está apagada, como en benchmark.py.
+
+Por escenario, modo y cantidad de clientes se informa requests completados,
+requests por segundo, latencia p50/p95/p99 y respuestas que no fueron 200.
+Los números sirven para comparar los dos modos en la misma máquina, no como
+capacidad de un servidor real.
+"""
+import asyncio
+import io
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.urls import include, path, reverse
+
+from . import urls as urls_api
+from .benchmark import percentil
+from .models import Cuota
+
+CLIENTES = (100, 250, 500, 1000)
+DURACION = 5.0  # segundos por medición
+HILOS_WSGI = 32
+MODOS = ("wsgi", "asgi")
+HOST = "localhost"
+
+
+def escenarios():
+    """{nombre: [(ruta, query string), ...]}: cada cliente recorre las URLs de su escenario."""
+    cuotas = reverse("cuota-list")
+    actividades = reverse("actividad-list")
+    socios = (
+        Cuota.objects.order_by("usuario_socio_id").values_list("usuario_socio_id", flat=True).distinct()[:200]
+    )
+    lista = {
+        # Un socio distinto en cada request, como en el pico de fin de mes
+        "cuotas_socio": [(cuotas, f"usuario_socio={socio}") for socio in socios],
+        "actividades": [(actividades, f"page={pagina}") for pagina in range(1, 6)],
+    }
+    return {nombre: urls for nombre, urls in lista.items() if urls}
+
+
+# =====================================================
+#        ADAPTADORES WSGI Y ASGI
+# =====================================================
+def urlconf(lectura_async):
+    """URLconf de la API con o sin las vistas async de los listados."""
+    rutas = (urls_api.rutas_lectura_async() if lectura_async else []) + urls_api.rutas
+    modulo = types.ModuleType(f"{__name__}.urls_{'asgi' if lectura_async else 'wsgi'}")
+    modulo.urlpatterns = [path("api/", include(rutas))]
+    return modulo
+
+
+def _environ(ruta, consulta):
+    return {
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": ruta,
+        "QUERY_STRING": consulta,
+        "SERVER_NAME": HOST,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "HTTP_HOST": HOST,
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+
+def pedir_wsgi(aplicacion, ruta, consulta=""):
+    """Estado HTTP de un GET al handler WSGI (el cuerpo se consume completo)."""
+    estado = []
+
+    def start_response(status, headers, exc_info=None):
+        estado.append(int(status.split()[0]))
+
+    cuerpo = aplicacion(_environ(ruta, consulta), start_response)
+    try:
+        for _ in cuerpo:
+            pass
+    finally:
+        if hasattr(cuerpo, "close"):
+            cuerpo.close()
+    return estado[0]
+
+
+async def pedir_asgi(aplicacion, ruta, consulta=""):
+    """Estado HTTP de un GET al handler ASGI."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": ruta.encode(),
+        "query_string": consulta.encode(),
+        "root_path": "",
+        "headers": [(b"host", HOST.encode()), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": (HOST, 80),
+    }
+    recibido = False
+    estado = []
+
+    async def recibir():
+        nonlocal recibido
+        if not recibido:
+            recibido = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # El cliente no se desconecta: Django cancela esta espera al terminar la respuesta
+        await asyncio.Event().wait()
+
+    async def enviar(mensaje):
+        if mensaje["type"] == "http.response.start":
+            estado.append(mensaje["status"])
+
+    await aplicacion(scope, recibir, enviar)
+    return estado[0]
+
+
+# =====================================================
+#        MEDICIÓN
+# =====================================================
+async def medir(atender, urls, clientes, duracion):
+    """
+    `clientes` tareas que llaman a `atender(ruta, consulta)` hasta que pasa
+    `duracion`. Devuelve requests, requests/s, latencias y errores.
+    """
+    fin = time.perf_counter() + duracion
+    latencias = []
+    errores = 0
+
+    async def cliente(numero):
+        nonlocal errores
+        siguiente = numero
+        while time.perf_counter() < fin:
+            ruta, consulta = urls[siguiente % len(urls)]
+            siguiente += clientes
+            inicio = time.perf_counter()
+            if await atender(ruta, consulta) != 200:
+                errores += 1
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(numero) for numero in range(clientes)))
+    transcurrido = time.perf_counter() - inicio
+    return {
+        "requests": len(latencias),
+        "rps": round(len(latencias) / transcurrido, 1),
+        "p50_ms": round(percentil(latencias, 50), 2) if latencias else None,
+        "p95_ms": round(percentil(latencias, 95), 2) if latencias else None,
+        "p99_ms": round(percentil(latencias, 99), 2) if latencias else None,
+        "errores": errores,
+    }
+
+
+def _retardo(segundos):
+    def esperar(execute, sql, params, many, context):
+        time.sleep(segundos)
+        return execute(sql, params, many, context)
+    return esperar
+
+
+async def _medir_modos(urls_por_escenario, modos, clientes, duracion, hilos_wsgi):
+    wsgi, asgi = get_wsgi_application(), get_asgi_application()
+    loop = asyncio.get_running_loop()
+    resultados = []
+    with ThreadPoolExecutor(max_workers=hilos_wsgi) as pool:
+        atender = {
+            "wsgi": lambda ruta, consulta: loop.run_in_executor(pool, pedir_wsgi, wsgi, ruta, consulta),
+            "asgi": lambda ruta, consulta: pedir_asgi(asgi, ruta, consulta),
+        }
+        rutas = {"wsgi": urlconf(lectura_async=False), "asgi": urlconf(lectura_async=True)}
+        for nombre, urls in urls_por_escenario.items():
+            for modo in modos:
+                with override_settings(ROOT_URLCONF=rutas[modo]):
+                    # Un request previo para que la primera medición no pague las importaciones
+                    await atender[modo](*urls[0])
+                    for cantidad in clientes:
+                        resultado = await medir(atender[modo], urls, cantidad, duracion)
+                        resultados.append({"escenario": nombre, "modo": modo, "clientes": cantidad, **resultado})
+    return resultados
+
+
+def ejecutar(clientes=CLIENTES, duracion=DURACION, modos=MODOS, hilos_wsgi=HILOS_WSGI,
+             latencia_db_ms=0.0, filtro=None, con_cache=False):
+    """Mide cada escenario (o los que contengan `filtro`) en cada modo y cantidad de clientes."""
+    urls_por_escenario = {nombre: urls for nombre, urls in escenarios().items() if not filtro or filtro in nombre}
+    instrumentacion = {**getattr(settings, "INSTRUMENTACION", {}), "LOG": False}
+    cache_api = {**getattr(settings, "CACHE_API", {}), "ACTIVO": con_cache}
+    retardo = _retardo(latencia_db_ms / 1000) if latencia_db_ms else None
+
+    def instalar_retardo(sender, connection, **kwargs):
+        # Cada thread (y cada request ASGI) abre su propia conexión
+        if retardo not in connection.execute_wrappers:
+            connection.execute_wrappers.append(retardo)
+
+    if retardo is not None:
+        connection_created.connect(instalar_retardo, weak=False)
+    try:
+        with override_settings(INSTRUMENTACION=instrumentacion, CACHE_API=cache_api):
+            return asyncio.run(_medir_modos(urls_por_escenario, modos, clientes, duracion, hilos_wsgi))
+    finally:
+        connection_created.disconnect(instalar_retardo)
@@ -0,0 +1,205 @@
+"""
+Caché de respuestas de la API y de agregados calculados.
+
+Las entradas se guardan en la caché `settings.CACHE_API["ALIAS"]`, y las
+generaciones que las invalidan también: para que un cambio atendido por un
+worker se vea en los demás, la caché tiene que ser compartida (Redis,
+Memcached). Con la memoria local de cada proceso sólo es correcta con un
+único proceso, y settings la deja apagada salvo que se pida. La clave de cada entrada combina el nombre de la entrada (la URL
+completa del request, con sus parámetros) con la generación de cada tabla de
+la que depende la respuesta.
+
+Las señales de signals.py cambian la generación de la tabla en cada
+post_save / post_delete / m2m_changed, y los procesos masivos (bulk_create,
+update) la cambian a mano. Las entradas viejas dejan de leerse y vencen solas
+por TTL, así que un cambio en cuotas no descarta los listados de actividades.
+Dentro de una transacción la generación cambia en el momento y otra vez al
+confirmar: si otro request guardó datos viejos entre el cambio y el commit,
+el segundo cambio los descarta.
+
+La lectura async de los listados (lectura_async.py) usa las mismas claves con
+`aclave`, `aleer` y `aguardar`.
+
+Los aciertos y fallos se cuentan por espacio ("UsuarioViewSet.list",
+"CompensacionStaffViewSet.por_periodo", ...) y se publican en /metrics
+(ver instrumentacion.py).
+"""
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.response import Response
+
+from .instrumentacion import registro
+from .versiones import al_confirmar
+
+DEFAULTS = {
+    "ACTIVO": True,
+    "ALIAS": "default",
+    "TTL": 300,  # segundos
+}
+PREFIJO = "api"
+FALTA = object()
+
+
+def configuracion():
+    return {**DEFAULTS, **getattr(settings, "CACHE_API", {})}
+
+
+def _cache():
+    return caches[configuracion()["ALIAS"]]
+
+
+def _clave_generacion(tabla):
+    return f"{PREFIJO}:gen:{tabla}"
+
+
+# =====================================================
+#        GENERACIONES E INVALIDACIÓN
+# =====================================================
+def generaciones(modelos):
+    """Generación actual de la tabla de cada modelo, en una sola lectura."""
+    cache = _cache()
+    claves = [_clave_generacion(modelo._meta.db_table) for modelo in modelos]
+    actuales = cache.get_many(claves)
+    faltantes = {clave: time.time_ns() for clave in claves if clave not in actuales}
+    if faltantes:
+        cache.set_many(faltantes, None)
+        actuales.update(faltantes)
+    return [actuales[clave] for clave in claves]
+
+
+def invalidar(*modelos):
+    """Descarta las entradas que dependen de las tablas de los modelos."""
+    tablas = [modelo._meta.db_table for modelo in modelos]
+    _nueva_generacion(tablas)
+    for tabla in tablas:
+        al_confirmar(("cache_api", tabla), partial(_nueva_generacion, [tabla]))
+
+
+def _nueva_generacion(tablas):
+    ahora = time.time_ns()
+    _cache().set_many({_clave_generacion(tabla): ahora for tabla in tablas}, None)
+
+
+# =====================================================
+#        LECTURA Y ESCRITURA
+# =====================================================
+def clave(nombre, modelos):
+    """Clave de la entrada `nombre` con las generaciones actuales de `modelos`."""
+    firma = "|".join(str(g) for g in generaciones(modelos))
+    return f"{PREFIJO}:{hashlib.sha1(f'{nombre}|{firma}'.encode()).hexdigest()}"
+
+
+def leer(espacio, clave_entrada):
+    """Valor guardado o FALTA; cuenta el acierto o el fallo en `espacio`."""
+    valor = _cache().get(clave_entrada, FALTA)
+    registro.registrar_cache(espacio, valor is not FALTA)
+    return valor
+
+
+def guardar(clave_entrada, valor, ttl=None):
+    _cache().set(clave_entrada, valor, configuracion()["TTL"] if ttl is None else ttl)
+
+
+def cacheado(espacio, nombre, modelos, calcular, ttl=None):
+    """Valor de `calcular()` cacheado mientras no cambien las tablas de `modelos`."""
+    if not configuracion()["ACTIVO"]:
+        return calcular()
+    clave_entrada = clave(nombre, modelos)
+    valor = leer(espacio, clave_entrada)
+    if valor is FALTA:
+        valor = calcular()
+        guardar(clave_entrada, valor, ttl)
+    return valor
+
+
+# =====================================================
+#        LECTURA Y ESCRITURA ASYNC
+# =====================================================
+async def _en_cache(metodo, *args):
+    cache = _cache()
+    if isinstance(cache, LocMemCache):
+        # Memoria del proceso, sin E/S: no hace falta pasar por un hilo como en aget()
+        return getattr(cache, metodo)(*args)
+    return await getattr(cache, f"a{metodo}")(*args)
+
+
+async def ageneraciones(modelos):
+    claves = [_clave_generacion(modelo._meta.db_table) for modelo in modelos]
+    actuales = await _en_cache("get_many", claves)
+    faltantes = {clave: time.time_ns() for clave in claves if clave not in actuales}
+    if faltantes:
+        await _en_cache("set_many", faltantes, None)
+        actuales.update(faltantes)
+    return [actuales[clave] for clave in claves]
+
+
+async def aclave(nombre, modelos):
+    firma = "|".join(str(g) for g in await ageneraciones(modelos))
+    return f"{PREFIJO}:{hashlib.sha1(f'{nombre}|{firma}'.encode()).hexdigest()}"
+
+
+async def aleer(espacio, clave_entrada):
+    valor = await _en_cache("get", clave_entrada, FALTA)
+    registro.registrar_cache(espacio, valor is not FALTA)
+    return valor
+
+
+async def aguardar(clave_entrada, valor, ttl=None):
+    await _en_cache("set", clave_entrada, valor, configuracion()["TTL"] if ttl is None else ttl)
+
+
+# =====================================================
+#        VIEWSETS
+# =====================================================
+class RespuestaCacheadaMixin:
+    """
+    ViewSet con list y retrieve cacheados. `modelos_version` son los modelos
+    cuyos cambios alteran la respuesta (el mismo atributo que usa
+    RespuestaCondicionalMixin). Las acciones GET pueden usar
+    `respuesta_cacheada` con sus propios modelos.
+    """
+    modelos_version = ()
+
+    def clave_cache_extra(self):
+        """Parte de la clave que no sale de la URL (p. ej. la fecha, si la respuesta depende de hoy)."""
+        return ""
+
+    def cachear_listado(self, request):
+        """Si el listado de `request` se guarda en caché (ver CuotaViewSet)."""
+        return True
+
+    def espacio_cache(self):
+        return f"{type(self).__name__}.{self.action}"
+
+    def nombre_cache(self, request):
+        # La URL absoluta: las respuestas incluyen URLs armadas con el host del request
+        return f"{request.build_absolute_uri()}|{request.accepted_media_type}|{self.clave_cache_extra()}"
+
+    def respuesta_cacheada(self, request, calcular, modelos=None):
+        """
+        Devuelve la respuesta cacheada o la de `calcular()`. Sólo se guardan
+        las respuestas 200 de DRF (no las de streaming ni los errores).
+        """
+        if not configuracion()["ACTIVO"]:
+            return calcular()
+        clave_entrada = clave(self.nombre_cache(request), self.modelos_version if modelos is None else modelos)
+        datos = leer(self.espacio_cache(), clave_entrada)
+        if datos is not FALTA:
+            return Response(datos)
+        response = calcular()
+        if isinstance(response, Response) and response.status_code == 200:
+            guardar(clave_entrada, response.data)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not self.cachear_listado(request):
+            return super().list(request, *args, **kwargs)
+        return self.respuesta_cacheada(request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.respuesta_cacheada(request, partial(super().retrieve, request, *args, **kwargs))
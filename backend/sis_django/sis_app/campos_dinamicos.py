@@ -0,0 +1,204 @@
+"""
+Campos a pedido (?fields= / ?omit=) y serialización rápida de listados.
+
+En los GET, `?fields=id,estado` deja en la respuesta sólo esos campos y
+`?omit=inscripciones_detalle` quita los indicados. El recorte se aplica al
+serializer (`CamposDinamicosMixin`) y a la consulta (`ListadoRapidoMixin`):
+no se precargan relaciones que no se van a mostrar y se leen sólo las
+columnas necesarias con .only(), o con .values() cuando todos los campos
+pedidos son columnas o anotaciones.
+
+Los listados no pasan por el ciclo campo por campo de DRF (get_attribute,
+SkipField, to_representation de cada campo): `RepresentacionRapida` arma una
+sola vez, por campo, una función que lee el valor y sólo lo convierte cuando
+el tipo lo requiere (fechas, decimales, archivos). La salida es la misma que
+la del serializer.
+"""
+from operator import attrgetter, itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import fields as drf_fields
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+# Campos cuyo valor ya es JSON nativo: no hace falta convertirlo
+SIN_CONVERSION = (
+    drf_fields.CharField, drf_fields.IntegerField, drf_fields.BooleanField,
+    drf_fields.ChoiceField, drf_fields.ReadOnlyField,
+)
+
+
+def _lista(valor):
+    return {parte.strip() for parte in valor.split(",") if parte.strip()}
+
+
+def campos_pedidos(request):
+    """
+    (campos, omitidos) de ?fields= y ?omit=. `campos` es None si no se pidió
+    ninguno. Sólo aplica a lecturas: las escrituras usan todos los campos.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set()
+    campos = request.query_params.get("fields")
+    return (_lista(campos) if campos else None), _lista(request.query_params.get("omit", ""))
+
+
+class CamposDinamicosMixin:
+    """Serializer que en las lecturas deja sólo los campos pedidos."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos, omitidos = campos_pedidos(self.context.get("request"))
+        if campos is None and not omitidos:
+            return
+        for nombre in list(self.fields):
+            if (campos is not None and nombre not in campos) or nombre in omitidos:
+                self.fields.pop(nombre)
+
+
+# =====================================================
+#        REPRESENTACIÓN RÁPIDA
+# =====================================================
+class RepresentacionRapida:
+    """
+    Representación de sólo lectura compilada a partir de un serializer.
+
+    Meta del serializer puede declarar:
+    - `columnas_rapidas`: campo -> anotación del queryset que lo resuelve en
+      .values() (p. ej. {"dias_atraso": "dias_atraso_db"}).
+    - `dependencias`: campo calculado -> columnas del modelo que lee, para
+      poder acotar la consulta con .only().
+    """
+
+    def __init__(self, serializer):
+        meta = serializer.Meta
+        modelo = meta.model
+        columnas_rapidas = getattr(meta, "columnas_rapidas", {})
+        dependencias = getattr(meta, "dependencias", {})
+
+        self.lectores = []       # (nombre, función(instancia))
+        self.lectores_fila = []  # (nombre, función(dict de values()))
+        self.columnas = []       # nombres para .values(); None si algún campo no es columna
+        self.solo = {"pk"}       # columnas para .only(); None si algún campo no se puede acotar
+
+        for nombre, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            convertir = None if isinstance(campo, SIN_CONVERSION) else campo.to_representation
+            modelo_campo = _campo_modelo(modelo, campo.source)
+
+            if isinstance(campo, drf_fields.SerializerMethodField):
+                self.lectores.append((nombre, getattr(serializer, campo.method_name)))
+            elif isinstance(campo, ManyRelatedField):
+                self.lectores.append((nombre, _lector_pks(campo.source)))
+            elif isinstance(campo, PrimaryKeyRelatedField) and modelo_campo is not None:
+                self.lectores.append((nombre, attrgetter(modelo_campo.attname)))
+            elif "." in campo.source or campo.source == "*":
+                self.lectores.append((nombre, _lector_drf(campo)))
+            else:
+                self.lectores.append((nombre, _lector(attrgetter(campo.source), convertir)))
+
+            columna = columnas_rapidas.get(nombre)
+            if columna is None and modelo_campo is not None and not modelo_campo.many_to_many \
+                    and not isinstance(modelo_campo, models.FileField):
+                columna = campo.source
+            if self.columnas is not None:
+                if columna is None:
+                    self.columnas = None
+                else:
+                    self.columnas.append(columna)
+                    lector = itemgetter(columna)
+                    if not isinstance(campo, PrimaryKeyRelatedField):
+                        lector = _lector(lector, convertir)
+                    self.lectores_fila.append((nombre, lector))
+
+            if self.solo is not None:
+                if modelo_campo is not None:
+                    if not modelo_campo.many_to_many:
+                        self.solo.add(campo.source)
+                elif nombre in dependencias:
+                    self.solo.update(dependencias[nombre])
+                elif nombre not in columnas_rapidas:
+                    self.solo = None
+
+    def representar(self, instancia):
+        return {nombre: lector(instancia) for nombre, lector in self.lectores}
+
+    def representar_fila(self, fila):
+        return {nombre: lector(fila) for nombre, lector in self.lectores_fila}
+
+    def acotar(self, queryset):
+        """
+        Devuelve (queryset, representar): con .values() si todos los campos son
+        columnas; si no, instancias con .only() cuando se conocen sus columnas.
+        """
+        # Las columnas del orden también: la paginación por cursor las lee de cada fila
+        orden = [campo.lstrip("-") for campo in queryset.query.order_by if isinstance(campo, str)]
+        orden = [c for c in orden if _campo_modelo(queryset.model, c)]
+        if self.columnas is not None:
+            # Con el pk, un .distinct() del queryset no junta filas distintas que coinciden en los campos pedidos
+            extra = [c for c in orden if c not in self.columnas]
+            return queryset.prefetch_related(None).values("pk", *self.columnas, *extra), self.representar_fila
+        if self.solo is not None:
+            queryset = queryset.only(*self.solo, *orden)
+        return queryset, self.representar
+
+
+def _campo_modelo(modelo, nombre):
+    try:
+        campo = modelo._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        return None
+    return campo if campo.concrete else None
+
+
+def _lector(obtener, convertir):
+    if convertir is None:
+        return obtener
+
+    def leer(objeto):
+        valor = obtener(objeto)
+        return None if valor is None else convertir(valor)
+    return leer
+
+
+def _lector_pks(relacion):
+    def leer(objeto):
+        # .all() usa el prefetch si lo hay
+        return [relacionado.pk for relacionado in getattr(objeto, relacion).all()]
+    return leer
+
+
+def _lector_drf(campo):
+    def leer(objeto):
+        valor = campo.get_attribute(objeto)
+        return None if valor is None else campo.to_representation(valor)
+    return leer
+
+
+# =====================================================
+#        VIEWSETS
+# =====================================================
+class ListadoRapidoMixin:
+    """
+    ViewSet cuyos listados respetan ?fields=/?omit= también en la consulta y
+    se serializan con RepresentacionRapida.
+    """
+
+    def pide(self, *nombres):
+        """Si la respuesta incluye alguno de estos campos (para decidir prefetch y anotaciones)."""
+        campos, omitidos = campos_pedidos(self.request)
+        return any((campos is None or n in campos) and n not in omitidos for n in nombres)
+
+    def representacion_listado(self, queryset):
+        """(queryset acotado, función que arma cada elemento de la respuesta)."""
+        return RepresentacionRapida(self.get_serializer()).acotar(queryset)
+
+    def list(self, request, *args, **kwargs):
+        queryset, representar = self.representacion_listado(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([representar(objeto) for objeto in page])
+        return Response([representar(objeto) for objeto in queryset])
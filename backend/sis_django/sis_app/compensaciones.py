@@ -0,0 +1,186 @@
+"""
+Compensaciones del staff: liquidación automática y totales en la base.
+
+El período se guarda como año y mes (periodo_anio, periodo_mes) con un
+índice compuesto, así que los filtros por mes o por rango de meses son
+comparaciones numéricas sobre el índice. La API lo sigue mostrando y
+recibiendo como "AAAA-MM".
+
+`liquidar` calcula las compensaciones de un mes a partir de lo cobrado: los
+cargos de las inscripciones confirmadas incluidas en cuotas pagas, agrupados
+por actividad en una sola consulta. A cada profesor le corresponde
+PORCENTAJE_STAFF de lo cobrado en sus actividades. Los resultados se
+insertan en bloque y, si la compensación del mes ya existía, se actualiza su
+monto (upsert sobre staff + actividad + año + mes).
+
+El total y la cantidad de un período o rango salen de un único aggregate(), y
+los subtotales por staff, actividad o período de un values().annotate(): una
+consulta por agrupación, sin importar cuántos meses o filas abarque el rango.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import CharField, Count, Q, Sum, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from . import cache_api, versiones
+from .models import Cuota, Inscripcion, CompensacionStaff
+
+# Mismo criterio que el panel de compensaciones del staff (70% de lo cobrado)
+PORCENTAJE_STAFF = Decimal("0.70")
+BATCH_SIZE = 1000
+
+# Dimensión de agrupación -> (columnas que la identifican, columnas descriptivas)
+AGRUPACIONES = {
+    "periodo": (("periodo_anio", "periodo_mes"), ()),
+    "usuario_staff": (("usuario_staff",), ("usuario_staff__first_name", "usuario_staff__last_name")),
+    "actividad": (("actividad",), ("actividad__nombre",)),
+}
+
+
+def periodo_valido(valor):
+    try:
+        CompensacionStaff.separar_periodo(valor)
+    except ValueError:
+        return False
+    return True
+
+
+# =====================================================
+#        FILTROS
+# =====================================================
+def con_periodo(queryset):
+    """Anota `periodo_db` ("AAAA-MM") para los listados que leen con .values()."""
+    return queryset.annotate(periodo_db=Concat(
+        Cast("periodo_anio", CharField()), Value("-"), LPad(Cast("periodo_mes", CharField()), 2, Value("0")),
+        output_field=CharField(),
+    ))
+
+
+def del_periodo(queryset, periodo):
+    anio, mes = CompensacionStaff.separar_periodo(periodo)
+    return queryset.filter(periodo_anio=anio, periodo_mes=mes)
+
+
+def en_rango(queryset, desde=None, hasta=None):
+    """Compensaciones con período entre `desde` y `hasta` ("AAAA-MM", inclusivos)."""
+    if desde:
+        anio, mes = CompensacionStaff.separar_periodo(desde)
+        queryset = queryset.filter(Q(periodo_anio__gt=anio) | Q(periodo_anio=anio, periodo_mes__gte=mes))
+    if hasta:
+        anio, mes = CompensacionStaff.separar_periodo(hasta)
+        queryset = queryset.filter(Q(periodo_anio__lt=anio) | Q(periodo_anio=anio, periodo_mes__lte=mes))
+    return queryset
+
+
+# =====================================================
+#        TOTALES Y SUBTOTALES
+# =====================================================
+def totales(queryset):
+    """{"total", "cantidad"} del queryset en una sola consulta."""
+    datos = queryset.aggregate(total=Sum("monto"), cantidad=Count("pk"))
+    return {"total": datos["total"] or Decimal("0.00"), "cantidad": datos["cantidad"]}
+
+
+def subtotales(queryset, dimensiones):
+    """
+    Total y cantidad por cada combinación de `dimensiones` (claves de
+    AGRUPACIONES), ordenados por esas dimensiones.
+    """
+    claves = [columna for dimension in dimensiones for columna in AGRUPACIONES[dimension][0]]
+    descriptivas = [columna for dimension in dimensiones for columna in AGRUPACIONES[dimension][1]]
+    filas = (
+        queryset.order_by()
+        .values(*claves, *descriptivas)
+        .annotate(total=Sum("monto"), cantidad=Count("pk"))
+        .order_by(*claves)
+    )
+    return [_subtotal(fila, dimensiones) for fila in filas]
+
+
+def _subtotal(fila, dimensiones):
+    subtotal = {}
+    for dimension in dimensiones:
+        if dimension == "periodo":
+            subtotal["periodo"] = f"{fila['periodo_anio']}-{fila['periodo_mes']:02d}"
+        elif dimension == "usuario_staff":
+            subtotal["usuario_staff"] = fila["usuario_staff"]
+            subtotal["usuario_staff_nombre"] = (
+                f"{fila['usuario_staff__first_name']} {fila['usuario_staff__last_name']}".strip()
+            )
+        else:
+            subtotal["actividad"] = fila["actividad"]
+            subtotal["actividad_nombre"] = fila["actividad__nombre"]
+    subtotal["total"] = fila["total"]
+    subtotal["cantidad"] = fila["cantidad"]
+    return subtotal
+
+
+# =====================================================
+#        LIQUIDACIÓN AUTOMÁTICA
+# =====================================================
+def cobrado_por_actividad(mes, anio):
+    """
+    Por actividad: su profesor, la cantidad de inscripciones confirmadas
+    cobradas en cuotas pagas del mes y la suma de sus cargos. Una consulta
+    agrupada sobre la tabla intermedia cuota-inscripción.
+    """
+    Through = Cuota.inscripciones.through
+    return (
+        Through.objects.filter(
+            cuota__periodo_mes=mes,
+            cuota__periodo_anio=anio,
+            cuota__estado=Cuota.EstadoCuota.AL_DIA,
+            inscripcion__estado=Inscripcion.EstadoInscripcion.CONFIRMADA,
+        )
+        .values("inscripcion__actividad", "inscripcion__actividad__usuario_staff")
+        .annotate(
+            inscripciones=Count("inscripcion"),
+            cobrado=Sum("inscripcion__actividad__cargo_inscripcion"),
+        )
+        .order_by("inscripcion__actividad")
+    )
+
+
+def liquidar(mes, anio, porcentaje=PORCENTAJE_STAFF):
+    """
+    Crea o actualiza las compensaciones del mes y devuelve el detalle por
+    actividad. Las actividades sin cobros del mes no generan compensación.
+    """
+    detalle = []
+    compensaciones = []
+    for fila in cobrado_por_actividad(mes, anio):
+        staff_id = fila["inscripcion__actividad__usuario_staff"]
+        cobrado = fila["cobrado"] or Decimal("0.00")
+        if staff_id is None or not cobrado:
+            continue
+        monto = (cobrado * porcentaje).quantize(Decimal("0.01"))
+        compensaciones.append(CompensacionStaff(
+            periodo_anio=anio, periodo_mes=mes, usuario_staff_id=staff_id,
+            actividad_id=fila["inscripcion__actividad"], monto=monto,
+        ))
+        detalle.append({
+            "usuario_staff": staff_id,
+            "actividad": fila["inscripcion__actividad"],
+            "inscripciones": fila["inscripciones"],
+            "cobrado": cobrado,
+            "monto": monto,
+        })
+
+    opciones = {"update_conflicts": True, "update_fields": ["monto"]}
+    # MySQL resuelve el conflicto con cualquier clave única (ON DUPLICATE KEY) y no admite indicarla
+    if connection.features.supports_update_conflicts_with_target:
+        opciones["unique_fields"] = ["usuario_staff", "actividad", "periodo_anio", "periodo_mes"]
+    with transaction.atomic():
+        CompensacionStaff.objects.bulk_create(compensaciones, batch_size=BATCH_SIZE, **opciones)
+        # bulk_create no dispara señales
+        versiones.incrementar(CompensacionStaff)
+        cache_api.invalidar(CompensacionStaff)
+
+    return {
+        "periodo": f"{anio}-{mes:02d}",
+        "porcentaje": porcentaje,
+        "total": sum((d["monto"] for d in detalle), Decimal("0.00")),
+        "cantidad": len(detalle),
+        "compensaciones": detalle,
+    }
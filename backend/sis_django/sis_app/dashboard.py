@@ -0,0 +1,109 @@
+"""
+Estadísticas del panel de inicio con agregación condicional.
+
+Todo el resumen sale de tres consultas (usuarios, cuotas del período y
+próximas actividades) y se guarda en caché por un tiempo corto. Las señales
+de signals.py invalidan la caché cuando cambian los modelos involucrados.
+
+La caché es la de la API (cache_api.py) y se activa con ella: la versión
+que invalida las entradas vive en esa caché, así que con una caché en
+memoria por proceso los demás workers no se enterarían de los cambios.
+"""
+import time
+
+from django.core.cache import caches
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from . import cache_api
+from .models import Usuario, Actividad, Cuota
+
+CACHE_TTL = 60  # segundos
+CACHE_VERSION_KEY = "dashboard:version"
+
+
+def resumen_usuarios():
+    """Cantidad de usuarios por rol y de socios por estado, en una sola consulta."""
+    es_socio = Q(groups__name="socio")
+    datos = Usuario.objects.aggregate(
+        total=Count("pk", distinct=True),
+        admin=Count("pk", filter=Q(groups__name="admin"), distinct=True),
+        staff=Count("pk", filter=Q(groups__name="staff"), distinct=True),
+        socios=Count("pk", filter=es_socio, distinct=True),
+        **{
+            f"socios_{estado}": Count("pk", filter=es_socio & Q(estado=estado), distinct=True)
+            for estado in Usuario.EstadoUsuario.values
+        },
+    )
+    return {
+        "roles": {k: datos[k] for k in ("total", "admin", "staff", "socios")},
+        "socios_por_estado": {e: datos[f"socios_{e}"] for e in Usuario.EstadoUsuario.values},
+    }
+
+
+def resumen_cuotas(mes, anio):
+    """Facturado vs. cobrado del período y cantidad de cuotas por estado."""
+    datos = Cuota.objects.filter(periodo_mes=mes, periodo_anio=anio).aggregate(
+        facturado=Sum("valor_total"),
+        cobrado=Sum("valor_total", filter=Q(estado=Cuota.EstadoCuota.AL_DIA)),
+        cantidad=Count("pk"),
+        **{
+            f"cantidad_{estado}": Count("pk", filter=Q(estado=estado))
+            for estado in Cuota.EstadoCuota.values
+        },
+    )
+    return {
+        "periodo_mes": mes,
+        "periodo_anio": anio,
+        "facturado": datos["facturado"] or 0,
+        "cobrado": datos["cobrado"] or 0,
+        "cantidad": datos["cantidad"],
+        "por_estado": {e: datos[f"cantidad_{e}"] for e in Cuota.EstadoCuota.values},
+    }
+
+
+def proximas_actividades(limite=5):
+    """Próximas actividades activas, con el nombre del profesor resuelto por JOIN."""
+    return list(
+        Actividad.objects.filter(estado="activa", fecha_hora_inicio__gte=timezone.now())
+        .order_by("fecha_hora_inicio")
+        .values(
+            "id", "nombre", "fecha_hora_inicio", "fecha_hora_fin", "cargo_inscripcion",
+            "usuario_staff", "usuario_staff__first_name", "usuario_staff__last_name",
+        )[:limite]
+    )
+
+
+def _cache():
+    """La caché de la API, o None si está desactivada (CACHE_API["ACTIVO"])."""
+    config = cache_api.configuracion()
+    return caches[config["ALIAS"]] if config["ACTIVO"] else None
+
+
+def invalidar_resumen():
+    """Invalida todas las entradas del resumen (cambia la versión de las claves)."""
+    cache = _cache()
+    if cache is not None:
+        cache.set(CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+def resumen_dashboard(mes, anio):
+    """Resumen completo del panel de inicio, cacheado por período si la caché de la API está activa."""
+    cache = _cache()
+    if cache is None:
+        return _calcular_resumen(mes, anio)
+    version = cache.get_or_set(CACHE_VERSION_KEY, lambda: time.time_ns(), None)
+    clave = f"dashboard:{version}:{anio}-{mes}"
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _calcular_resumen(mes, anio)
+        cache.set(clave, datos, CACHE_TTL)
+    return datos
+
+
+def _calcular_resumen(mes, anio):
+    return {
+        **resumen_usuarios(),
+        "cuotas": resumen_cuotas(mes, anio),
+        "proximas_actividades": proximas_actividades(),
+    }
@@ -0,0 +1,218 @@
+"""
+Generador de datos sintéticos para pruebas de carga.
+
+Escribe volúmenes realistas de socios, staff, actividades, inscripciones,
+cuotas y compensaciones con INSERTs masivos (bulk_create), sin pasar por los
+serializers ni por las señales. Las cuotas se generan con el mismo motor que
+usa la API (generacion_cuotas.generar_cuotas), mes por mes.
+
+Los valores aleatorios salen de un `random.Random(semilla)`, así que dos
+corridas con la misma semilla sobre una base vacía producen los mismos datos.
+"""
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from .dashboard import invalidar_resumen
+from .generacion_cuotas import generar_cuotas, socios_activos
+from .identificadores import PASSWORD_POR_DEFECTO
+from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff
+from . import cache_api, versiones
+
+BATCH_SIZE = 2000
+
+NOMBRES = [
+    "Juan", "María", "Carlos", "Ana", "Luis", "Lucía", "Jorge", "Sofía", "Diego", "Valentina",
+    "Martín", "Camila", "Pablo", "Florencia", "Sergio", "Julieta", "Andrés", "Paula", "Tomás", "Agustina",
+]
+APELLIDOS = [
+    "González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez", "García", "Sánchez",
+    "Romero", "Sosa", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores", "Benítez", "Acosta", "Medina",
+]
+DISCIPLINAS = [
+    "Funcional", "Natación", "Yoga", "Pilates", "Básquet", "Vóley", "Fútbol", "Tenis", "Boxeo", "Spinning",
+    "Zumba", "Hockey", "Patín", "Karate", "Atletismo",
+]
+CARGOS = [Decimal(c) for c in ("800.00", "1200.00", "1500.00", "2000.00", "2500.00", "3500.00")]
+
+# Distribuciones (porcentajes acumulados sobre 100)
+ESTADOS_SOCIO = [(90, "activo"), (97, "inactivo"), (100, "baja")]
+INSCRIPCIONES_POR_SOCIO = [0, 1, 1, 1, 2, 2, 3]
+PORCENTAJE_INSCRIPCIONES_CONFIRMADAS = 85
+# Cuotas de meses vencidos: 85% pagas, 5% con comprobante en revisión, resto atrasadas
+PORCENTAJE_CUOTAS_PAGAS = 85
+PORCENTAJE_CUOTAS_EN_REVISION = 5
+
+
+def _elegir(rng, distribucion):
+    valor = rng.randrange(100)
+    for limite, opcion in distribucion:
+        if valor < limite:
+            return opcion
+
+
+def _bulk(modelo, objetos):
+    return modelo.objects.bulk_create(objetos, batch_size=BATCH_SIZE)
+
+
+def _ultimo_id(modelo):
+    return modelo.objects.aggregate(m=Max("pk"))["m"] or 0
+
+
+def _insertar(modelo, objetos):
+    """INSERT masivo que devuelve los ids creados (MySQL no los devuelve en bulk_create)."""
+    ultimo = _ultimo_id(modelo)
+    _bulk(modelo, objetos)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return [o.pk for o in objetos]
+    return list(modelo.objects.filter(pk__gt=ultimo).order_by("pk").values_list("pk", flat=True))
+
+
+def _periodos(meses, hoy):
+    """Los últimos `meses` períodos (mes, año), del más viejo al actual."""
+    periodos = []
+    mes, anio = hoy.month, hoy.year
+    for _ in range(meses):
+        periodos.append((mes, anio))
+        mes, anio = (12, anio - 1) if mes == 1 else (mes - 1, anio)
+    return list(reversed(periodos))
+
+
+def _crear_usuarios(rng, cantidad, grupo, prefijo, inicio, password, estados=None):
+    """Crea `cantidad` usuarios del grupo con username/dni derivados de `inicio`."""
+    usuarios = []
+    for i in range(inicio, inicio + cantidad):
+        nombre, apellido = rng.choice(NOMBRES), rng.choice(APELLIDOS)
+        usuarios.append(Usuario(
+            username=f"{prefijo}{i}",
+            first_name=nombre,
+            last_name=apellido,
+            email=f"{prefijo}{i}@club.test",
+            dni=f"8{i:09d}",
+            telefono=f"11{rng.randrange(10**8):08d}",
+            estado=_elegir(rng, estados) if estados else "activo",
+            password=password,
+        ))
+    ids = _insertar(Usuario, usuarios)
+    grupo = Group.objects.get_or_create(name=grupo)[0]
+    Through = Usuario.groups.through
+    _bulk(Through, [Through(usuario_id=pk, group_id=grupo.pk) for pk in ids])
+    return ids
+
+
+def generar_datos(socios=50000, actividades=500, meses=12, semilla=2025, valor_base=Decimal("5000.00")):
+    """
+    Puebla la base con datos sintéticos y devuelve la cantidad de filas creadas
+    por modelo. Pensado para una base vacía (o con datos de corridas anteriores:
+    los usernames y DNIs continúan la numeración existente).
+    """
+    rng = random.Random(semilla)
+    hoy = timezone.localdate()
+    # Un único hash para todos: hashear 50k contraseñas tardaría horas
+    password = make_password(PASSWORD_POR_DEFECTO)
+    inicio = Usuario.objects.count() + 1
+    staff = max(1, actividades // 10)
+
+    with transaction.atomic():
+        ids_staff = _crear_usuarios(rng, staff, "staff", "staff", inicio, password)
+        ids_socios = _crear_usuarios(
+            rng, socios, "socio", "socio", inicio + staff, password, estados=ESTADOS_SOCIO
+        )
+
+    # Actividades repartidas a lo largo del período simulado
+    desde = datetime.combine(hoy - timedelta(days=30 * meses), time(8), tzinfo=timezone.get_current_timezone())
+    lista_actividades = []
+    for i in range(actividades):
+        inicio_actividad = desde + timedelta(days=rng.randrange(30 * (meses + 2)), hours=rng.randrange(12))
+        lista_actividades.append(Actividad(
+            nombre=f"{rng.choice(DISCIPLINAS)} {i + 1}",
+            descripcion="Actividad generada para pruebas de carga",
+            fecha_hora_inicio=inicio_actividad,
+            fecha_hora_fin=inicio_actividad + timedelta(hours=1),
+            cargo_inscripcion=rng.choice(CARGOS),
+            estado="activa" if inicio_actividad.date() >= hoy else rng.choice(["activa", "finalizada", "archivada"]),
+            usuario_staff_id=rng.choice(ids_staff),
+        ))
+    with transaction.atomic():
+        ids_actividades = _insertar(Actividad, lista_actividades)
+
+    # Inscripciones: cada socio en 0 a 3 actividades distintas
+    inscripciones = []
+    for socio_id in ids_socios:
+        cantidad = min(rng.choice(INSCRIPCIONES_POR_SOCIO), len(ids_actividades))
+        for actividad_id in rng.sample(ids_actividades, cantidad):
+            confirmada = rng.randrange(100) < PORCENTAJE_INSCRIPCIONES_CONFIRMADAS
+            inscripciones.append(Inscripcion(
+                usuario_socio_id=socio_id,
+                actividad_id=actividad_id,
+                estado="confirmada" if confirmada else "cancelada",
+                estado_pago=rng.choice(["abonada", "pendiente"]),
+            ))
+    with transaction.atomic():
+        _bulk(Inscripcion, inscripciones)
+
+    # Cuotas: el motor de generación por período, y después el estado de pago
+    # con UPDATEs sobre conjuntos (el resto del id reparte los estados).
+    periodos = _periodos(meses, hoy)
+    cuotas_creadas = 0
+    # Los socios nuevos ocupan un rango contiguo de ids: se filtra por rango y no con un IN enorme
+    socios = socios_activos().filter(pk__range=(ids_socios[0], ids_socios[-1])) if ids_socios \
+        else Usuario.objects.none()
+    for mes, anio in periodos:
+        vencimiento = datetime.combine(
+            hoy.replace(year=anio, month=mes, day=10), time(23, 59), tzinfo=timezone.get_current_timezone()
+        )
+        with transaction.atomic():
+            cuotas_creadas += len(generar_cuotas(mes, anio, valor_base, vencimiento, socios=socios))
+            if (mes, anio) == periodos[-1] or not ids_socios:
+                continue  # el período actual queda impago
+            del_periodo = Cuota.objects.filter(
+                periodo_mes=mes, periodo_anio=anio,
+                usuario_socio__gte=ids_socios[0], usuario_socio__lte=ids_socios[-1],
+            ).alias(resto=Mod("id", 100))
+            del_periodo.filter(resto__lt=PORCENTAJE_CUOTAS_PAGAS).update(
+                estado=Cuota.EstadoCuota.AL_DIA, fecha_pago=vencimiento - timedelta(days=3),
+            )
+            del_periodo.filter(
+                resto__gte=PORCENTAJE_CUOTAS_PAGAS,
+                resto__lt=PORCENTAJE_CUOTAS_PAGAS + PORCENTAJE_CUOTAS_EN_REVISION,
+            ).update(estado=Cuota.EstadoCuota.PENDIENTE_REVISION)
+
+    # Compensaciones: una por actividad y período, proporcional a los inscriptos
+    confirmadas = dict(
+        Inscripcion.objects.filter(actividad_id__in=ids_actividades, estado="confirmada")
+        .values("actividad_id").annotate(n=Count("pk")).values_list("actividad_id", "n")
+    )
+    compensaciones = [
+        CompensacionStaff(
+            periodo_anio=anio,
+            periodo_mes=mes,
+            usuario_staff_id=staff_id,
+            actividad_id=actividad_id,
+            monto=(cargo * confirmadas.get(actividad_id, 0) / 2).quantize(Decimal("0.01")),
+        )
+        for actividad_id, staff_id, cargo in Actividad.objects.filter(pk__in=ids_actividades)
+        .values_list("pk", "usuario_staff_id", "cargo_inscripcion").iterator()
+        for mes, anio in periodos
+    ]
+    with transaction.atomic():
+        _bulk(CompensacionStaff, compensaciones)
+
+    invalidar_resumen()
+    versiones.incrementar(Usuario, Actividad, Inscripcion, CompensacionStaff)
+    cache_api.invalidar(Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff)
+    return {
+        "staff": len(ids_staff),
+        "socios": len(ids_socios),
+        "actividades": len(ids_actividades),
+        "inscripciones": len(inscripciones),
+        "cuotas": cuotas_creadas,
+        "compensaciones": len(compensaciones),
+    }
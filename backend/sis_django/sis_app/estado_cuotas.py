@@ -0,0 +1,154 @@
+"""
+Motor de estados de vencimiento de las cuotas.
+
+Las cuotas impagas están 'pendiente' (todavía no vencen) o 'atrasada'
+(vencidas). El paso de una a otra depende sólo de fecha_vencimiento, así que
+`actualizar_estados` lo resuelve con dos UPDATE sobre conjuntos, apoyados en
+el índice (estado, fecha_vencimiento). Se ejecuta periódicamente con el
+comando actualizar_estados_cuotas (cron, o --cada N como planificador local).
+
+Los días de atraso se calculan en la base (`dias_atraso`), así que los
+listados de morosidad se pueden filtrar, ordenar y agrupar por antigüedad en
+una sola consulta. Como "atraso > N días" equivale a "vencimiento anterior a
+ahora - N días", los filtros por antigüedad se expresan sobre
+fecha_vencimiento y usan el índice.
+"""
+from datetime import timedelta
+
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.db.models.expressions import Func
+from django.utils import timezone
+
+from . import cache_api
+from .dashboard import invalidar_resumen
+from .models import Cuota
+
+IMPAGAS = [Cuota.EstadoCuota.PENDIENTE, Cuota.EstadoCuota.ATRASADA]
+
+# Tramos de antigüedad de la deuda: (nombre, días mínimos, días máximos o None)
+TRAMOS_ANTIGUEDAD = [
+    ("0-30", 0, 30),
+    ("31-60", 31, 60),
+    ("60+", 61, None),
+]
+
+
+def actualizar_estados(ahora=None):
+    """
+    Pasa a 'atrasada' las cuotas pendientes ya vencidas y vuelve a 'pendiente'
+    las atrasadas cuyo vencimiento se corrió al futuro. Devuelve la cantidad
+    de cuotas movidas en cada sentido.
+    """
+    ahora = ahora or timezone.now()
+    vencidas = Cuota.objects.filter(
+        estado=Cuota.EstadoCuota.PENDIENTE, fecha_vencimiento__lt=ahora,
+    ).update(estado=Cuota.EstadoCuota.ATRASADA)
+    prorrogadas = Cuota.objects.filter(
+        estado=Cuota.EstadoCuota.ATRASADA, fecha_vencimiento__gte=ahora,
+    ).update(estado=Cuota.EstadoCuota.PENDIENTE)
+    if vencidas or prorrogadas:
+        # update() no dispara señales
+        invalidar_resumen()
+        cache_api.invalidar(Cuota)
+    return {"vencidas": vencidas, "prorrogadas": prorrogadas}
+
+
+def estado_impaga(fecha_vencimiento, ahora=None):
+    """Estado que corresponde a una cuota impaga según su vencimiento."""
+    if fecha_vencimiento < (ahora or timezone.now()):
+        return Cuota.EstadoCuota.ATRASADA
+    return Cuota.EstadoCuota.PENDIENTE
+
+
+# =====================================================
+#        DÍAS DE ATRASO EN LA BASE
+# =====================================================
+class DiasDesde(Func):
+    """Días completos transcurridos entre la expresión y `ahora` (entero)."""
+    output_field = IntegerField()
+
+    def __init__(self, expresion, ahora, **extra):
+        super().__init__(Value(ahora), expresion, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(", **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        # TIMESTAMPDIFF(DAY, desde, hasta): los argumentos van al revés
+        ahora, desde = self.get_source_expressions()
+        clon = self.copy()
+        clon.set_source_expressions([desde, ahora])
+        return super(DiasDesde, clon).as_sql(
+            compiler, connection, function="TIMESTAMPDIFF", template="%(function)s(DAY, %(expressions)s)",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template="EXTRACT(DAY FROM %(expressions)s)::integer", arg_joiner=" - ", **extra_context,
+        )
+
+
+def dias_atraso(ahora=None):
+    """
+    Expresión con los días de atraso de cada cuota, con la misma regla que
+    Cuota.dias_atraso: 0 si está paga o todavía no venció.
+    """
+    ahora = ahora or timezone.now()
+    return Case(
+        When(fecha_pago__isnull=True, fecha_vencimiento__lt=ahora,
+             then=DiasDesde(F("fecha_vencimiento"), ahora)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def con_dias_atraso(queryset, ahora=None):
+    """Anota `dias_atraso_db`, que Cuota.dias_atraso usa en lugar de calcular en Python."""
+    return queryset.annotate(dias_atraso_db=dias_atraso(ahora))
+
+
+def vencidas(queryset, ahora=None, dias_min=None, dias_max=None):
+    """
+    Cuotas impagas y vencidas del queryset, con atraso entre dias_min y
+    dias_max (inclusive). No depende de que el motor de estados ya haya corrido.
+    """
+    ahora = ahora or timezone.now()
+    queryset = queryset.filter(estado__in=IMPAGAS, fecha_vencimiento__lt=ahora)
+    if dias_min:
+        # atraso >= N días  <=>  vencimiento <= ahora - N días
+        queryset = queryset.filter(fecha_vencimiento__lte=ahora - timedelta(days=dias_min))
+    if dias_max is not None:
+        # atraso <= N días  <=>  vencimiento > ahora - (N + 1) días
+        queryset = queryset.filter(fecha_vencimiento__gt=ahora - timedelta(days=dias_max + 1))
+    return queryset
+
+
+def antiguedad_deuda(queryset=None, ahora=None):
+    """
+    Cantidad y monto de las cuotas vencidas por tramo de antigüedad
+    (TRAMOS_ANTIGUEDAD), con una sola consulta de agregación condicional.
+    """
+    ahora = ahora or timezone.now()
+    if queryset is None:
+        queryset = Cuota.objects.all()
+    agregados = {}
+    for nombre, desde, hasta in TRAMOS_ANTIGUEDAD:
+        condicion = Q(fecha_vencimiento__lte=ahora - timedelta(days=desde))
+        if hasta is not None:
+            condicion &= Q(fecha_vencimiento__gt=ahora - timedelta(days=hasta + 1))
+        agregados[f"cantidad_{nombre}"] = Count("pk", filter=condicion)
+        agregados[f"monto_{nombre}"] = Sum("valor_total", filter=condicion)
+    datos = vencidas(queryset.order_by(), ahora).aggregate(**agregados)
+    return {
+        nombre: {
+            "cantidad": datos[f"cantidad_{nombre}"],
+            "monto": datos[f"monto_{nombre}"] or 0,
+        }
+        for nombre, _, _ in TRAMOS_ANTIGUEDAD
+    }
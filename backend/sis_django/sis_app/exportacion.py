@@ -0,0 +1,213 @@
+"""
+Exportación de reportes a CSV o XLSX en streaming.
+
+Cada reporte es un queryset con .values() que trae las columnas ya unidas
+en la base (socio, actividad, staff por JOIN) y una lista de columnas
+(encabezado, clave). Las filas se leen por lotes con paginación por clave
+(`por_lotes`): cada lote es una consulta que arranca después de la última
+fila del anterior, así que la memoria no depende del total de filas. Con
+.iterator() no alcanzaría en MySQL, donde el driver trae el resultado
+completo a memoria aunque Django lo pida de a partes.
+
+- CSV: la respuesta empieza a salir con el primer lote.
+- XLSX: openpyxl en modo write_only va escribiendo las filas en un archivo
+  temporal; al terminar, el archivo se manda en bloques. El libro completo
+  nunca está en memoria, pero el primer byte sale cuando ya se leyeron
+  todas las filas.
+
+Bajo ASGI, StreamingHttpResponse lee completo un iterador sync antes de
+mandar el primer byte. Ahí la respuesta lleva un iterador async
+(`iterar_async`) que pide cada lote o bloque en el hilo sync del request.
+"""
+import csv
+import tempfile
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .pagination import despues_de
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Filas por consulta
+LOTE = 2000
+# Bloque de lectura del XLSX terminado
+BLOQUE = 64 * 1024
+
+
+class ErrorExportacion(Exception):
+    """Formato pedido no disponible."""
+
+
+def por_lotes(queryset, orden, tamanio=LOTE):
+    """
+    Filas de `queryset` (un .values() que incluye las columnas de `orden`)
+    ordenadas por `orden`, de a `tamanio` por consulta. `orden` tiene que
+    terminar en una columna única y sin nulos (p. ej. "id"), como los
+    órdenes de la paginación por cursor.
+    """
+    queryset = queryset.order_by(*orden)
+    ultima = None
+    while True:
+        lote = queryset if ultima is None else queryset.filter(despues_de(orden, ultima))
+        filas = list(lote[:tamanio])
+        yield filas
+        if len(filas) < tamanio:
+            return
+        ultima = filas[-1]
+
+
+def es_asgi(request):
+    """Si `request` (de Django o de DRF) llegó por el handler ASGI."""
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+_FIN = object()
+
+
+async def iterar_async(iterador):
+    """
+    Los elementos de `iterador` (sync, con consultas a la base) de a uno,
+    cada uno calculado en el hilo sync del request, donde está su conexión.
+    """
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    while (valor := await siguiente(iterador, _FIN)) is not _FIN:
+        yield valor
+
+
+def contenido_streaming(iterador, asincrono):
+    """Contenido para StreamingHttpResponse: `iterador` tal cual o, bajo ASGI, con `iterar_async`."""
+    return iterar_async(iterador) if asincrono else iterador
+
+
+def _valor(valor):
+    # Excel no admite fechas con zona horaria: van en hora local
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor).replace(tzinfo=None)
+    return valor
+
+
+# =====================================================
+#        REPORTES
+# =====================================================
+# (encabezado, clave de .values()): las relaciones se leen por JOIN en la misma consulta
+SOCIO = [
+    ("Socio ID", "usuario_socio_id"),
+    ("Apellido", "usuario_socio__last_name"),
+    ("Nombre", "usuario_socio__first_name"),
+    ("DNI", "usuario_socio__dni"),
+]
+
+# Los de cuotas necesitan la anotación dias_atraso_db (estado_cuotas.con_dias_atraso)
+COLUMNAS_CUOTAS = [
+    ("ID", "id"),
+    ("Año", "periodo_anio"),
+    ("Mes", "periodo_mes"),
+    *SOCIO,
+    ("Estado", "estado"),
+    ("Vencimiento", "fecha_vencimiento"),
+    ("Fecha de pago", "fecha_pago"),
+    ("Valor base", "valor_base"),
+    ("Valor actividades", "valor_actividades"),
+    ("Total", "valor_total"),
+    ("Días de atraso", "dias_atraso_db"),
+]
+
+COLUMNAS_MOROSIDAD = [
+    *SOCIO,
+    ("Teléfono", "usuario_socio__telefono"),
+    ("Email", "usuario_socio__email"),
+    ("Cuota ID", "id"),
+    ("Año", "periodo_anio"),
+    ("Mes", "periodo_mes"),
+    ("Vencimiento", "fecha_vencimiento"),
+    ("Días de atraso", "dias_atraso_db"),
+    ("Adeudado", "valor_total"),
+]
+
+COLUMNAS_INSCRIPCIONES = [
+    ("Actividad ID", "actividad_id"),
+    ("Actividad", "actividad__nombre"),
+    ("Inicio", "actividad__fecha_hora_inicio"),
+    ("Staff", "actividad__usuario_staff__username"),
+    ("Cargo", "actividad__cargo_inscripcion"),
+    ("Inscripción ID", "id"),
+    *SOCIO,
+    ("Estado", "estado"),
+    ("Estado de pago", "estado_pago"),
+    ("Fecha de inscripción", "fecha_inscripcion"),
+]
+
+COLUMNAS_COMPENSACIONES = [
+    ("ID", "id"),
+    ("Período", "periodo_db"),
+    ("Staff ID", "usuario_staff_id"),
+    ("Apellido", "usuario_staff__last_name"),
+    ("Nombre", "usuario_staff__first_name"),
+    ("Actividad ID", "actividad_id"),
+    ("Actividad", "actividad__nombre"),
+    ("Monto", "monto"),
+]
+
+
+# =====================================================
+#        FORMATOS
+# =====================================================
+class _Linea:
+    """Destino de csv.writer que devuelve la línea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _csv(lotes, columnas):
+    escritor = csv.writer(_Linea())
+    # Con BOM, Excel abre el archivo como UTF-8 (acentos y eñes)
+    yield "\ufeff" + escritor.writerow([encabezado for encabezado, _ in columnas])
+    for filas in lotes:
+        if filas:
+            yield "".join(escritor.writerow([_valor(fila[clave]) for _, clave in columnas]) for fila in filas)
+
+
+def _xlsx(lotes, columnas, titulo):
+    from openpyxl import Workbook
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(titulo[:31])
+    hoja.append([encabezado for encabezado, _ in columnas])
+    for filas in lotes:
+        for fila in filas:
+            hoja.append([_valor(fila[clave]) for _, clave in columnas])
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while bloque := archivo.read(BLOQUE):
+            yield bloque
+
+
+def respuesta(queryset, orden, columnas, nombre, formato, asincrono=False):
+    """
+    StreamingHttpResponse con las `columnas` de `queryset` (el modelo, con
+    los filtros y anotaciones del reporte) en `formato` ("csv" o "xlsx"),
+    descargado como <nombre>.<formato>. Las consultas corren a medida que se
+    envía la respuesta; con `asincrono` (bajo ASGI), desde un iterador async.
+    """
+    if formato not in FORMATOS:
+        raise ErrorExportacion(f"Formato no soportado. Opciones: {', '.join(FORMATOS)}")
+    claves = dict.fromkeys([clave for _, clave in columnas] + [columna.lstrip("-") for columna in orden])
+    lotes = por_lotes(queryset.values(*claves), orden)
+    if formato == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise ErrorExportacion("Para exportar a .xlsx hace falta instalar openpyxl")
+        contenido = _xlsx(lotes, columnas, nombre)
+    else:
+        contenido = _csv(lotes, columnas)
+    response = StreamingHttpResponse(contenido_streaming(contenido, asincrono), content_type=FORMATOS[formato])
+    response["Content-Disposition"] = f'attachment; filename="{nombre}.{formato}"'
+    return response
@@ -0,0 +1,295 @@
+"""
+Motor de generación de cuotas basado en conjuntos.
+
+En lugar de recorrer los socios uno por uno (una consulta de existencia, un
+INSERT, una consulta de inscripciones y un set() del M2M por cada socio), se
+resuelve todo el período con una cantidad fija de consultas:
+
+1. Socios pendientes: anti-join (NOT EXISTS) contra las cuotas del período.
+2. Inscripciones confirmadas de esos socios con el cargo de su actividad.
+3. INSERT masivo de las cuotas (bulk_create), salteando las que otro request
+   creó entre el anti-join y el INSERT.
+4. Lectura de los ids de las cuotas insertadas.
+5. INSERT masivo de la tabla intermedia Cuota.inscripciones.
+
+Los totales (columnas valor_actividades/valor_total y respuesta) se calculan en
+memoria con los datos del paso 2.
+
+Para períodos grandes, `procesar_job` ejecuta el mismo motor en segundo plano
+sobre lotes de socios ordenados por id, con un commit por lote. Hay una sola
+corrida activa por período (`iniciar_job`), y la que quedó abandonada porque
+el proceso que la tenía se reinició se vuelve a encolar (`reanudar_si_abandonada`).
+"""
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import cache_api
+from .dashboard import invalidar_resumen
+from .estado_cuotas import estado_impaga
+from .models import Usuario, Inscripcion, Cuota, GeneracionCuotasJob
+
+logger = logging.getLogger(__name__)
+
+# Filas por sentencia INSERT en los bulk_create. La cantidad de consultas sólo
+# crece en una por cada BATCH_SIZE cuotas, no por socio.
+BATCH_SIZE = 1000
+
+
+def socios_activos():
+    """Socios (grupo 'socio') en estado activo."""
+    return Usuario.objects.filter(groups__name='socio', estado='activo').distinct()
+
+
+def socios_sin_cuota(socios, mes, anio):
+    """Filtra `socios` dejando sólo los que no tienen cuota en el período (anti-join)."""
+    cuota_del_periodo = Cuota.objects.filter(
+        usuario_socio=OuterRef('pk'),
+        periodo_mes=mes,
+        periodo_anio=anio,
+    )
+    return socios.filter(~Exists(cuota_del_periodo))
+
+
+def generar_cuotas(mes, anio, valor_base, fecha_vencimiento, socios=None):
+    """
+    Crea las cuotas del período para los socios que todavía no la tienen.
+
+    `socios` es un queryset de candidatos (por defecto, todos los socios
+    activos). Debe ejecutarse dentro de una transacción.
+
+    Devuelve una lista de dicts con el detalle de cada cuota creada, en el
+    mismo formato que expone el endpoint generar_cuotas.
+    """
+    if socios is None:
+        socios = socios_activos()
+    pendientes = socios_sin_cuota(socios, mes, anio)
+
+    filas_socios = list(
+        pendientes.order_by('pk').values('pk', 'first_name', 'last_name')
+    )
+    if not filas_socios:
+        return []
+
+    # Inscripciones confirmadas de los socios pendientes, con el cargo ya resuelto por JOIN
+    inscripciones_por_socio = defaultdict(list)
+    filas_inscripciones = Inscripcion.objects.filter(
+        estado='confirmada',
+        usuario_socio__in=pendientes.values('pk'),
+    ).values_list('pk', 'usuario_socio_id', 'actividad__cargo_inscripcion')
+    for insc_id, socio_id, cargo in filas_inscripciones:
+        inscripciones_por_socio[socio_id].append((insc_id, cargo or Decimal('0.00')))
+
+    # Los totales desnormalizados se calculan acá: bulk_create no dispara señales
+    valor_actividades_por_socio = {
+        socio_id: sum((cargo for _, cargo in inscs), Decimal('0.00'))
+        for socio_id, inscs in inscripciones_por_socio.items()
+    }
+    estado = estado_impaga(fecha_vencimiento)
+    cuotas = []
+    for fila in filas_socios:
+        valor_actividades = valor_actividades_por_socio.get(fila['pk'], Decimal('0.00'))
+        cuotas.append(Cuota(
+            usuario_socio_id=fila['pk'],
+            fecha_vencimiento=fecha_vencimiento,
+            valor_base=valor_base,
+            valor_actividades=valor_actividades,
+            valor_total=valor_base + valor_actividades,
+            estado=estado,
+            periodo_mes=mes,
+            periodo_anio=anio,
+        ))
+    # Una cuota cargada a mano para el mismo socio y período entre el anti-join
+    # y el INSERT choca con el unique_together: se saltea en lugar de fallar
+    Cuota.objects.bulk_create(cuotas, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    # Con ignore_conflicts ninguna base devuelve los ids: se leen en una sola
+    # consulta. Una cuota de otro request sólo pasa por insertada si es igual
+    # a la de esta corrida (vencimiento, valores y sin inscripciones todavía);
+    # en ese caso no recibe inscripciones, porque su valor_actividades es 0.
+    cuota_id_por_socio = {
+        socio_id: cuota_id
+        for socio_id, cuota_id, valor_actividades in Cuota.objects.filter(
+            periodo_mes=mes,
+            periodo_anio=anio,
+            fecha_vencimiento=fecha_vencimiento,
+            valor_base=valor_base,
+            usuario_socio__in=socios.values('pk'),
+            inscripciones__isnull=True,
+        ).values_list('usuario_socio_id', 'pk', 'valor_actividades')
+        if valor_actividades == valor_actividades_por_socio.get(socio_id, Decimal('0.00'))
+    }
+    creadas = [(fila, cuota) for fila, cuota in zip(filas_socios, cuotas) if fila['pk'] in cuota_id_por_socio]
+    if len(creadas) < len(cuotas):
+        logger.info("Generación %02d/%d: %d cuotas ya creadas por otro request", mes, anio, len(cuotas) - len(creadas))
+
+    Through = Cuota.inscripciones.through
+    Through.objects.bulk_create(
+        [
+            Through(cuota_id=cuota_id_por_socio[socio_id], inscripcion_id=insc_id)
+            for socio_id, inscs in inscripciones_por_socio.items() if socio_id in cuota_id_por_socio
+            for insc_id, _ in inscs
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    # bulk_create no dispara señales: se invalidan a mano el resumen del dashboard y la caché
+    # de la API, al confirmar (antes, otro request podría volver a guardar lo anterior)
+    transaction.on_commit(invalidar_resumen)
+    transaction.on_commit(lambda: cache_api.invalidar(Cuota))
+
+    return [
+        {
+            "socio": f"{fila['first_name']} {fila['last_name']}",
+            "cuota_id": cuota_id_por_socio[fila['pk']],
+            "valor_base": float(cuota.valor_base),
+            "valor_actividades": float(cuota.valor_actividades),
+            "valor_total": float(cuota.valor_total),
+            "num_inscripciones": len(inscripciones_por_socio.get(fila['pk'], [])),
+        }
+        for fila, cuota in creadas
+    ]
+
+
+# =====================================================
+#        CORRIDAS EN SEGUNDO PLANO
+# =====================================================
+# Socios por lote: cada lote es una transacción corta en lugar de una sola
+# transacción que bloquee filas durante minutos.
+TAMANIO_LOTE = 500
+
+# Un único hilo: las corridas se encolan y no compiten por las mismas filas.
+_ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generacion_cuotas")
+
+# Cada lote actualiza fecha_actualizacion: una corrida activa que no avanza
+# hace este tiempo quedó sin hilo que la procese (reinicio o caída del proceso).
+ABANDONO = timedelta(minutes=10)
+ACTIVAS = [GeneracionCuotasJob.EstadoJob.PENDIENTE, GeneracionCuotasJob.EstadoJob.EN_PROCESO]
+
+
+def clave_periodo(mes, anio):
+    return f"{anio:04d}-{mes:02d}"
+
+
+def iniciar_job(mes, anio, valor_base, fecha_vencimiento):
+    """
+    Corrida activa del período: la que ya había (reencolada si quedó
+    abandonada) o una nueva, encolada al confirmar la transacción. Debe
+    ejecutarse dentro de una transacción.
+    """
+    periodo = clave_periodo(mes, anio)
+    job = GeneracionCuotasJob.objects.select_for_update().filter(periodo_activo=periodo).first()
+    if job is not None:
+        reanudar_si_abandonada(job)
+        return job
+    try:
+        with transaction.atomic():
+            job = GeneracionCuotasJob.objects.create(
+                periodo_mes=mes,
+                periodo_anio=anio,
+                valor_base=valor_base,
+                fecha_vencimiento=fecha_vencimiento,
+                periodo_activo=periodo,
+            )
+    except IntegrityError:
+        # Otro request creó la corrida del período entre la consulta y el INSERT
+        return GeneracionCuotasJob.objects.select_for_update().get(periodo_activo=periodo)
+    encolar_job(job.id)
+    return job
+
+
+def abandonadas(ahora=None):
+    """Corridas pendientes o en proceso sin avance desde hace más de ABANDONO."""
+    limite = (ahora or timezone.now()) - ABANDONO
+    return GeneracionCuotasJob.objects.filter(estado__in=ACTIVAS, fecha_actualizacion__lt=limite)
+
+
+def reanudar_si_abandonada(job):
+    """
+    Vuelve a encolar `job` si quedó abandonado. El UPDATE condicional hace que
+    sólo uno de varios requests simultáneos lo encole; procesar dos veces la
+    misma corrida tampoco duplicaría cuotas (ver procesar_job).
+    """
+    ahora = timezone.now()
+    if not abandonadas(ahora).filter(pk=job.pk).update(fecha_actualizacion=ahora):
+        return False
+    logger.warning("Corrida de generación de cuotas %s abandonada: se vuelve a encolar", job.pk)
+    job.fecha_actualizacion = ahora
+    encolar_job(job.pk)
+    return True
+
+
+def procesar_job(job_id, tamanio_lote=TAMANIO_LOTE):
+    """
+    Procesa (o reanuda) una corrida de generación de cuotas.
+
+    Cada lote se confirma junto con el punto de control del job, así que una
+    corrida interrumpida retoma desde el último lote confirmado. Si igual se
+    repite un socio, el anti-join y el unique_together (socio, mes, año)
+    evitan duplicar su cuota.
+    """
+    GeneracionCuotasJob.objects.filter(
+        pk=job_id,
+        estado__in=[GeneracionCuotasJob.EstadoJob.PENDIENTE, GeneracionCuotasJob.EstadoJob.ERROR],
+    ).update(estado=GeneracionCuotasJob.EstadoJob.EN_PROCESO, error="")
+
+    try:
+        while _procesar_lote(job_id, tamanio_lote):
+            pass
+    except Exception as e:
+        logger.exception("Error en la generación de cuotas (job %s)", job_id)
+        GeneracionCuotasJob.objects.filter(pk=job_id).update(
+            estado=GeneracionCuotasJob.EstadoJob.ERROR, error=str(e), periodo_activo=None,
+        )
+        raise
+
+    return GeneracionCuotasJob.objects.get(pk=job_id)
+
+
+def _procesar_lote(job_id, tamanio_lote):
+    """Procesa el siguiente lote del job. Devuelve False cuando no quedan socios."""
+    with transaction.atomic():
+        # El lock sobre el job serializa a dos workers que tomen la misma corrida
+        job = GeneracionCuotasJob.objects.select_for_update().get(pk=job_id)
+        if job.estado == GeneracionCuotasJob.EstadoJob.COMPLETADO:
+            return False
+
+        socios = socios_activos().filter(pk__gt=job.ultimo_socio_id)
+        ids = list(socios.order_by('pk').values_list('pk', flat=True)[:tamanio_lote])
+        if not ids:
+            job.estado = GeneracionCuotasJob.EstadoJob.COMPLETADO
+            job.periodo_activo = None
+            job.save(update_fields=['estado', 'periodo_activo', 'fecha_actualizacion'])
+            return False
+
+        creadas = generar_cuotas(
+            job.periodo_mes,
+            job.periodo_anio,
+            job.valor_base,
+            job.fecha_vencimiento,
+            socios=socios.filter(pk__lte=ids[-1]),
+        )
+        job.ultimo_socio_id = ids[-1]
+        job.socios_procesados += len(ids)
+        job.cuotas_creadas += len(creadas)
+        job.save(update_fields=['ultimo_socio_id', 'socios_procesados', 'cuotas_creadas', 'fecha_actualizacion'])
+        return True
+
+
+def _ejecutar_en_hilo(job_id):
+    try:
+        procesar_job(job_id)
+    except Exception:
+        pass  # ya quedó registrado en el job
+    finally:
+        connection.close()
+
+
+def encolar_job(job_id):
+    """Lanza la corrida en el worker local una vez confirmada la transacción actual."""
+    transaction.on_commit(lambda: _ejecutor.submit(_ejecutar_en_hilo, job_id))
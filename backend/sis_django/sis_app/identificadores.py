@@ -0,0 +1,109 @@
+"""
+Generación de usernames y DNIs para usuarios que llegan sin ellos
+(alta desde el front o importación masiva).
+
+Para altas individuales, el próximo sufijo libre sale de una sola consulta
+(mayor sufijo numérico existente + 1) en lugar de probar candidatos con
+exists(). Dos altas simultáneas pueden calcular el mismo valor: quien inserta
+segundo recibe un IntegrityError y reintenta (ver UsuarioSerializer.create).
+"""
+import re
+
+from django.db.models import Count, IntegerField, Max, Q
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Usuario
+
+PASSWORD_POR_DEFECTO = "Club2025!"  # solo dev
+
+
+def _to_slug(s: str) -> str:
+    return slugify(s or "").replace("-", "")
+
+
+def construir_username_base(first_name, last_name, dni) -> str:
+    """'nombre.apellido' normalizado; si no hay nombre, 'staff<dni>'."""
+    fn = _to_slug(first_name)
+    ln = _to_slug((last_name or "").split(" ")[0])
+    if fn or ln:
+        base = ".".join([p for p in [fn, ln] if p])
+        base = re.sub(r"\.+", ".", base).strip(".")
+        if base:
+            return base
+    if dni:
+        digits = re.sub(r"\D", "", str(dni))
+        if digits:
+            return f"staff{digits}"
+    return f"staff{int(timezone.now().timestamp())}"
+
+
+def siguiente_username(base: str) -> str:
+    """`base` si está libre; si no, `base` + (mayor sufijo numérico en uso + 1)."""
+    datos = Usuario.objects.filter(
+        username__startswith=base,
+        username__regex=rf"^{re.escape(base)}[0-9]*$",
+    ).aggregate(
+        base_en_uso=Count("pk", filter=Q(username=base)),
+        max_sufijo=Max(Cast(Substr("username", len(base) + 1), IntegerField())),
+    )
+    if not datos["base_en_uso"]:
+        return base
+    return f"{base}{(datos['max_sufijo'] or 0) + 1}"
+
+
+# DNIs generados: '9' seguido de 9 dígitos (10 caracteres, el máximo del campo)
+DNI_GENERADO_MIN = "9000000000"
+DNI_GENERADO_MAX = "9999999999"
+
+
+_DNI_GENERADO = re.compile(r"^9[0-9]{9}$")
+
+
+def siguiente_dni() -> str:
+    """Siguiente DNI generado: el mayor en uso + 1 (una consulta sobre el índice de dni)."""
+    maximo = Usuario.objects.filter(
+        dni__gte=DNI_GENERADO_MIN,
+        dni__lte=DNI_GENERADO_MAX,
+        dni__regex=_DNI_GENERADO.pattern,
+    ).aggregate(maximo=Max("dni"))["maximo"]
+    return _dni_despues_de(maximo)
+
+
+def _dni_despues_de(maximo):
+    return str(int(maximo) + 1) if maximo else "9000000001"
+
+
+class AsignadorEnMemoria:
+    """
+    Asigna usernames/DNIs únicos contra un conjunto precargado, sin consultar
+    la base por cada candidato. Pensado para altas masivas: se carga una vez
+    y se reutiliza para todas las filas. Los DNIs siguen el mismo esquema que
+    siguiente_dni (mayor generado en uso + 1).
+    """
+
+    def __init__(self, usernames, dnis):
+        self.usernames = set(usernames)
+        self.dnis = set(dnis)
+        self._proximo_sufijo = {}
+        generados = [d for d in self.dnis if d and _DNI_GENERADO.match(d)]
+        self._proximo_dni = _dni_despues_de(max(generados, default=None))
+
+    def username(self, base: str) -> str:
+        candidato = base
+        i = self._proximo_sufijo.get(base, 0)
+        while candidato in self.usernames:
+            i += 1
+            candidato = f"{base}{i}"
+        self._proximo_sufijo[base] = i
+        self.usernames.add(candidato)
+        return candidato
+
+    def dni(self) -> str:
+        candidato = self._proximo_dni
+        while candidato in self.dnis:
+            candidato = _dni_despues_de(candidato)
+        self._proximo_dni = _dni_despues_de(candidato)
+        self.dnis.add(candidato)
+        return candidato
@@ -0,0 +1,257 @@
+"""
+Importación masiva de socios desde CSV o XLSX.
+
+El archivo se lee fila a fila y se procesa por lotes:
+- usernames y DNIs existentes se precargan en una consulta y las colisiones se
+  resuelven en memoria (ver identificadores.AsignadorEnMemoria);
+- las contraseñas explícitas se hashean en el proceso actual o, desde el
+  comando, en un pool de procesos; las filas sin contraseña comparten el hash
+  de la contraseña por defecto, calculado una vez;
+- usuarios y filas de grupo se insertan con bulk_create, un commit por lote.
+  bulk_create no dispara m2m_changed: is_staff se completa acá, como lo
+  haría sync_is_staff_on_group_change.
+
+Los errores se informan por fila sin frenar la importación, incluidos los
+usernames o DNIs que otro proceso dio de alta mientras se importaba.
+"""
+import csv
+import io
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+from .dashboard import invalidar_resumen
+from .identificadores import AsignadorEnMemoria, construir_username_base, PASSWORD_POR_DEFECTO
+from .models import Usuario
+from .serializers import UsuarioSerializer
+from . import cache_api, versiones
+
+TAMANIO_LOTE = 1000
+
+# Encabezados aceptados (en minúsculas) -> campo
+COLUMNAS = {
+    "username": "username", "usuario": "username",
+    "password": "password", "contraseña": "password", "contrasena": "password",
+    "first_name": "first_name", "nombre": "first_name",
+    "last_name": "last_name", "apellido": "last_name",
+    "nombre_completo": "nombre_completo", "nombrecompleto": "nombre_completo", "fullname": "nombre_completo",
+    "email": "email", "correo": "email",
+    "dni": "dni", "documento": "dni",
+    "telefono": "telefono", "teléfono": "telefono", "phone": "telefono",
+    "estado": "estado",
+}
+
+LARGOS_MAXIMOS = {"username": 150, "first_name": 150, "last_name": 150, "dni": 10, "telefono": 20}
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede leer (formato o encabezados inválidos)."""
+
+
+def leer_filas(archivo, nombre):
+    """Itera las filas del archivo como dicts {campo: valor}, según la extensión de `nombre`."""
+    extension = nombre.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        filas = _leer_csv(archivo)
+    elif extension == "xlsx":
+        filas = _leer_xlsx(archivo)
+    else:
+        raise ErrorImportacion("Formato no soportado. Solo se permiten archivos .csv o .xlsx")
+
+    encabezados = next(filas, None)
+    if not encabezados:
+        raise ErrorImportacion("El archivo está vacío")
+    campos = [COLUMNAS.get(str(h or "").strip().lower()) for h in encabezados]
+    if not {"first_name", "last_name", "nombre_completo", "dni"} & set(campos):
+        raise ErrorImportacion("Faltan columnas: se necesita nombre/apellido, nombre_completo o dni")
+
+    for valores in filas:
+        if not any(v not in (None, "") for v in valores):
+            continue  # fila vacía
+        yield {
+            campo: ("" if valor is None else str(valor).strip())
+            for campo, valor in zip(campos, valores)
+            if campo
+        }
+
+
+def _leer_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    return iter(csv.reader(texto, dialecto))
+
+
+def _leer_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErrorImportacion("Para importar archivos .xlsx hace falta instalar openpyxl")
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    return libro.active.iter_rows(values_only=True)
+
+
+def _validar_fila(datos, asignador, helpers):
+    """Normaliza una fila y completa username/DNI. Devuelve (datos, errores)."""
+    datos = {campo: valor for campo, valor in datos.items() if valor != ""}  # vacíos -> default del modelo
+    helpers._split_fullname_if_needed(datos)
+    helpers._normalize_estado(datos)
+    errores = {}
+
+    for campo, largo in LARGOS_MAXIMOS.items():
+        if len(datos.get(campo, "")) > largo:
+            errores[campo] = f"Máximo {largo} caracteres"
+    if datos.get("email"):
+        try:
+            validate_email(datos["email"])
+        except ValidationError:
+            errores["email"] = "Email inválido"
+    if datos.get("dni") and datos["dni"] in asignador.dnis:
+        errores["dni"] = "Ya existe un usuario con este DNI"
+    if datos.get("username") and datos["username"] in asignador.usernames:
+        errores["username"] = "Ya existe un usuario con este username"
+    if errores:
+        return None, errores
+
+    # Reservar identificadores sólo para filas válidas
+    if datos.get("dni"):
+        asignador.dnis.add(datos["dni"])
+    else:
+        datos["dni"] = asignador.dni()
+    if datos.get("username"):
+        asignador.usernames.add(datos["username"])
+    else:
+        base = construir_username_base(datos.get("first_name"), datos.get("last_name"), datos["dni"])
+        datos["username"] = asignador.username(base)
+    return datos, None
+
+
+def _hashear(pool, passwords):
+    if pool is None:
+        return [make_password(p) for p in passwords]
+    return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def _insertar_lote(validos, grupo, hash_por_defecto, pool):
+    """
+    Inserta las filas válidas [(número de fila, datos)]. Devuelve los errores
+    [{"fila", "errores"}] de las que chocaron con usuarios creados por otro
+    proceso después de la precarga de identificadores.
+    """
+    con_password = [d for _, d in validos if d.get("password")]
+    hashes = iter(_hashear(pool, [d["password"] for d in con_password]))
+    usuarios = []
+    for numero, datos in validos:
+        password = datos.pop("password", "")
+        usuario = Usuario(**datos)
+        usuario.password = next(hashes) if password else hash_por_defecto
+        usuario.is_staff = grupo.name in ("admin", "staff")
+        usuarios.append((numero, usuario))
+
+    errores = []
+    while usuarios:
+        try:
+            _guardar([u for _, u in usuarios], grupo)
+            break
+        except IntegrityError:
+            # Otro proceso dio de alta el mismo username o DNI: esas filas van
+            # como error y el resto del lote se vuelve a insertar
+            chocan = _ya_existentes(usuarios)
+            if not chocan:
+                raise
+            errores.extend({"fila": numero, "errores": chocan[numero]} for numero, _ in usuarios if numero in chocan)
+            usuarios = [(numero, u) for numero, u in usuarios if numero not in chocan]
+            for _, usuario in usuarios:
+                usuario.pk = None  # el INSERT se deshizo: se vuelve a insertar sin el id asignado
+    return errores
+
+
+def _ya_existentes(usuarios):
+    """{número de fila: errores} de los usuarios cuyo username o DNI ya está en la base."""
+    existentes = list(Usuario.objects.filter(
+        Q(username__in=[u.username for _, u in usuarios]) | Q(dni__in=[u.dni for _, u in usuarios])
+    ).values_list("username", "dni"))
+    usernames = {u for u, _ in existentes}
+    dnis = {d for _, d in existentes}
+    chocan = {}
+    for numero, usuario in usuarios:
+        errores = {}
+        if usuario.dni in dnis:
+            errores["dni"] = "Ya existe un usuario con este DNI"
+        if usuario.username in usernames:
+            errores["username"] = "Ya existe un usuario con este username"
+        if errores:
+            chocan[numero] = errores
+    return chocan
+
+
+def _guardar(usuarios, grupo):
+    with transaction.atomic():
+        Usuario.objects.bulk_create(usuarios, batch_size=TAMANIO_LOTE)
+        if connection.features.can_return_rows_from_bulk_insert:
+            ids = [u.pk for u in usuarios]
+        else:  # MySQL: leer los ids por username en una consulta
+            por_username = dict(
+                Usuario.objects.filter(username__in=[u.username for u in usuarios]).values_list("username", "pk")
+            )
+            ids = [por_username[u.username] for u in usuarios]
+        Usuario.groups.through.objects.bulk_create(
+            [Usuario.groups.through(usuario_id=i, group_id=grupo.id) for i in ids],
+            batch_size=TAMANIO_LOTE,
+        )
+
+
+def importar_socios(archivo, nombre, grupo="socio", procesos=1, tamanio_lote=TAMANIO_LOTE):
+    """
+    Importa usuarios del archivo y los agrega a `grupo`.
+
+    `procesos` es la cantidad de procesos para hashear contraseñas (por
+    defecto 1, en el proceso actual). Un pool sólo conviene fuera de un
+    worker web, por ejemplo desde el comando importar_socios.
+    Devuelve {"total_filas", "creados", "errores": [{"fila", "errores"}]}.
+    """
+    filas = enumerate(leer_filas(archivo, nombre), start=2)  # la fila 1 son los encabezados
+    grupo_obj, _ = Group.objects.get_or_create(name=grupo)
+    existentes = list(Usuario.objects.values_list("username", "dni"))
+    asignador = AsignadorEnMemoria((u for u, _ in existentes), (d for _, d in existentes))
+    helpers = UsuarioSerializer()
+    hash_por_defecto = make_password(PASSWORD_POR_DEFECTO)
+    resultado = {"total_filas": 0, "creados": 0, "errores": []}
+
+    pool = ProcessPoolExecutor(max_workers=procesos) if procesos > 1 else None
+    try:
+        while True:
+            lote = list(islice(filas, tamanio_lote))
+            if not lote:
+                break
+            validos = []
+            for numero, datos in lote:
+                datos, errores = _validar_fila(datos, asignador, helpers)
+                if errores:
+                    resultado["errores"].append({"fila": numero, "errores": errores})
+                else:
+                    validos.append((numero, datos))
+            rechazadas = _insertar_lote(validos, grupo_obj, hash_por_defecto, pool) if validos else []
+            resultado["errores"].extend(rechazadas)
+            resultado["total_filas"] += len(lote)
+            resultado["creados"] += len(validos) - len(rechazadas)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if resultado["creados"]:
+        # bulk_create no dispara señales
+        invalidar_resumen()
+        versiones.incrementar(Usuario)
+        cache_api.invalidar(Usuario)
+    return resultado
@@ -0,0 +1,363 @@
+"""
+Instrumentación por request: consultas SQL, tiempos y tamaño de respuesta.
+
+`InstrumentacionMiddleware` mide cada request muestreado y publica el
+resultado de tres formas:
+
+- Encabezado `Server-Timing` (visible en la pestaña Network del navegador).
+- Un log estructurado (una línea JSON) en el logger `sis_app.instrumentacion`,
+  con nivel WARNING cuando detecta consultas repetidas (posible N+1).
+- Contadores acumulados en memoria que expone la vista `metricas` en formato
+  de texto de Prometheus (`/metrics`, sólo con el token de METRICAS_TOKEN).
+  Ahí también se publican los aciertos y fallos de la caché de la API.
+
+Cada registro lleva el ViewSet (o vista) y la acción que atendió el request.
+Las consultas se miden con `connection.execute_wrapper`, así que no hace falta
+DEBUG=True. La "serialización" es el tiempo de render de la respuesta DRF
+(JSONRenderer). En respuestas en streaming sólo se mide hasta que la vista
+devuelve el generador.
+
+Configuración en settings.INSTRUMENTACION (ver DEFAULTS). MUESTREO es la
+fracción de requests que se miden en detalle: los no muestreados sólo suman
+a la cantidad de requests y al histograma de duración.
+"""
+import hmac
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "MUESTREO": 0.1,           # 0.0 a 1.0
+    "SERVER_TIMING": True,
+    "LOG": True,
+    "UMBRAL_N_MAS_1": 5,       # repeticiones de una misma consulta para avisar
+    # /metrics exige "Authorization: Bearer <token>"; sin token configurado no responde.
+    # Detrás de un proxy REMOTE_ADDR es el del proxy: la IP sola no protege nada
+    "METRICAS_TOKEN": "",
+    "METRICAS_IPS": None,      # restricción adicional por IP (None: cualquiera)
+}
+RUTA_METRICAS = "/metrics"
+
+
+def configuracion():
+    return {**DEFAULTS, **getattr(settings, "INSTRUMENTACION", {})}
+
+
+# Listas de parámetros de largo variable (IN (%s, %s, ...)) cuentan como la misma consulta
+_LISTA_PARAMETROS = re.compile(r"\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def firma(sql):
+    """Forma normalizada de una consulta, para agrupar las que sólo cambian en los parámetros."""
+    return _ESPACIOS.sub(" ", _LISTA_PARAMETROS.sub("(...)", sql)).strip()
+
+
+class Medicion:
+    """Consultas y tiempos de un request. `registrar_consulta` es el execute_wrapper."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_serializacion = 0.0
+        self.firmas = Counter()
+
+    def registrar_consulta(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.firmas[firma(sql)] += 1
+
+    @property
+    def duplicadas(self):
+        """Consultas que repiten una firma ya ejecutada en el mismo request."""
+        return sum(n - 1 for n in self.firmas.values() if n > 1)
+
+    def sospechosas(self, umbral):
+        """Firmas repetidas al menos `umbral` veces (patrón típico de N+1)."""
+        return [(f, n) for f, n in self.firmas.most_common() if n >= umbral]
+
+
+# =====================================================
+#        REGISTRO DE MÉTRICAS (PROMETHEUS)
+# =====================================================
+class RegistroMetricas:
+    """
+    Contadores e histograma en memoria, por proceso. Con varios workers cada
+    uno expone los suyos (Prometheus los suma por instancia).
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.requests = defaultdict(int)            # (vista, accion, metodo, estado)
+            self.duracion = defaultdict(lambda: [0] * len(self.BUCKETS))  # (vista, accion, metodo)
+            self.duracion_suma = defaultdict(float)
+            self.duracion_cantidad = defaultdict(int)
+            self.muestreados = defaultdict(int)         # (vista, accion)
+            self.sql_consultas = defaultdict(int)
+            self.sql_segundos = defaultdict(float)
+            self.sql_duplicadas = defaultdict(int)
+            self.serializacion_segundos = defaultdict(float)
+            self.respuesta_bytes = defaultdict(int)
+            self.cache_aciertos = defaultdict(int)     # (espacio,)
+            self.cache_fallos = defaultdict(int)
+
+    def registrar(self, vista, accion, metodo, estado, duracion, medicion=None, tamanio=None):
+        with self._lock:
+            self.requests[(vista, accion, metodo, estado)] += 1
+            clave = (vista, accion, metodo)
+            for i, limite in enumerate(self.BUCKETS):
+                if duracion <= limite:
+                    self.duracion[clave][i] += 1
+            self.duracion_suma[clave] += duracion
+            self.duracion_cantidad[clave] += 1
+            if medicion is None:
+                return
+            clave = (vista, accion)
+            self.muestreados[clave] += 1
+            self.sql_consultas[clave] += medicion.consultas
+            self.sql_segundos[clave] += medicion.tiempo_sql
+            self.sql_duplicadas[clave] += medicion.duplicadas
+            self.serializacion_segundos[clave] += medicion.tiempo_serializacion
+            if tamanio is not None:
+                self.respuesta_bytes[clave] += tamanio
+
+    def registrar_cache(self, espacio, acierto):
+        """Acierto o fallo de la caché de la API (ver cache_api.py)."""
+        with self._lock:
+            (self.cache_aciertos if acierto else self.cache_fallos)[(espacio,)] += 1
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (0.0.4)."""
+        lineas = []
+
+        def etiquetas(nombres, valores, extra=""):
+            pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+            if extra:
+                pares.append(extra)
+            return "{" + ",".join(pares) + "}"
+
+        def contador(nombre, ayuda, datos, nombres):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} counter")
+            for clave, valor in sorted(datos.items()):
+                lineas.append(f"{nombre}{etiquetas(nombres, clave)} {valor}")
+
+        with self._lock:
+            contador("sis_http_requests_total", "Requests atendidos.", self.requests,
+                     ("vista", "accion", "metodo", "estado"))
+
+            nombre = "sis_http_duracion_segundos"
+            lineas.append(f"# HELP {nombre} Duración de los requests.")
+            lineas.append(f"# TYPE {nombre} histogram")
+            nombres = ("vista", "accion", "metodo")
+            for clave in sorted(self.duracion_cantidad):
+                limites = [*self.BUCKETS, "+Inf"]
+                cantidades = [*self.duracion[clave], self.duracion_cantidad[clave]]
+                for limite, cantidad in zip(limites, cantidades):
+                    le = f'le="{limite}"'
+                    lineas.append(f"{nombre}_bucket{etiquetas(nombres, clave, le)} {cantidad}")
+                cantidad = self.duracion_cantidad[clave]
+                lineas.append(f"{nombre}_sum{etiquetas(nombres, clave)} {self.duracion_suma[clave]}")
+                lineas.append(f"{nombre}_count{etiquetas(nombres, clave)} {cantidad}")
+
+            nombres = ("vista", "accion")
+            contador("sis_requests_muestreados_total", "Requests medidos en detalle.", self.muestreados, nombres)
+            contador("sis_sql_consultas_total", "Consultas SQL de los requests muestreados.",
+                     self.sql_consultas, nombres)
+            contador("sis_sql_duracion_segundos_total", "Tiempo en SQL de los requests muestreados.",
+                     self.sql_segundos, nombres)
+            contador("sis_sql_consultas_duplicadas_total", "Consultas repetidas dentro de un mismo request.",
+                     self.sql_duplicadas, nombres)
+            contador("sis_serializacion_segundos_total", "Tiempo de render de las respuestas muestreadas.",
+                     self.serializacion_segundos, nombres)
+            contador("sis_respuesta_bytes_total", "Bytes de las respuestas muestreadas.",
+                     self.respuesta_bytes, nombres)
+            contador("sis_cache_aciertos_total", "Lecturas resueltas desde la caché de la API.",
+                     self.cache_aciertos, ("espacio",))
+            contador("sis_cache_fallos_total", "Lecturas de la caché de la API que hubo que calcular.",
+                     self.cache_fallos, ("espacio",))
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro = RegistroMetricas()
+
+
+def metricas(request):
+    """Vista de /metrics para Prometheus; sólo responde con el token de METRICAS_TOKEN."""
+    config = configuracion()
+    token = config["METRICAS_TOKEN"]
+    recibido = request.META.get("HTTP_AUTHORIZATION", "").removeprefix("Bearer ")
+    if not token or not hmac.compare_digest(recibido.encode(), token.encode()):
+        return HttpResponseForbidden()
+    if config["METRICAS_IPS"] is not None and request.META.get("REMOTE_ADDR") not in config["METRICAS_IPS"]:
+        return HttpResponseForbidden()
+    return HttpResponse(registro.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# =====================================================
+#        MIDDLEWARE
+# =====================================================
+class InstrumentacionMiddleware:
+    """
+    Middleware sync y async: bajo ASGI no obliga a Django a pasar las vistas
+    async (lectura_async.py) a un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+            # Django pasa a un hilo los métodos sync del middleware de un handler async
+            self.process_template_response = self._aprocess_template_response
+
+    def __call__(self, request):
+        if self.es_async:
+            return self._acall(request)
+        if request.path == RUTA_METRICAS:
+            return self.get_response(request)
+
+        config = configuracion()
+        medicion = _iniciar_medicion(request, config)
+        inicio = time.perf_counter()
+        if medicion is None:
+            response = self.get_response(request)
+        else:
+            with _midiendo_sql(medicion):
+                response = self.get_response(request)
+        return _registrar(request, response, time.perf_counter() - inicio, medicion, config)
+
+    async def _acall(self, request):
+        if request.path == RUTA_METRICAS:
+            return await self.get_response(request)
+
+        config = configuracion()
+        medicion = _iniciar_medicion(request, config)
+        inicio = time.perf_counter()
+        if medicion is None:
+            response = await self.get_response(request)
+        else:
+            # Bajo ASGI las consultas de un request corren en un hilo propio del request
+            # (sync_to_async con thread_sensitive): el execute_wrapper se instala en ese hilo
+            medir = await sync_to_async(_midiendo_sql)(medicion)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(medir.close)()
+        return _registrar(request, response, time.perf_counter() - inicio, medicion, config)
+
+    def process_template_response(self, request, response):
+        # Las Response de DRF se renderizan después de la vista: se mide ese render
+        medicion = getattr(request, "_medicion", None)
+        if medicion is not None:
+            inicio = time.perf_counter()
+
+            def fin_render(r):
+                medicion.tiempo_serializacion += time.perf_counter() - inicio
+
+            response.add_post_render_callback(fin_render)
+        return response
+
+    async def _aprocess_template_response(self, request, response):
+        return InstrumentacionMiddleware.process_template_response(self, request, response)
+
+
+def _iniciar_medicion(request, config):
+    medicion = Medicion() if random.random() < config["MUESTREO"] else None
+    request._medicion = medicion
+    return medicion
+
+
+def _midiendo_sql(medicion):
+    """Instala el execute_wrapper en las conexiones del hilo actual; se quita al cerrar el ExitStack."""
+    stack = ExitStack()
+    for conexion in connections.all():
+        stack.enter_context(conexion.execute_wrapper(medicion.registrar_consulta))
+    return stack
+
+
+def _registrar(request, response, duracion, medicion, config):
+    vista, accion = _vista(request)
+    tamanio = None if response.streaming else len(response.content)
+    registro.registrar(vista, accion, request.method, response.status_code, duracion, medicion, tamanio)
+
+    if config["SERVER_TIMING"]:
+        response["Server-Timing"] = _server_timing(duracion, medicion)
+    if medicion is not None and config["LOG"]:
+        _loguear(request, response, vista, accion, duracion, medicion, tamanio, config["UMBRAL_N_MAS_1"])
+    return response
+
+
+def _vista(request):
+    """(vista, acción) que atendió el request, según la ruta resuelta."""
+    resolucion = getattr(request, "resolver_match", None)
+    if resolucion is None:
+        return "", ""
+    # as_view() de DRF deja la clase en .cls y, en los ViewSets, el mapa método -> acción en .actions
+    funcion = resolucion.func
+    clase = getattr(funcion, "cls", None)
+    vista = clase.__name__ if clase else getattr(funcion, "__name__", "")
+    metodo = request.method.lower()
+    accion = (getattr(funcion, "actions", None) or {}).get(metodo, metodo)
+    return vista, accion
+
+
+def _server_timing(duracion, medicion):
+    partes = []
+    if medicion is not None:
+        partes.append(
+            f'db;dur={medicion.tiempo_sql * 1000:.2f};'
+            f'desc="{medicion.consultas} consultas, {medicion.duplicadas} repetidas"'
+        )
+        partes.append(f"ser;dur={medicion.tiempo_serializacion * 1000:.2f}")
+        resto = duracion - medicion.tiempo_sql - medicion.tiempo_serializacion
+        partes.append(f"app;dur={max(resto, 0) * 1000:.2f}")
+    partes.append(f"total;dur={duracion * 1000:.2f}")
+    return ", ".join(partes)
+
+
+def _loguear(request, response, vista, accion, duracion, medicion, tamanio, umbral):
+    sospechosas = medicion.sospechosas(umbral)
+    datos = {
+        "metodo": request.method,
+        "ruta": request.path,
+        "vista": vista,
+        "accion": accion,
+        "estado": response.status_code,
+        "duracion_ms": round(duracion * 1000, 2),
+        "sql_consultas": medicion.consultas,
+        "sql_ms": round(medicion.tiempo_sql * 1000, 2),
+        "sql_duplicadas": medicion.duplicadas,
+        "serializacion_ms": round(medicion.tiempo_serializacion * 1000, 2),
+        "bytes": tamanio,
+    }
+    if sospechosas:
+        datos["n_mas_1"] = [{"firma": f[:300], "repeticiones": n} for f, n in sospechosas]
+    logger.log(logging.WARNING if sospechosas else logging.INFO, json.dumps(datos, ensure_ascii=False))
@@ -0,0 +1,185 @@
+"""
+Lectura async de los listados más consultados (cuotas de un socio, actividades).
+
+Los ViewSets de DRF son síncronos: bajo ASGI, Django atiende cada request a
+uno de ellos en un hilo propio, que queda tomado mientras espera a la base.
+`vista_listado` arma, para el listado de un ViewSet, una vista async que
+atiende los GET con el ORM async (acount(), async for) y devuelve la misma
+respuesta que la vista sync. Usa el mismo ViewSet para armar la consulta y
+la representación (get_queryset, filter_queryset, RepresentacionRapida,
+paginación), y el mismo ETag (versiones.py) y las mismas entradas de caché
+(cache_api.py) que la vista sync.
+
+Pasan sin cambios a la vista sync del router:
+- los otros métodos (POST, HEAD, OPTIONS),
+- los GET que no piden JSON (Browsable API, ?format=api),
+- los GET con alguno de los `parametros_sync` del listado (p. ej. los que
+  activan la paginación por cursor o el streaming),
+- los errores: autenticación, permisos, filtros inválidos, página inexistente.
+
+Bajo WSGI la vista async también funciona (Django la corre en un event loop
+por request), pero sólo aprovecha el modelo async bajo ASGI. Las consultas
+siguen ejecutándose en un hilo (los drivers de MySQL son síncronos), pero
+el hilo se ocupa sólo mientras dura cada consulta: los 304, los aciertos de
+caché y el armado de la respuesta no toman ninguno. La autenticación de
+estos ViewSets no consulta la base (ver autenticacion.py), así que corre en
+el event loop. `benchmark_concurrencia` compara WSGI y ASGI.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import cache_api, versiones
+from .cache_api import RespuestaCacheadaMixin
+from .versiones import RespuestaCondicionalMixin
+
+# Mismo mapa método -> acción que la ruta de listado del router
+ACCIONES = {"get": "list", "post": "create"}
+# El listado no se atiende acá: lo responde la vista sync
+DELEGAR = object()
+
+
+def vista_listado(viewset, parametros_sync=()):
+    """
+    Vista de la ruta de listado de `viewset`: GET async y el resto con la
+    vista sync. La paginación por número de página se resuelve acá; con otra
+    paginación, `parametros_sync` tiene que incluir los parámetros que la
+    activan (sin ellos se devuelve la lista completa).
+    """
+    delegar = sync_to_async(viewset.as_view(ACCIONES, detail=False))
+
+    @csrf_exempt
+    async def vista(request, *args, **kwargs):
+        if request.method == "GET":
+            response = await _listar(viewset, parametros_sync, request, args, kwargs)
+            if response is not DELEGAR:
+                return response
+        return await delegar(request, *args, **kwargs)
+
+    # Como en as_view(): la instrumentación lee de acá el ViewSet y la acción
+    vista.cls = viewset
+    vista.actions = ACCIONES
+    return vista
+
+
+async def _listar(viewset, parametros_sync, request, args, kwargs):
+    vista = _instanciar(viewset, request, args, kwargs)
+    drf_request = vista.request
+    try:
+        vista.initial(drf_request, *args, **kwargs)
+    except APIException:
+        return DELEGAR
+    if not isinstance(drf_request.accepted_renderer, JSONRenderer) or \
+            any(parametro in drf_request.query_params for parametro in parametros_sync):
+        return DELEGAR
+
+    validadores = None
+    if isinstance(vista, RespuestaCondicionalMixin):
+        estado = await versiones.aversiones(vista.modelos_version)
+        validadores = versiones.validadores(drf_request, vista.modelos_version, estado)
+        no_modificado = get_conditional_response(drf_request, etag=validadores[0], last_modified=validadores[1])
+        if no_modificado is not None:
+            return versiones.con_validadores(vista.finalize_response(drf_request, no_modificado), *validadores)
+
+    try:
+        datos = await _datos_cacheados(vista, drf_request)
+    except APIException:
+        # Filtros inválidos: la vista sync responde el error
+        return DELEGAR
+    if datos is DELEGAR:
+        return DELEGAR
+    response = _renderizar(vista, request, Response(datos))
+    if validadores is not None:
+        versiones.con_validadores(response, *validadores)
+    return response
+
+
+def _instanciar(viewset, request, args, kwargs):
+    """El ViewSet listo para el listado, como lo deja as_view() antes de dispatch()."""
+    vista = viewset(detail=False)
+    vista.action_map = {**ACCIONES, "head": ACCIONES["get"]}
+    for metodo, accion in vista.action_map.items():
+        setattr(vista, metodo, getattr(vista, accion))
+    vista.args = args
+    vista.kwargs = kwargs
+    vista.request = vista.initialize_request(request, *args, **kwargs)
+    vista.headers = vista.default_response_headers
+    return vista
+
+
+async def _datos_cacheados(vista, request):
+    if not isinstance(vista, RespuestaCacheadaMixin) or not cache_api.configuracion()["ACTIVO"] \
+            or not vista.cachear_listado(request):
+        return await _datos(vista, request)
+    clave_entrada = await cache_api.aclave(vista.nombre_cache(request), vista.modelos_version)
+    datos = await cache_api.aleer(vista.espacio_cache(), clave_entrada)
+    if datos is cache_api.FALTA:
+        datos = await _datos(vista, request)
+        if datos is not DELEGAR:
+            await cache_api.aguardar(clave_entrada, datos)
+    return datos
+
+
+async def _datos(vista, request):
+    """Los mismos datos que arma ListadoRapidoMixin.list (o la lista completa de cuotas)."""
+    queryset, representar = vista.representacion_listado(vista.filter_queryset(vista.get_queryset()))
+    paginador = vista.paginator
+    if isinstance(paginador, PageNumberPagination):
+        filas = await _pagina(paginador, queryset, request)
+        if filas is DELEGAR:
+            return DELEGAR
+        if filas is not None:
+            return paginador.get_paginated_response([representar(fila) for fila in filas]).data
+    return [representar(fila) async for fila in queryset]
+
+
+async def _pagina(paginador, queryset, request):
+    """
+    Como PageNumberPagination.paginate_queryset, con el COUNT y la página
+    leídos en async. None si el listado no se pagina.
+    """
+    tamanio = paginador.get_page_size(request)
+    if not tamanio:
+        return None
+    paginator = paginador.django_paginator_class(queryset, tamanio)
+    # count es un cached_property: con el valor ya cargado, page() no consulta
+    paginator.count = await queryset.acount()
+    numero = request.query_params.get(paginador.page_query_param) or 1
+    if numero in paginador.last_page_strings:
+        numero = paginator.num_pages
+    try:
+        pagina = paginator.page(numero)
+    except InvalidPage:
+        # La vista sync responde el 404 con el mensaje de DRF
+        return DELEGAR
+    pagina.object_list = [fila async for fila in pagina.object_list]
+    if paginator.num_pages > 1 and paginador.template is not None:
+        paginador.display_page_controls = True
+    paginador.page = pagina
+    paginador.request = request
+    return pagina.object_list
+
+
+def _renderizar(vista, request, response):
+    """
+    Response de DRF renderizada en el event loop. Se devuelve como
+    HttpResponse: si no, el handler de Django la renderiza en un hilo.
+    """
+    response = vista.finalize_response(vista.request, response)
+    inicio = time.perf_counter()
+    response.render()
+    medicion = getattr(request, "_medicion", None)
+    if medicion is not None:
+        medicion.tiempo_serializacion += time.perf_counter() - inicio
+    renderizada = HttpResponse(response.content, status=response.status_code, headers=response.headers)
+    # Como en las Response de DRF, los datos sin renderizar quedan en .data
+    renderizada.data = response.data
+    return renderizada
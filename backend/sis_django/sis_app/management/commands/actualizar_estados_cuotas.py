@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from sis_app.estado_cuotas import actualizar_estados
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa a 'atrasada' las cuotas pendientes ya vencidas (y a 'pendiente' las "
+        "atrasadas con vencimiento futuro). Pensado para cron; con --cada queda "
+        "corriendo como planificador local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cada", type=int, metavar="SEGUNDOS",
+            help="Repetir la actualización cada tantos segundos en lugar de ejecutarla una vez.",
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options["cada"]
+        if intervalo is not None and intervalo <= 0:
+            raise CommandError("--cada debe ser mayor a cero.")
+
+        while True:
+            movidas = actualizar_estados()
+            self.stdout.write(self.style.SUCCESS(
+                f"{movidas['vencidas']} cuotas vencidas, {movidas['prorrogadas']} vuelven a pendiente."
+            ))
+            if intervalo is None:
+                return
+            close_old_connections()
+            time.sleep(intervalo)
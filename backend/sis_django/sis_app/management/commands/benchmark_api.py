@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sis_app import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p95), CPU, consultas SQL y pico de memoria de los endpoints de la API "
+        "y los compara con la línea base guardada. Falla si hay regresiones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iteraciones", type=int, default=benchmark.ITERACIONES)
+        parser.add_argument("--escenario", help="Sólo los escenarios cuyo nombre contenga este texto.")
+        parser.add_argument("--baseline", default=str(benchmark.BASELINE_POR_DEFECTO), help="Archivo JSON de la línea base.")
+        parser.add_argument("--tolerancia", type=float, default=benchmark.TOLERANCIA,
+                            help="Margen relativo admitido en latencia y memoria (0.5 = 50%%).")
+        parser.add_argument("--solo-consultas", action="store_true",
+                            help="Comparar sólo estado HTTP y cantidad de consultas (útil en otra máquina).")
+        parser.add_argument("--con-cache", action="store_true",
+                            help="Medir con la caché de la API encendida (por defecto se mide el cálculo).")
+        parser.add_argument("--guardar-baseline", action="store_true",
+                            help="Guardar los resultados como nueva línea base en lugar de comparar.")
+
+    def handle(self, *args, **options):
+        resultados = benchmark.ejecutar(
+            options["iteraciones"], filtro=options["escenario"], con_cache=options["con_cache"],
+        )
+
+        self.stdout.write(f"{'escenario':32} {'estado':>6} {'consultas':>9} {'p50 ms':>9} {'p95 ms':>9} {'CPU ms':>9} {'mem KB':>9}")
+        for nombre, r in resultados.items():
+            self.stdout.write(
+                f"{nombre:32} {r['estado']:>6} {r['consultas']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['cpu_ms']:>9} {r['memoria_kb']:>9}"
+            )
+
+        if options["guardar_baseline"]:
+            benchmark.guardar_baseline(
+                resultados, options["baseline"], iteraciones=options["iteraciones"], volumen=benchmark.volumen(),
+            )
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {options['baseline']}."))
+            return
+
+        try:
+            base = benchmark.cargar_baseline(options["baseline"])
+        except OSError as e:
+            raise CommandError(f"No se pudo leer la línea base: {e}")
+        regresiones = benchmark.comparar(
+            resultados, base, tolerancia=options["tolerancia"], solo_consultas=options["solo_consultas"],
+        )
+        if regresiones:
+            for regresion in regresiones:
+                self.stderr.write(regresion)
+            raise CommandError(f"{len(regresiones)} regresiones frente a la línea base.")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones frente a la línea base."))
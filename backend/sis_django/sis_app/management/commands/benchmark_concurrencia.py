@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sis_app import benchmark_concurrencia
+
+
+def _enteros(valor):
+    try:
+        return [int(parte) for parte in valor.split(",") if parte.strip()]
+    except ValueError:
+        raise CommandError("--clientes debe ser una lista de enteros separados por comas.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el throughput de los listados de cuotas por socio y de actividades atendidos "
+        "por el handler WSGI (sync) y por el ASGI (async) con cientos de clientes concurrentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clientes", default=",".join(str(c) for c in benchmark_concurrencia.CLIENTES),
+                            help="Cantidades de clientes concurrentes, separadas por comas.")
+        parser.add_argument("--duracion", type=float, default=benchmark_concurrencia.DURACION,
+                            help="Segundos de cada medición.")
+        parser.add_argument("--modo", choices=benchmark_concurrencia.MODOS, action="append",
+                            help="Medir sólo este modo (se puede repetir).")
+        parser.add_argument("--hilos-wsgi", type=int, default=benchmark_concurrencia.HILOS_WSGI,
+                            help="Threads del servidor WSGI simulado.")
+        parser.add_argument("--latencia-db", type=float, default=0.0,
+                            help="Milisegundos de espera agregados a cada consulta (ida y vuelta a MySQL).")
+        parser.add_argument("--escenario", help="Sólo los escenarios cuyo nombre contenga este texto.")
+        parser.add_argument("--con-cache", action="store_true",
+                            help="Medir con la caché de la API encendida (por defecto se mide el cálculo).")
+
+    def handle(self, *args, **options):
+        clientes = _enteros(options["clientes"])
+        if not clientes or min(clientes) < 1:
+            raise CommandError("--clientes debe tener al menos una cantidad positiva.")
+        resultados = benchmark_concurrencia.ejecutar(
+            clientes=clientes,
+            duracion=options["duracion"],
+            modos=options["modo"] or benchmark_concurrencia.MODOS,
+            hilos_wsgi=options["hilos_wsgi"],
+            latencia_db_ms=options["latencia_db"],
+            filtro=options["escenario"],
+            con_cache=options["con_cache"],
+        )
+        if not resultados:
+            raise CommandError("No hay escenarios para medir (¿faltan datos? ver generar_datos_prueba).")
+
+        self.stdout.write(
+            f"{'escenario':14} {'modo':5} {'clientes':>8} {'requests':>9} {'req/s':>9} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}"
+        )
+        for r in resultados:
+            self.stdout.write(
+                f"{r['escenario']:14} {r['modo']:5} {r['clientes']:>8} {r['requests']:>9} {r['rps']:>9} "
+                f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['errores']:>8}"
+            )
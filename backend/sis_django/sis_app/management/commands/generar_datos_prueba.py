@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sis_app.datos_sinteticos import generar_datos
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos (socios, staff, actividades, inscripciones, cuotas y "
+        "compensaciones) con INSERTs masivos, para pruebas de carga y benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socios", type=int, default=50000)
+        parser.add_argument("--actividades", type=int, default=500)
+        parser.add_argument("--meses", type=int, default=12, help="Períodos de cuotas, hasta el mes actual.")
+        parser.add_argument("--semilla", type=int, default=2025, help="Semilla del generador aleatorio.")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        creados = generar_datos(
+            socios=options["socios"],
+            actividades=options["actividades"],
+            meses=options["meses"],
+            semilla=options["semilla"],
+        )
+        for modelo, cantidad in creados.items():
+            self.stdout.write(f"{modelo}: {cantidad}")
+        self.stdout.write(self.style.SUCCESS(f"Datos generados en {time.perf_counter() - inicio:.1f} s."))
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sis_app.importacion import importar_socios, ErrorImportacion, TAMANIO_LOTE
+
+
+class Command(BaseCommand):
+    help = "Importa usuarios desde un archivo CSV o XLSX (por defecto, como socios)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta al archivo .csv o .xlsx")
+        parser.add_argument("--grupo", default="socio", choices=["admin", "staff", "socio"])
+        parser.add_argument("--procesos", type=int, help="Procesos para hashear contraseñas (por defecto, CPUs).")
+        parser.add_argument("--lote", type=int, default=TAMANIO_LOTE, help="Filas por lote/commit.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["archivo"], "rb") as archivo:
+                resultado = importar_socios(
+                    archivo,
+                    options["archivo"],
+                    grupo=options["grupo"],
+                    procesos=options["procesos"] or os.cpu_count(),
+                    tamanio_lote=options["lote"],
+                )
+        except (OSError, ErrorImportacion) as e:
+            raise CommandError(str(e))
+
+        for error in resultado["errores"]:
+            detalle = "; ".join(f"{campo}: {msg}" for campo, msg in error["errores"].items())
+            self.stderr.write(f"Fila {error['fila']}: {detalle}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['creados']} de {resultado['total_filas']} filas importadas "
+            f"({len(resultado['errores'])} con errores)."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sis_app.subida_comprobantes import limpiar_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las subidas de comprobantes por partes que no recibieron partes nuevas "
+        "en COMPROBANTES['VENCIMIENTO'] segundos, junto con sus archivos parciales."
+    )
+
+    def handle(self, *args, **options):
+        borradas = limpiar_vencidas()
+        self.stdout.write(self.style.SUCCESS(f"{borradas} subidas vencidas borradas."))
@@ -0,0 +1,39 @@
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from sis_app.compensaciones import PORCENTAJE_STAFF, liquidar
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula las compensaciones del staff de un mes a partir de lo cobrado en "
+        "cada actividad y las crea o actualiza. Por defecto liquida el mes anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mes", type=int)
+        parser.add_argument("--anio", type=int)
+        parser.add_argument("--porcentaje", default=str(PORCENTAJE_STAFF),
+                            help="Fracción de lo cobrado que corresponde al staff (0 a 1).")
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        anterior = hoy.replace(day=1) - timedelta(days=1)
+        mes = options["mes"] or anterior.month
+        anio = options["anio"] or anterior.year
+        if not 1 <= mes <= 12:
+            raise CommandError("--mes debe estar entre 1 y 12.")
+        try:
+            porcentaje = Decimal(options["porcentaje"])
+        except InvalidOperation:
+            raise CommandError("--porcentaje debe ser un número.")
+        if not 0 < porcentaje <= 1:
+            raise CommandError("--porcentaje debe estar entre 0 y 1.")
+
+        resultado = liquidar(mes, anio, porcentaje)
+        self.stdout.write(self.style.SUCCESS(
+            f"Período {resultado['periodo']}: {resultado['cantidad']} compensaciones, total {resultado['total']}."
+        ))
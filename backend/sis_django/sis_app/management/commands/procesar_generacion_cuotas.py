@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sis_app.generacion_cuotas import abandonadas, procesar_job, TAMANIO_LOTE
+from sis_app.models import GeneracionCuotasJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa las corridas de generación de cuotas pendientes o interrumpidas, "
+        "reanudando cada una desde su último lote confirmado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--job", type=int, help="Procesar sólo esta corrida (id).")
+        parser.add_argument("--lote", type=int, default=TAMANIO_LOTE, help="Socios por lote/commit.")
+        parser.add_argument(
+            "--reintentar-errores",
+            action="store_true",
+            help="Incluir también las corridas que terminaron con error.",
+        )
+        parser.add_argument(
+            "--abandonadas",
+            action="store_true",
+            help=(
+                "Sólo las pendientes o en proceso que no avanzan hace más de "
+                "generacion_cuotas.ABANDONO (para el arranque del servidor o cron: "
+                "no toma las que está procesando un worker)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        estados = [GeneracionCuotasJob.EstadoJob.PENDIENTE, GeneracionCuotasJob.EstadoJob.EN_PROCESO]
+        if options["reintentar_errores"]:
+            estados.append(GeneracionCuotasJob.EstadoJob.ERROR)
+
+        jobs = GeneracionCuotasJob.objects.filter(estado__in=estados).order_by("id")
+        if options["abandonadas"]:
+            jobs = jobs.filter(pk__in=abandonadas())
+        if options["job"]:
+            jobs = jobs.filter(pk=options["job"])
+            if not jobs.exists():
+                raise CommandError(f"No hay una corrida pendiente con id {options['job']}.")
+
+        for job_id in jobs.values_list("id", flat=True):
+            try:
+                job = procesar_job(job_id, tamanio_lote=options["lote"])
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Corrida {job_id}: {e}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"Corrida {job.id} ({job.periodo_mes}/{job.periodo_anio}): "
+                f"{job.cuotas_creadas} cuotas creadas, {job.socios_procesados} socios procesados."
+            ))
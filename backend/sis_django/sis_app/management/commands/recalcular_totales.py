@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from sis_app.models import Cuota
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula en bloque los totales desnormalizados de las cuotas "
+        "(valor_actividades y valor_total) a partir de sus inscripciones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=5000, help="Cuotas por UPDATE/commit.")
+        parser.add_argument("--periodo-mes", type=int, help="Limitar a un mes (1-12).")
+        parser.add_argument("--periodo-anio", type=int, help="Limitar a un año.")
+
+    def handle(self, *args, **options):
+        cuotas = Cuota.objects.all()
+        if options["periodo_mes"]:
+            cuotas = cuotas.filter(periodo_mes=options["periodo_mes"])
+        if options["periodo_anio"]:
+            cuotas = cuotas.filter(periodo_anio=options["periodo_anio"])
+
+        # Rangos de ids para que cada UPDATE sea una transacción corta
+        actualizadas = 0
+        ultimo_id = 0
+        while True:
+            ids = list(
+                cuotas.filter(pk__gt=ultimo_id).order_by("pk").values_list("pk", flat=True)[:options["lote"]]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                actualizadas += Cuota.recalcular_totales(cuotas.filter(pk__gt=ultimo_id, pk__lte=ids[-1]))
+            ultimo_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Totales recalculados en {actualizadas} cuotas."))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sis_app', '0007_alter_inscripcion_actividad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionCuotasJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo_mes', models.IntegerField(help_text='Mes del período (1-12)')),
+                ('periodo_anio', models.IntegerField(help_text='Año del período')),
+                ('valor_base', models.DecimalField(decimal_places=2, help_text='Pesos Argentinos (cuota social)', max_digits=10)),
+                ('fecha_vencimiento', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('ultimo_socio_id', models.BigIntegerField(default=0, help_text='Último socio procesado (punto de control)')),
+                ('socios_procesados', models.IntegerField(default=0)),
+                ('cuotas_creadas', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
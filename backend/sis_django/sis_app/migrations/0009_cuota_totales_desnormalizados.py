@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:17
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_totales(apps, schema_editor):
+    """Completa los totales de las cuotas existentes (antes eran @property)."""
+    Cuota = apps.get_model('sis_app', 'Cuota')
+    decimal = DecimalField(max_digits=10, decimal_places=2)
+    suma_cargos = Subquery(
+        Cuota.inscripciones.through.objects
+        .filter(cuota_id=OuterRef('pk'))
+        .values('cuota_id')
+        .annotate(total=Sum('inscripcion__actividad__cargo_inscripcion'))
+        .values('total'),
+        output_field=decimal,
+    )
+    valor_actividades = Coalesce(suma_cargos, Value(0), output_field=decimal)
+    Cuota.objects.update(
+        valor_actividades=valor_actividades,
+        valor_total=F('valor_base') + valor_actividades,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sis_app', '0008_generacioncuotasjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuota',
+            name='valor_actividades',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Suma de cargos de las actividades inscritas', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='cuota',
+            name='valor_total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Valor base + actividades', max_digits=10),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('sis_app', '0009_cuota_totales_desnormalizados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(fields=['estado', 'usuario_staff'], name='actividad_estado_staff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(fields=['estado', 'fecha_hora_inicio'], name='actividad_estado_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compensacionstaff',
+            index=models.Index(fields=['periodo'], name='compensacion_periodo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(fields=['estado'], name='cuota_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(fields=['usuario_socio', 'estado'], name='cuota_socio_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(fields=['-periodo_anio', '-periodo_mes', '-fecha_vencimiento'], name='cuota_ordering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(fields=['fecha_vencimiento', 'id'], name='cuota_vencimiento_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(fields=['periodo_anio', 'periodo_mes', 'estado', 'valor_total'], name='cuota_periodo_totales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscripcion',
+            index=models.Index(fields=['usuario_socio', 'estado'], name='inscripcion_socio_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscripcion',
+            index=models.Index(fields=['actividad', 'estado'], name='inscripcion_activ_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['estado'], name='usuario_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def separar_no_vencidas(apps, schema_editor):
+    # Las cuotas impagas que todavía no vencen dejan de figurar como atrasadas
+    Cuota = apps.get_model('sis_app', 'Cuota')
+    Cuota.objects.filter(estado='atrasada', fecha_vencimiento__gte=timezone.now()).update(estado='pendiente')
+
+
+def unir_no_vencidas(apps, schema_editor):
+    Cuota = apps.get_model('sis_app', 'Cuota')
+    Cuota.objects.filter(estado='pendiente').update(estado='atrasada')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sis_app', '0010_indices_patrones_de_filtro'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cuota',
+            name='estado',
+            field=models.CharField(choices=[('al_dia', 'Al día'), ('pendiente', 'Pendiente (no vencida)'), ('atrasada', 'Atrasada'), ('pendiente_revision', 'Pendiente de Revisión')], default='pendiente', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(fields=['estado', 'fecha_vencimiento'], name='cuota_estado_vencimiento_idx'),
+        ),
+        migrations.RunPython(separar_no_vencidas, unir_no_vencidas),
+    ]
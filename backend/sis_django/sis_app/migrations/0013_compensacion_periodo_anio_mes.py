@@ -0,0 +1,113 @@
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6, 'julio': 7,
+    'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+}
+
+
+def _separar(periodo):
+    """(año, mes) de los formatos cargados a mano: 2025-03, 2025/3, 03/2025, Marzo 2025."""
+    texto = periodo.strip().lower()
+    coincidencia = re.fullmatch(r'(\d{4})\s*[-/.]\s*(\d{1,2})', texto)
+    if coincidencia:
+        return int(coincidencia[1]), int(coincidencia[2])
+    coincidencia = re.fullmatch(r'(\d{1,2})\s*[-/.]\s*(\d{4})', texto)
+    if coincidencia:
+        return int(coincidencia[2]), int(coincidencia[1])
+    coincidencia = re.fullmatch(r'([a-z]+)\s*(?:de\s+)?(\d{4})', texto)
+    if coincidencia and coincidencia[1] in MESES:
+        return int(coincidencia[2]), MESES[coincidencia[1]]
+    return None
+
+
+def separar_periodos(apps, schema_editor):
+    CompensacionStaff = apps.get_model('sis_app', 'CompensacionStaff')
+    por_clave = defaultdict(list)
+    invalidas = []
+    for compensacion in CompensacionStaff.objects.order_by('pk'):
+        separado = _separar(compensacion.periodo)
+        if separado is None or not 1 <= separado[1] <= 12:
+            invalidas.append(f'{compensacion.pk}: {compensacion.periodo!r}')
+            continue
+        compensacion.periodo_anio, compensacion.periodo_mes = separado
+        por_clave[(compensacion.usuario_staff_id, compensacion.actividad_id, *separado)].append(compensacion)
+    if invalidas:
+        raise RuntimeError(
+            'Compensaciones con período no reconocido (corregirlas a AAAA-MM y volver a migrar): '
+            + ', '.join(invalidas)
+        )
+
+    # Las cargas repetidas del mismo staff, actividad y mes se suman en la primera
+    actualizar, borrar = [], []
+    for compensaciones in por_clave.values():
+        primera, *resto = compensaciones
+        primera.monto = sum((c.monto for c in compensaciones), primera.monto * 0)
+        actualizar.append(primera)
+        borrar.extend(c.pk for c in resto)
+    CompensacionStaff.objects.bulk_update(actualizar, ['periodo_anio', 'periodo_mes', 'monto'], batch_size=1000)
+    CompensacionStaff.objects.filter(pk__in=borrar).delete()
+
+
+def unir_periodos(apps, schema_editor):
+    CompensacionStaff = apps.get_model('sis_app', 'CompensacionStaff')
+    compensaciones = list(CompensacionStaff.objects.all())
+    for compensacion in compensaciones:
+        compensacion.periodo = f'{compensacion.periodo_anio}-{compensacion.periodo_mes:02d}'
+    CompensacionStaff.objects.bulk_update(compensaciones, ['periodo'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sis_app', '0012_version_tabla'),
+    ]
+
+    operations = [
+        # Nullable hasta quitarla: al revertir, la columna se vuelve a crear vacía y la completa unir_periodos
+        migrations.AlterField(
+            model_name='compensacionstaff',
+            name='periodo',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='compensacionstaff',
+            name='periodo_anio',
+            field=models.PositiveSmallIntegerField(null=True, help_text='Año del período'),
+        ),
+        migrations.AddField(
+            model_name='compensacionstaff',
+            name='periodo_mes',
+            field=models.PositiveSmallIntegerField(null=True, help_text='Mes del período (1-12)'),
+        ),
+        migrations.RunPython(separar_periodos, unir_periodos),
+        migrations.AlterField(
+            model_name='compensacionstaff',
+            name='periodo_anio',
+            field=models.PositiveSmallIntegerField(help_text='Año del período'),
+        ),
+        migrations.AlterField(
+            model_name='compensacionstaff',
+            name='periodo_mes',
+            field=models.PositiveSmallIntegerField(help_text='Mes del período (1-12)'),
+        ),
+        migrations.RemoveIndex(
+            model_name='compensacionstaff',
+            name='compensacion_periodo_idx',
+        ),
+        migrations.RemoveField(
+            model_name='compensacionstaff',
+            name='periodo',
+        ),
+        migrations.AddIndex(
+            model_name='compensacionstaff',
+            index=models.Index(fields=['periodo_anio', 'periodo_mes'], name='compensacion_periodo_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='compensacionstaff',
+            unique_together={('usuario_staff', 'actividad', 'periodo_anio', 'periodo_mes')},
+        ),
+    ]
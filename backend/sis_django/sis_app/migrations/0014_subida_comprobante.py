@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:26
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sis_app', '0013_compensacion_periodo_anio_mes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaComprobante',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre', models.CharField(help_text='Nombre del archivo original', max_length=255)),
+                ('tamanio', models.PositiveIntegerField(help_text='Tamaño declarado en bytes')),
+                ('recibidos', models.PositiveIntegerField(default=0, help_text='Bytes ya escritos en disco')),
+                ('tipo', models.CharField(blank=True, help_text='pdf, jpg o png, según los primeros bytes', max_length=4)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('cuota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas', to='sis_app.cuota')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha_actualizacion'], name='subida_actualizacion_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:31
+
+import sis_app.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sis_app', '0014_subida_comprobante'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoComprobante',
+            fields=[
+                ('nombre', models.CharField(help_text='comprobantes/ab/<sha256>.<ext>', max_length=100, primary_key=True, serialize=False)),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('tamanio', models.PositiveIntegerField(help_text='Bytes')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='cuota',
+            name='comprobante',
+            field=models.FileField(blank=True, help_text='Comprobante de pago (PDF, JPG, PNG)', null=True, storage=sis_app.almacenamiento.ComprobanteStorage(), upload_to='comprobantes/'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+def marcar_activas(apps, schema_editor):
+    # Si hay varias corridas sin terminar del mismo período, la activa es la más nueva
+    GeneracionCuotasJob = apps.get_model('sis_app', 'GeneracionCuotasJob')
+    activas = {}
+    for job in GeneracionCuotasJob.objects.filter(estado__in=['pendiente', 'en_proceso']).order_by('pk'):
+        activas[f'{job.periodo_anio:04d}-{job.periodo_mes:02d}'] = job.pk
+    for periodo, pk in activas.items():
+        GeneracionCuotasJob.objects.filter(pk=pk).update(periodo_activo=periodo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sis_app', '0015_comprobantes_por_contenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generacioncuotasjob',
+            name='periodo_activo',
+            field=models.CharField(blank=True, editable=False, max_length=7, null=True, unique=True),
+        ),
+        migrations.RunPython(marcar_activas, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils.functional import cached_property
+
+from .almacenamiento import ComprobanteStorage
 
 """
 # La clase AbstractUser provee automáticamente los campos:
@@ -38,21 +43,40 @@ class Usuario(AbstractUser):
         default=EstadoUsuario.ACTIVO
     )
 
+    @cached_property # Se calcula una vez por instancia y queda guardado en self.__dict__
+    def roles(self):
+        """Nombres de los grupos del usuario. Usa el prefetch de 'groups' si existe."""
+        if self.pk is None:
+            return frozenset()
+        if 'groups' in getattr(self, '_prefetched_objects_cache', {}):
+            return frozenset(g.name for g in self.groups.all())
+        return frozenset(self.groups.values_list('name', flat=True))
+
+    def invalidar_roles(self):
+        """Descarta los roles cacheados (se llama al cambiar los grupos, ver signals.py)."""
+        self.__dict__.pop('roles', None)
+        getattr(self, '_prefetched_objects_cache', {}).pop('groups', None)
+
     @property # Decorador: el método se accede como campo, por más que sea un método.
     def es_admin(self):
-        return self.groups.filter(name='admin').exists()
+        return 'admin' in self.roles
     
     @property
     def es_staff(self):
-        return self.groups.filter(name='staff').exists()
+        return 'staff' in self.roles
     
     @property
     def es_socio(self):
-        return self.groups.filter(name='socio').exists()
+        return 'socio' in self.roles
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['estado'], name='usuario_estado_idx'),
+        ]
+
 class Actividad(models.Model):
     class EstadoActividad(models.TextChoices):
         ACTIVA     = 'activa', 'Activa'
@@ -74,11 +98,22 @@ class Actividad(models.Model):
 
     @property
     def cantidad_inscriptos(self):
+        # Si el queryset ya anotó el conteo (ver actividades_con_inscriptos en views.py) no se consulta
+        if 'num_inscriptos' in self.__dict__:
+            return self.num_inscriptos
         return self.inscripciones.filter(estado='confirmada').count()
 
     def __str__(self):
         return f"{self.nombre} - {self.usuario_staff.first_name}"
 
+    class Meta:
+        indexes = [
+            # ?estado=&usuario_staff= del listado
+            models.Index(fields=['estado', 'usuario_staff'], name='actividad_estado_staff_idx'),
+            # Próximas actividades del dashboard (estado + rango de inicio)
+            models.Index(fields=['estado', 'fecha_hora_inicio'], name='actividad_estado_inicio_idx'),
+        ]
+
 class Inscripcion(models.Model):
     class EstadoInscripcion(models.TextChoices):
         CONFIRMADA = 'confirmada', 'Confirmada'
@@ -96,9 +131,16 @@ class Inscripcion(models.Model):
     def __str__(self):
         return f"Inscripción de usuario {self.usuario_socio} a actividad {self.actividad}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario_socio', 'estado'], name='inscripcion_socio_estado_idx'),
+            models.Index(fields=['actividad', 'estado'], name='inscripcion_activ_estado_idx'),
+        ]
+
 class Cuota(models.Model):
     class EstadoCuota(models.TextChoices):
         AL_DIA = "al_dia", "Al día"
+        PENDIENTE = "pendiente", "Pendiente (no vencida)"
         ATRASADA = "atrasada", "Atrasada"
         PENDIENTE_REVISION = "pendiente_revision", "Pendiente de Revisión"
     
@@ -106,16 +148,24 @@ class Cuota(models.Model):
     fecha_pago        = models.DateTimeField(null=True, blank=True)
     valor_base        = models.DecimalField(max_digits=10, decimal_places=2, help_text="Pesos Argentinos (cuota social)")
     usuario_socio     = models.ForeignKey(Usuario, on_delete=models.PROTECT, related_name="cuotas")
-    estado            = models.CharField(max_length=20, choices=EstadoCuota.choices, default=EstadoCuota.ATRASADA)
-    comprobante       = models.FileField(upload_to='comprobantes/', null=True, blank=True, help_text="Comprobante de pago (PDF, JPG, PNG)")
+    estado            = models.CharField(max_length=20, choices=EstadoCuota.choices, default=EstadoCuota.PENDIENTE)
+    comprobante       = models.FileField(upload_to='comprobantes/', storage=ComprobanteStorage(), null=True, blank=True, help_text="Comprobante de pago (PDF, JPG, PNG)")
     
     # Nuevos campos para rastrear inscripciones
     inscripciones     = models.ManyToManyField('Inscripcion', blank=True, related_name='cuotas', help_text="Inscripciones incluidas en esta cuota")
     periodo_mes       = models.IntegerField(null=True, blank=True, help_text="Mes del período (1-12)")
     periodo_anio      = models.IntegerField(null=True, blank=True, help_text="Año del período")
 
+    # Totales desnormalizados: se recalculan en signals.py cuando cambian las
+    # inscripciones de la cuota o el cargo de alguna actividad.
+    valor_actividades = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Suma de cargos de las actividades inscritas")
+    valor_total       = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Valor base + actividades")
+
     @property
     def dias_atraso(self):
+        # Si el queryset ya anotó el atraso (ver estado_cuotas.con_dias_atraso) no se calcula
+        if 'dias_atraso_db' in self.__dict__:
+            return self.dias_atraso_db
         from django.utils import timezone
         if self.fecha_pago:
             return 0
@@ -124,21 +174,38 @@ class Cuota(models.Model):
             return delta.days
         return 0
     
-    @property
-    def valor_actividades(self):
-        """Calcula el total de las actividades inscritas"""
-        from decimal import Decimal
-        total = Decimal('0.00')
-        for inscripcion in self.inscripciones.all():
-            if inscripcion.actividad and inscripcion.actividad.cargo_inscripcion:
-                total += inscripcion.actividad.cargo_inscripcion
-        return total
-    
-    @property
-    def valor_total(self):
-        """Calcula el valor total de la cuota (base + actividades)"""
-        return self.valor_base + self.valor_actividades
-    
+    @classmethod
+    def recalcular_totales(cls, queryset=None):
+        """
+        Recalcula valor_actividades/valor_total de las cuotas del queryset
+        (todas por defecto) con un único UPDATE basado en una subconsulta.
+        """
+        from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+        from django.db.models.functions import Coalesce
+        if queryset is None:
+            queryset = cls.objects.all()
+        suma_cargos = Subquery(
+            cls.inscripciones.through.objects
+            .filter(cuota_id=OuterRef('pk'))
+            .values('cuota_id')
+            .annotate(total=Sum('inscripcion__actividad__cargo_inscripcion'))
+            .values('total'),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+        valor_actividades = Coalesce(suma_cargos, Value(0), output_field=DecimalField(max_digits=10, decimal_places=2))
+        return queryset.update(
+            valor_actividades=valor_actividades,
+            valor_total=F('valor_base') + valor_actividades,
+        )
+
+    def save(self, *args, **kwargs):
+        # valor_total siempre acompaña a valor_base; valor_actividades lo mantienen las señales
+        self.valor_total = self.valor_base + (self.valor_actividades or 0)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'valor_base' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'valor_total'}
+        super().save(*args, **kwargs)
+
     @property
     def periodo(self):
         """Retorna el período en formato legible"""
@@ -154,12 +221,132 @@ class Cuota(models.Model):
     class Meta:
         ordering = ['-periodo_anio', '-periodo_mes', '-fecha_vencimiento']
         unique_together = [['usuario_socio', 'periodo_mes', 'periodo_anio']]
+        indexes = [
+            models.Index(fields=['estado'], name='cuota_estado_idx'),
+            # Motor de vencimientos y morosidad por antigüedad. No reemplaza al
+            # anterior: ése entrega las filas de un estado ya ordenadas por id.
+            models.Index(fields=['estado', 'fecha_vencimiento'], name='cuota_estado_vencimiento_idx'),
+            models.Index(fields=['usuario_socio', 'estado'], name='cuota_socio_estado_idx'),
+            # Mismo orden que Meta.ordering
+            models.Index(fields=['-periodo_anio', '-periodo_mes', '-fecha_vencimiento'], name='cuota_ordering_idx'),
+            # Paginación por cursor sobre fecha_vencimiento
+            models.Index(fields=['fecha_vencimiento', 'id'], name='cuota_vencimiento_id_idx'),
+            # Cubre los totales del período (dashboard) sin leer la tabla
+            models.Index(fields=['periodo_anio', 'periodo_mes', 'estado', 'valor_total'], name='cuota_periodo_totales_idx'),
+        ]
+
+class GeneracionCuotasJob(models.Model):
+    """
+    Corrida en segundo plano de la generación de cuotas de un período.
+    Los socios se procesan por lotes ordenados por id: `ultimo_socio_id` es el
+    punto de control desde donde se reanuda una corrida interrumpida.
+    """
+    class EstadoJob(models.TextChoices):
+        PENDIENTE  = 'pendiente', 'Pendiente'
+        EN_PROCESO = 'en_proceso', 'En proceso'
+        COMPLETADO = 'completado', 'Completado'
+        ERROR      = 'error', 'Error'
+
+    periodo_mes        = models.IntegerField(help_text="Mes del período (1-12)")
+    periodo_anio       = models.IntegerField(help_text="Año del período")
+    valor_base         = models.DecimalField(max_digits=10, decimal_places=2, help_text="Pesos Argentinos (cuota social)")
+    fecha_vencimiento  = models.DateTimeField()
+    estado             = models.CharField(max_length=20, choices=EstadoJob.choices, default=EstadoJob.PENDIENTE)
+    ultimo_socio_id    = models.BigIntegerField(default=0, help_text="Último socio procesado (punto de control)")
+    socios_procesados  = models.IntegerField(default=0)
+    cuotas_creadas     = models.IntegerField(default=0)
+    error              = models.TextField(blank=True)
+    # AAAA-MM mientras la corrida está pendiente o en proceso, NULL al terminar:
+    # el índice único deja una sola corrida activa por período
+    periodo_activo     = models.CharField(max_length=7, null=True, blank=True, unique=True, editable=False)
+    fecha_creacion     = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Generación de cuotas {self.periodo_mes}/{self.periodo_anio} ({self.estado})"
+
+class SubidaComprobante(models.Model):
+    """
+    Subida por partes de un comprobante de pago (ver subida_comprobantes.py).
+    Lo recibido está en un archivo parcial en disco: `recibidos` es el offset
+    desde donde se reanuda y `tipo` el formato reconocido en los primeros bytes.
+    """
+    id                  = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    cuota               = models.ForeignKey(Cuota, on_delete=models.CASCADE, related_name="subidas")
+    nombre              = models.CharField(max_length=255, help_text="Nombre del archivo original")
+    tamanio             = models.PositiveIntegerField(help_text="Tamaño declarado en bytes")
+    recibidos           = models.PositiveIntegerField(default=0, help_text="Bytes ya escritos en disco")
+    tipo                = models.CharField(max_length=4, blank=True, help_text="pdf, jpg o png, según los primeros bytes")
+    fecha_creacion      = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Subida de comprobante {self.id} ({self.recibidos}/{self.tamanio} bytes)"
+
+    class Meta:
+        indexes = [
+            # Borrado de subidas abandonadas (limpiar_subidas)
+            models.Index(fields=['fecha_actualizacion'], name='subida_actualizacion_idx'),
+        ]
+
+class ArchivoComprobante(models.Model):
+    """
+    Archivo de comprobante guardado por su SHA-256 (ver almacenamiento.py).
+    `referencias` es la cantidad de cuotas que lo usan: con la última se borra
+    (la fila queda en 0 hasta que se borra el archivo).
+    """
+    nombre         = models.CharField(max_length=100, primary_key=True, help_text="comprobantes/ab/<sha256>.<ext>")
+    referencias    = models.PositiveIntegerField(default=0)
+    tamanio        = models.PositiveIntegerField(help_text="Bytes")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
 
 class CompensacionStaff(models.Model):
-    periodo = models.CharField(max_length=100)
+    periodo_anio = models.PositiveSmallIntegerField(help_text="Año del período")
+    periodo_mes = models.PositiveSmallIntegerField(help_text="Mes del período (1-12)")
     usuario_staff = models.ForeignKey(Usuario, on_delete=models.PROTECT, related_name="compensaciones") # PROTECT acá impide eliminar usuarios que adeuden cuotas.
     actividad = models.ForeignKey(Actividad, on_delete=models.PROTECT, related_name="compensaciones")
     monto = models.DecimalField(max_digits=10, decimal_places=2, help_text="Pesos Argentinos")
 
     def __str__(self):
         return f"Compensación a staff {self.usuario_staff} por actividad {self.actividad}"
+
+    @staticmethod
+    def separar_periodo(valor):
+        """(año, mes) de un período "AAAA-MM". ValueError si no tiene ese formato."""
+        anio, guion, mes = str(valor).partition("-")
+        if not (guion and len(anio) == 4 and anio.isdigit() and len(mes) == 2 and mes.isdigit() and 1 <= int(mes) <= 12):
+            raise ValueError(f"Período inválido: {valor!r} (formato AAAA-MM)")
+        return int(anio), int(mes)
+
+    # "AAAA-MM", como se expone en la API. También se acepta como argumento
+    # del constructor y de create(): CompensacionStaff(periodo="2025-03", ...)
+    @property
+    def periodo(self):
+        return f"{self.periodo_anio}-{self.periodo_mes:02d}"
+
+    @periodo.setter
+    def periodo(self, valor):
+        self.periodo_anio, self.periodo_mes = self.separar_periodo(valor)
+
+    class Meta:
+        # Una compensación por staff, actividad y mes: la liquidación automática la actualiza en lugar de duplicarla
+        unique_together = [['usuario_staff', 'actividad', 'periodo_anio', 'periodo_mes']]
+        indexes = [
+            models.Index(fields=['periodo_anio', 'periodo_mes'], name='compensacion_periodo_idx'),
+        ]
+
+
+class VersionTabla(models.Model):
+    """
+    Contador de cambios por tabla, incrementado por las señales (ver
+    versiones.py). Alimenta los ETag / Last-Modified de los listados.
+    """
+    tabla      = models.CharField(max_length=64, primary_key=True)
+    version    = models.PositiveBigIntegerField(default=0)
+    modificado = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.tabla} v{self.version}"
@@ -0,0 +1,139 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+# Órdenes admitidos para el listado de cuotas (?orden=...). Todos terminan en
+# 'id' para que la posición del cursor sea única aunque se repitan fechas.
+ORDENES_CUOTA = {
+    "id": ("id",),
+    "-id": ("-id",),
+    "fecha_vencimiento": ("fecha_vencimiento", "id"),
+    "-fecha_vencimiento": ("-fecha_vencimiento", "-id"),
+    # Más atraso es vencimiento más viejo: se ordena por la columna indexada
+    "dias_atraso": ("-fecha_vencimiento", "-id"),
+    "-dias_atraso": ("fecha_vencimiento", "id"),
+}
+
+
+def orden_cuotas(request):
+    """Orden solicitado en ?orden= (por defecto, por id)."""
+    return ORDENES_CUOTA.get(request.query_params.get("orden"), ORDENES_CUOTA["id"])
+
+
+def despues_de(orden, fila):
+    """Filas que van después de `fila` en `orden`: (a > x) OR (a = x AND b > y) ..."""
+    condicion = Q()
+    iguales = {}
+    for columna in orden:
+        campo = columna.lstrip("-")
+        operador = "lt" if columna.startswith("-") else "gt"
+        condicion |= Q(**iguales, **{f"{campo}__{operador}": fila[campo]})
+        iguales[campo] = fila[campo]
+    return condicion
+
+
+def _invertir(orden):
+    return tuple(columna[1:] if columna.startswith("-") else f"-{columna}" for columna in orden)
+
+
+class CuotaCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre id o fecha_vencimiento: cada página es
+    un WHERE sobre las columnas del orden en lugar de un OFFSET, así que su
+    costo no crece con la tabla.
+
+    El cursor de DRF guarda sólo la primera columna del orden más un offset
+    (acotado por offset_cutoff), y no avanza cuando más de mil cuotas
+    comparten vencimiento, como las de un mes generado junto. Éste guarda
+    todas las columnas de la fila límite (p. ej. fecha_vencimiento e id), y la
+    página siguiente es la condición de despues_de().
+
+    Es opcional para no romper a los clientes que esperan la lista completa:
+    sólo se activa si el request trae ?cursor= o ?page_size=.
+    """
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    # Con False se pagina siempre, aunque el request no lo pida
+    opcional = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.opcional and self.cursor_query_param not in request.query_params and \
+                self.page_size_query_param not in request.query_params:
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverso = self.cursor is not None and self.cursor.reverse
+        orden = _invertir(self.ordering) if reverso else self.ordering
+        queryset = queryset.order_by(*orden)
+        posicion = None
+        if self.cursor is not None:
+            posicion = self._leer_posicion(queryset.model, self.cursor.position)
+            queryset = queryset.filter(despues_de(orden, posicion))
+
+        filas = list(queryset[:self.page_size + 1])
+        self.page = filas[:self.page_size]
+        hay_mas = len(filas) > self.page_size
+        if reverso:
+            self.page.reverse()
+        self.has_next = posicion is not None if reverso else hay_mas
+        self.has_previous = hay_mas if reverso else posicion is not None
+        # Con la página vacía, los dos enlaces parten de la posición pedida
+        self.previous_position = self._posicion(self.page[0]) if self.page else self.cursor and self.cursor.position
+        self.next_position = self._posicion(self.page[-1]) if self.page else self.cursor and self.cursor.position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def get_ordering(self, request, queryset, view):
+        return orden_cuotas(request)
+
+    def _posicion(self, fila):
+        """Columnas del orden de `fila` (instancia o dict de .values()), como texto JSON."""
+        leer = fila.__getitem__ if isinstance(fila, dict) else lambda campo: getattr(fila, campo)
+        return json.dumps([str(leer(columna.lstrip("-"))) for columna in self.ordering])
+
+    def _leer_posicion(self, modelo, posicion):
+        """{columna: valor} a partir de la posición del cursor; NotFound si no corresponde al orden."""
+        columnas = [columna.lstrip("-") for columna in self.ordering]
+        try:
+            valores = json.loads(posicion)
+            if not isinstance(valores, list) or len(valores) != len(columnas):
+                raise ValueError(posicion)
+            return {
+                columna: modelo._meta.get_field(columna).to_python(valor)
+                for columna, valor in zip(columnas, valores)
+            }
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class InscriptosCursorPagination(CursorPagination):
+    """Socios inscriptos de una actividad: siempre paginados por cursor sobre el id de inscripción."""
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("id",)
+
+
+class ColaRevisionPagination(CuotaCursorPagination):
+    """Cola de comprobantes a revisar: siempre paginada por cursor."""
+    page_size = 50
+    max_page_size = 500
+    opcional = False
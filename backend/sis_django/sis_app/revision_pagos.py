@@ -0,0 +1,99 @@
+"""
+Revisión masiva de comprobantes de pago.
+
+Aprobar o rechazar un lote de cuotas en 'pendiente_revision' es un único
+UPDATE condicional (WHERE estado = 'pendiente_revision'), así que dos admins
+que revisan la misma cola no pisan el trabajo del otro: la cuota que ya
+cambió de estado queda fuera del UPDATE y se informa como omitida.
+
+Los archivos de los comprobantes rechazados que quedan sin referencias se
+borran después del commit en un hilo aparte, para no demorar la respuesta con
+E/S del almacenamiento.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import cache_api
+from .dashboard import invalidar_resumen
+from .models import Cuota
+
+logger = logging.getLogger(__name__)
+
+# Máximo de cuotas por request de aprobación/rechazo
+MAX_CUOTAS_POR_LOTE = 1000
+
+_ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="borrado_comprobantes")
+
+
+def _resolver(ids, actualizar):
+    """
+    Bloquea las cuotas pedidas, aplica `actualizar` sobre las que siguen en
+    revisión y devuelve (resultados por id, filas actualizadas).
+    """
+    with transaction.atomic():
+        filas = {
+            pk: (estado, comprobante)
+            for pk, estado, comprobante in Cuota.objects.select_for_update()
+            .filter(pk__in=ids).values_list("pk", "estado", "comprobante")
+        }
+        en_revision = {pk: fila for pk, fila in filas.items() if fila[0] == Cuota.EstadoCuota.PENDIENTE_REVISION}
+        if en_revision:
+            actualizar(Cuota.objects.filter(
+                pk__in=list(en_revision), estado=Cuota.EstadoCuota.PENDIENTE_REVISION,
+            ))
+            # update() no dispara señales
+            transaction.on_commit(invalidar_resumen)
+            cache_api.invalidar(Cuota)
+
+    resultados = []
+    for pk in ids:
+        if pk in en_revision:
+            resultados.append({"id": pk, "resultado": "ok"})
+        elif pk in filas:
+            resultados.append({"id": pk, "resultado": "omitida", "estado": filas[pk][0]})
+        else:
+            resultados.append({"id": pk, "resultado": "no_encontrada"})
+    return resultados, en_revision
+
+
+def aprobar_pagos(ids):
+    """Aprueba las cuotas en revisión: pasan a 'al_dia' con fecha de pago actual."""
+    resultados, _ = _resolver(ids, lambda qs: qs.update(
+        estado=Cuota.EstadoCuota.AL_DIA, fecha_pago=timezone.now(),
+    ))
+    return resultados
+
+
+def rechazar_pagos(ids):
+    """
+    Rechaza los comprobantes de las cuotas en revisión: vuelven a 'atrasada'
+    (o a 'pendiente' si todavía no vencen) sin comprobante, y los archivos se
+    borran en segundo plano.
+    """
+    estado = Case(
+        When(fecha_vencimiento__lt=timezone.now(), then=Value(Cuota.EstadoCuota.ATRASADA)),
+        default=Value(Cuota.EstadoCuota.PENDIENTE),
+    )
+    storage = Cuota._meta.get_field("comprobante").storage
+    with transaction.atomic():
+        resultados, rechazadas = _resolver(ids, lambda qs: qs.update(estado=estado, comprobante=None))
+        # Un mismo archivo puede ser el comprobante de varias cuotas: sólo se
+        # borran los que quedan sin referencias (ver almacenamiento.py)
+        nombres = storage.liberar([comprobante for _, comprobante in rechazadas.values() if comprobante])
+    if nombres:
+        transaction.on_commit(lambda: _ejecutor.submit(borrar_comprobantes, nombres))
+    return resultados
+
+
+def borrar_comprobantes(nombres):
+    """Borra los archivos del disco; un error en uno no frena al resto."""
+    storage = Cuota._meta.get_field("comprobante").storage
+    for nombre in nombres:
+        try:
+            storage.borrar_archivos([nombre])
+        except Exception:
+            logger.exception("No se pudo borrar el comprobante %s", nombre)
@@ -1,11 +1,21 @@
-import re
-from django.utils.text import slugify
-from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff
+from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff, GeneracionCuotasJob, SubidaComprobante
+from .identificadores import construir_username_base, siguiente_dni, siguiente_username, PASSWORD_POR_DEFECTO
+from .campos_dinamicos import CamposDinamicosMixin
+
+
+def expansiones(request):
+    """Relaciones pedidas con ?expand=a,b (se incluyen sólo si se piden)."""
+    if request is None:
+        return set()
+    valor = request.query_params.get("expand", "")
+    return {parte.strip() for parte in valor.split(",") if parte.strip()}
+
 
 # --------- serializer especial para Usuario ---------
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # 1) Hacerlos OPCIONALES en la definición del campo (DRF valida aquí):
     username = serializers.CharField(required=False, allow_blank=True)
     password = serializers.CharField(write_only=True, required=False)
@@ -19,6 +29,8 @@ class UsuarioSerializer(serializers.ModelSerializer):
             "es_admin", "es_staff", "es_socio",
             "date_joined",
         ]
+        # Los roles salen del prefetch de groups, no de columnas propias
+        dependencias = {"es_admin": [], "es_staff": [], "es_socio": []}
     extra_kwargs = {
         "dni": {"required": False, "allow_blank": True},
         "telefono": {"required": False, "allow_blank": True},
@@ -30,40 +42,8 @@ class UsuarioSerializer(serializers.ModelSerializer):
     }
 
     # ---------- helpers ----------
-    def _to_slug(self, s: str) -> str:
-        return slugify(s or "").replace("-", "")
-
     def _build_username_base(self, first_name, last_name, dni):
-        fn = self._to_slug(first_name)
-        ln = self._to_slug((last_name or "").split(" ")[0])
-        if fn or ln:
-            base = ".".join([p for p in [fn, ln] if p])
-            base = re.sub(r"\.+", ".", base).strip(".")
-            if base:
-                return base
-        if dni:
-            digits = re.sub(r"\D", "", str(dni))
-            if digits:
-                return f"staff{digits}"
-        return f"staff{int(timezone.now().timestamp())}"
-
-    def _make_unique_username(self, base: str) -> str:
-        candidate = base
-        i = 0
-        while Usuario.objects.filter(username=candidate).exists():
-            i += 1
-            candidate = f"{base}{i}"
-        return candidate
-
-    def _generate_dni_if_missing(self) -> str:
-        seed = str(int(timezone.now().timestamp() * 1000))[-9:]
-        candidate = f"9{seed}"
-        i = 0
-        dn = candidate
-        while Usuario.objects.filter(dni=dn).exists():
-            i += 1
-            dn = (candidate[:-len(str(i))] + str(i))[:10]
-        return dn
+        return construir_username_base(first_name, last_name, dni)
 
     def _split_fullname_if_needed(self, data: dict):
         nombre_completo = (
@@ -116,28 +96,53 @@ class UsuarioSerializer(serializers.ModelSerializer):
         return super().to_internal_value(data)
 
     # ------------- create / update -------------
+    # Reintentos ante IntegrityError: otro alta concurrente tomó el mismo username/DNI generado
+    MAX_INTENTOS_ALTA = 5
+
     def create(self, validated_data):
         password = validated_data.pop("password", None)
-        username = validated_data.get("username")
+        dni_automatico = not validated_data.get("dni")
+        username_automatico = not validated_data.get("username")
 
-        if not validated_data.get("dni"):
-            validated_data["dni"] = self._generate_dni_if_missing()
-
-        if not username:
+        if username_automatico:
             base = self._build_username_base(
                 validated_data.get("first_name"),
                 validated_data.get("last_name"),
                 validated_data.get("dni"),
             )
-            username = self._make_unique_username(base)
-            validated_data["username"] = username
 
         user = Usuario(**validated_data)
         if not password:
-            password = "Club2025!"  # solo dev
+            password = PASSWORD_POR_DEFECTO
         user.set_password(password)
-        user.save()
-        return user
+
+        # Insertar y reintentar en vez de chequear-y-después-insertar:
+        # el unique de la base es el que decide ante altas simultáneas.
+        for intento in range(self.MAX_INTENTOS_ALTA):
+            if dni_automatico:
+                user.dni = siguiente_dni()
+            if username_automatico:
+                user.username = siguiente_username(base)
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                return user
+            except IntegrityError:
+                # Un valor enviado por el usuario que ya existe no se arregla reintentando
+                self._validar_unicos_enviados(user, dni=not dni_automatico, username=not username_automatico)
+                ultimo = intento == self.MAX_INTENTOS_ALTA - 1
+                if ultimo or not (dni_automatico or username_automatico):
+                    raise
+
+    def _validar_unicos_enviados(self, user, **campos):
+        """ValidationError (400) si alguno de los `campos` enviados ya lo usa otro usuario."""
+        errores = {
+            campo: [f"Ya existe un usuario con este {campo}."]
+            for campo, enviado in campos.items()
+            if enviado and Usuario.objects.filter(**{campo: getattr(user, campo)}).exists()
+        }
+        if errores:
+            raise serializers.ValidationError(errores)
 
     def update(self, instance, validated_data):
         password = validated_data.pop("password", None)
@@ -149,7 +154,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
         return instance
 
 # --------- resto de serializers ---------
-class ActividadSerializer(serializers.ModelSerializer):
+class ActividadSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     cantidad_inscriptos = serializers.IntegerField(read_only=True)
     inscriptos_detalle = serializers.SerializerMethodField()
     
@@ -160,10 +165,21 @@ class ActividadSerializer(serializers.ModelSerializer):
             "cargo_inscripcion","estado","usuario_staff","cantidad_inscriptos",
             "inscriptos_detalle",
         ]
-    
+        columnas_rapidas = {"cantidad_inscriptos": "num_inscriptos"}
+        dependencias = {"inscriptos_detalle": []}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # El listado de inscriptos sólo va con ?expand=inscriptos; si no, se
+        # consulta paginado en /actividades/{id}/inscriptos/
+        if "inscriptos" not in expansiones(self.context.get("request")):
+            self.fields.pop("inscriptos_detalle", None)
+
     def get_inscriptos_detalle(self, obj):
         """Devuelve detalles de los socios inscritos en esta actividad"""
-        inscripciones = obj.inscripciones.filter(estado='confirmada').select_related('usuario_socio')
+        inscripciones = getattr(obj, 'inscripciones_confirmadas', None)
+        if inscripciones is None:  # instancia sin precarga (p. ej. recién creada)
+            inscripciones = obj.inscripciones.filter(estado='confirmada').select_related('usuario_socio')
         return [
             {
                 "id": insc.usuario_socio.id,
@@ -176,7 +192,7 @@ class ActividadSerializer(serializers.ModelSerializer):
             for insc in inscripciones
         ]
 
-class InscripcionSerializer(serializers.ModelSerializer):
+class InscripcionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Inscripcion
         fields = ["id","fecha_inscripcion","usuario_socio","actividad",
@@ -184,11 +200,9 @@ class InscripcionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["fecha_inscripcion"]
 
-class CuotaSerializer(serializers.ModelSerializer):
+class CuotaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     dias_atraso = serializers.IntegerField(read_only=True)
     comprobante_url = serializers.SerializerMethodField()
-    valor_actividades = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    valor_total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     periodo = serializers.CharField(read_only=True)
     inscripciones_detalle = serializers.SerializerMethodField()
     
@@ -199,6 +213,13 @@ class CuotaSerializer(serializers.ModelSerializer):
             "usuario_socio","estado","dias_atraso","comprobante","comprobante_url",
             "inscripciones","inscripciones_detalle","periodo","periodo_mes","periodo_anio",
         ]
+        read_only_fields = ["valor_actividades", "valor_total"]  # columnas mantenidas por signals.py
+        columnas_rapidas = {"dias_atraso": "dias_atraso_db"}
+        dependencias = {
+            "comprobante_url": ["comprobante"],
+            "periodo": ["periodo_mes", "periodo_anio", "fecha_vencimiento"],
+            "inscripciones_detalle": [],
+        }
     
     def get_comprobante_url(self, obj):
         """Devuelve la URL completa del comprobante si existe"""
@@ -220,7 +241,94 @@ class CuotaSerializer(serializers.ModelSerializer):
             for insc in obj.inscripciones.all()
         ]
 
-class CompensacionStaffSerializer(serializers.ModelSerializer):
+class CuotaRevisionSerializer(serializers.ModelSerializer):
+    """Fila de la cola de revisión: sólo lo necesario para aprobar o rechazar."""
+    socio = serializers.SerializerMethodField()
+    comprobante_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Cuota
+        fields = [
+            "id", "usuario_socio", "socio", "periodo_mes", "periodo_anio",
+            "fecha_vencimiento", "valor_total", "comprobante_url",
+        ]
+
+    def get_socio(self, obj):
+        return str(obj.usuario_socio)
+
+    get_comprobante_url = CuotaSerializer.get_comprobante_url
+
+class CompensacionStaffSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # "AAAA-MM"; en la base se guarda como periodo_anio y periodo_mes
+    periodo = serializers.CharField(max_length=7)
+
     class Meta:
         model = CompensacionStaff
-        fields = ["id","periodo","usuario_staff","actividad","monto"]
+        fields = ["id","periodo","periodo_anio","periodo_mes","usuario_staff","actividad","monto"]
+        read_only_fields = ["periodo_anio", "periodo_mes"]
+        columnas_rapidas = {"periodo": "periodo_db"}
+        dependencias = {"periodo": ["periodo_anio", "periodo_mes"]}
+
+    def validate_periodo(self, valor):
+        try:
+            CompensacionStaff.separar_periodo(valor)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return valor
+
+    def validate(self, attrs):
+        # unique_together incluye año y mes, que no son campos de entrada: se valida acá
+        instancia = self.instance
+        periodo = attrs.get("periodo", instancia.periodo if instancia else None)
+        staff = attrs.get("usuario_staff", instancia.usuario_staff if instancia else None)
+        actividad = attrs.get("actividad", instancia.actividad if instancia else None)
+        if periodo and staff and actividad:
+            anio, mes = CompensacionStaff.separar_periodo(periodo)
+            repetidas = CompensacionStaff.objects.filter(
+                usuario_staff=staff, actividad=actividad, periodo_anio=anio, periodo_mes=mes,
+            )
+            if instancia is not None:
+                repetidas = repetidas.exclude(pk=instancia.pk)
+            if repetidas.exists():
+                raise serializers.ValidationError("Ya existe una compensación de ese staff y actividad en el período.")
+        return attrs
+
+class GeneracionCuotasJobSerializer(serializers.ModelSerializer):
+    url_estado = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GeneracionCuotasJob
+        fields = [
+            "id","periodo_mes","periodo_anio","valor_base","fecha_vencimiento",
+            "estado","ultimo_socio_id","socios_procesados","cuotas_creadas","error",
+            "fecha_creacion","fecha_actualizacion","url_estado",
+        ]
+        read_only_fields = fields
+
+    def get_url_estado(self, obj):
+        """URL para consultar el avance de la corrida"""
+        path = reverse("cuota-estado-generacion", kwargs={"job_id": obj.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
+
+
+class SubidaComprobanteSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source="recibidos", read_only=True)
+    tamanio_parte = serializers.SerializerMethodField()
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubidaComprobante
+        fields = ["id", "cuota", "nombre", "tamanio", "offset", "tamanio_parte", "url"]
+        read_only_fields = fields
+
+    def get_tamanio_parte(self, obj):
+        """Tamaño sugerido para cada PUT"""
+        from .subida_comprobantes import configuracion
+        return configuracion()["TAMANIO_PARTE"]
+
+    def get_url(self, obj):
+        """URL a la que se envían las partes (PUT) y se consulta el offset (GET)"""
+        path = reverse("cuota-subida", kwargs={"pk": obj.cuota_id, "subida_id": obj.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
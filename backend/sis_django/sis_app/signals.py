@@ -1,10 +1,118 @@
 # sis_app/signals.py
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import Usuario
+from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff
+from .dashboard import invalidar_resumen
+from .autenticacion import usuarios_recientes
+from . import cache_api, versiones
 
 @receiver(m2m_changed, sender=Usuario.groups.through)
 def sync_is_staff_on_group_change(sender, instance, action, **kwargs):
     if action in ("post_add", "post_remove", "post_clear"):
-        instance.is_staff = instance.groups.filter(name__in=["admin", "staff"]).exists()
+        instance.invalidar_roles()
+        usuarios_recientes.olvidar(instance.pk)
+        instance.is_staff = bool(instance.roles & {"admin", "staff"})
         instance.save(update_fields=["is_staff"])
+
+# --- Totales desnormalizados de Cuota (valor_actividades / valor_total) ---
+
+@receiver(m2m_changed, sender=Cuota.inscripciones.through)
+def recalcular_totales_por_inscripciones(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # Cambio desde el lado de la inscripción: inscripcion.cuotas.add(...)
+        if action == "pre_clear":
+            instance._cuotas_a_recalcular = list(instance.cuotas.values_list("pk", flat=True))
+        elif action in ("post_add", "post_remove"):
+            Cuota.recalcular_totales(Cuota.objects.filter(pk__in=pk_set))
+        elif action == "post_clear":
+            Cuota.recalcular_totales(Cuota.objects.filter(pk__in=instance._cuotas_a_recalcular))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        Cuota.recalcular_totales(Cuota.objects.filter(pk=instance.pk))
+        instance.refresh_from_db(fields=["valor_actividades", "valor_total"])
+
+@receiver(pre_save, sender=Actividad)
+def recordar_cargo_anterior(sender, instance, **kwargs):
+    if instance.pk:
+        instance._cargo_anterior = (
+            Actividad.objects.filter(pk=instance.pk).values_list("cargo_inscripcion", flat=True).first()
+        )
+
+@receiver(post_save, sender=Actividad)
+def recalcular_totales_por_cargo(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "_cargo_anterior", None) != instance.cargo_inscripcion:
+        Cuota.recalcular_totales(Cuota.objects.filter(inscripciones__actividad=instance))
+
+@receiver(pre_save, sender=Inscripcion)
+def recordar_actividad_anterior(sender, instance, **kwargs):
+    if instance.pk:
+        instance._actividad_anterior = (
+            Inscripcion.objects.filter(pk=instance.pk).values_list("actividad_id", flat=True).first()
+        )
+
+@receiver(post_save, sender=Inscripcion)
+def recalcular_totales_por_cambio_de_actividad(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "_actividad_anterior", None) != instance.actividad_id:
+        Cuota.recalcular_totales(Cuota.objects.filter(inscripciones=instance))
+
+@receiver(pre_delete, sender=Inscripcion)
+def recordar_cuotas_de_inscripcion(sender, instance, **kwargs):
+    instance._cuotas_a_recalcular = list(instance.cuotas.values_list("pk", flat=True))
+
+@receiver(post_delete, sender=Inscripcion)
+def recalcular_totales_por_baja_de_inscripcion(sender, instance, **kwargs):
+    if instance._cuotas_a_recalcular:
+        Cuota.recalcular_totales(Cuota.objects.filter(pk__in=instance._cuotas_a_recalcular))
+
+# --- Caché del resumen del dashboard ---
+
+def invalidar_resumen_dashboard(sender, **kwargs):
+    invalidar_resumen()
+
+for _modelo in (Usuario, Actividad, Cuota):
+    post_save.connect(invalidar_resumen_dashboard, sender=_modelo, dispatch_uid=f"dashboard_save_{_modelo.__name__}")
+    post_delete.connect(invalidar_resumen_dashboard, sender=_modelo, dispatch_uid=f"dashboard_delete_{_modelo.__name__}")
+for _through in (Usuario.groups.through, Cuota.inscripciones.through):
+    m2m_changed.connect(invalidar_resumen_dashboard, sender=_through, dispatch_uid=f"dashboard_m2m_{_through.__name__}")
+
+# --- LRU de usuarios de la autenticación JWT (autenticacion.py) ---
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def olvidar_usuario_autenticado(sender, instance, **kwargs):
+    usuarios_recientes.olvidar(instance.pk)
+
+# --- Versiones por tabla para ETag / Last-Modified (versiones.py) ---
+
+def incrementar_version(sender, **kwargs):
+    versiones.incrementar(sender)
+
+def incrementar_version_usuario_por_grupos(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        versiones.incrementar(Usuario)
+
+for _modelo in (Usuario, Actividad, Inscripcion, CompensacionStaff):
+    post_save.connect(incrementar_version, sender=_modelo, dispatch_uid=f"version_save_{_modelo.__name__}")
+    post_delete.connect(incrementar_version, sender=_modelo, dispatch_uid=f"version_delete_{_modelo.__name__}")
+m2m_changed.connect(incrementar_version_usuario_por_grupos, sender=Usuario.groups.through, dispatch_uid="version_m2m_grupos")
+
+# --- Caché de respuestas y agregados de la API (cache_api.py) ---
+
+def invalidar_cache_api(sender, **kwargs):
+    cache_api.invalidar(sender)
+
+def invalidar_cache_api_por_m2m(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        cache_api.invalidar(Usuario if sender is Usuario.groups.through else Cuota)
+
+for _modelo in (Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff):
+    post_save.connect(invalidar_cache_api, sender=_modelo, dispatch_uid=f"cache_api_save_{_modelo.__name__}")
+    post_delete.connect(invalidar_cache_api, sender=_modelo, dispatch_uid=f"cache_api_delete_{_modelo.__name__}")
+for _through in (Usuario.groups.through, Cuota.inscripciones.through):
+    m2m_changed.connect(invalidar_cache_api_por_m2m, sender=_through, dispatch_uid=f"cache_api_m2m_{_through.__name__}")
+
+# --- Referencias a los archivos de comprobantes (almacenamiento.py) ---
+
+@receiver(post_delete, sender=Cuota)
+def liberar_comprobante(sender, instance, **kwargs):
+    if instance.comprobante:
+        instance.comprobante.delete(save=False)
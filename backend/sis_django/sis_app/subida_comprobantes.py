@@ -0,0 +1,326 @@
+"""
+Subida reanudable de comprobantes de pago.
+
+subir_comprobante recibe el archivo entero en un POST multipart: si la
+conexión se corta, el socio lo vuelve a subir desde el principio. Acá el
+archivo se sube por partes, que se escriben a disco a medida que llegan, y
+una subida cortada se retoma desde el último byte guardado:
+
+1. POST /api/cuotas/{id}/subidas/ {"nombre": "foto.jpg", "tamanio": 2345678}
+   abre la subida: 201 con su id, el offset (0) y un tamaño de parte sugerido.
+2. PUT /api/cuotas/{id}/subidas/{subida}/ con la parte como cuerpo y
+   `Content-Range: bytes inicio-fin/tamanio`. `inicio` tiene que ser el
+   offset que ya tiene el servidor; si no, 409 con el offset actual. Un GET
+   a la misma ruta devuelve el offset para reanudar después de un corte.
+3. POST /api/cuotas/{id}/subidas/{subida}/finalizar/ adjunta el archivo a la
+   cuota y la deja en revisión, como subir_comprobante.
+
+El tamaño máximo se controla al abrir la subida y con el Content-Length de
+cada parte, antes de leer el cuerpo. El tipo se reconoce por los primeros
+bytes del archivo (no por la extensión) apenas llegan: un archivo que no es
+PDF, JPG ni PNG se descarta sin recibir el resto. `LimiteComprobanteHandler`
+aplica los mismos controles mientras llega el multipart de subir_comprobante.
+
+Las partes se escriben en COMPROBANTES["DIRECTORIO_SUBIDAS"], fuera de
+MEDIA_ROOT. Las subidas abandonadas las borra `limpiar_subidas`.
+"""
+import os
+import re
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cuota, SubidaComprobante
+
+DEFAULTS = {
+    "TAMANIO_MAXIMO": 3 * 1024 * 1024,  # bytes
+    "TAMANIO_PARTE": 512 * 1024,        # sugerido al cliente
+    "DIRECTORIO_SUBIDAS": None,         # por defecto <BASE_DIR>/subidas
+    "VENCIMIENTO": 24 * 3600,           # segundos sin recibir partes
+}
+
+EXTENSIONES = ("pdf", "jpg", "jpeg", "png")
+# Primeros bytes de cada tipo aceptado (la clave es la extensión con que se guarda)
+FIRMAS = {
+    "pdf": b"%PDF-",
+    "png": b"\x89PNG\r\n\x1a\n",
+    "jpg": b"\xff\xd8\xff",
+}
+LARGO_FIRMA = max(len(firma) for firma in FIRMAS.values())
+# Bloque de lectura del cuerpo de cada parte
+BLOQUE = 64 * 1024
+
+RANGO = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+def configuracion():
+    return {**DEFAULTS, **getattr(settings, "COMPROBANTES", {})}
+
+
+def directorio():
+    return configuracion()["DIRECTORIO_SUBIDAS"] or os.path.join(settings.BASE_DIR, "subidas")
+
+
+def ruta_parcial(subida):
+    return os.path.join(directorio(), f"{subida.pk}.parte")
+
+
+class ErrorSubida(Exception):
+    """Subida rechazada: `estado` es el código HTTP y `datos` va en la respuesta junto al error."""
+
+    def __init__(self, mensaje, estado=400, **datos):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.datos = datos
+
+
+def tipo_archivo(cabecera):
+    """'pdf', 'jpg' o 'png' según los primeros bytes, o None si no es ninguno."""
+    for tipo, firma in FIRMAS.items():
+        if cabecera.startswith(firma):
+            return tipo
+    return None
+
+
+def _error_tamanio(estado):
+    maximo = configuracion()["TAMANIO_MAXIMO"]
+    legible = f"{maximo // (1024 * 1024)}MB" if maximo % (1024 * 1024) == 0 else f"{maximo // 1024}KB"
+    return ErrorSubida(f"El archivo no debe superar los {legible}", estado)
+
+
+def _error_tipo(estado):
+    return ErrorSubida(f"Tipo de archivo no válido. Solo se permiten: {', '.join(EXTENSIONES)}", estado)
+
+
+def validar_extension(nombre):
+    if str(nombre).rsplit(".", 1)[-1].lower() not in EXTENSIONES:
+        raise _error_tipo(400)
+
+
+def nombre_guardado(nombre, tipo):
+    """Nombre del cliente con la extensión del tipo reconocido: un PNG subido como x.pdf se guarda como x.png."""
+    return f"{os.path.splitext(os.path.basename(str(nombre)))[0] or 'comprobante'}.{tipo}"
+
+
+def validar_cuota(cuota):
+    if cuota.estado == Cuota.EstadoCuota.AL_DIA:
+        raise ErrorSubida("Esta cuota ya está pagada")
+
+
+# =====================================================
+#        SUBIDA POR PARTES
+# =====================================================
+def iniciar(cuota, nombre, tamanio):
+    """Abre la subida del comprobante de `cuota` y crea el archivo parcial vacío."""
+    validar_cuota(cuota)
+    if not nombre:
+        raise ErrorSubida("Falta el nombre del archivo")
+    validar_extension(nombre)
+    try:
+        tamanio = int(tamanio)
+    except (TypeError, ValueError):
+        raise ErrorSubida("tamanio debe ser la cantidad de bytes del archivo")
+    if tamanio <= 0:
+        raise ErrorSubida("El archivo está vacío")
+    if tamanio > configuracion()["TAMANIO_MAXIMO"]:
+        raise _error_tamanio(413)
+
+    subida = SubidaComprobante.objects.create(cuota=cuota, nombre=os.path.basename(str(nombre))[:255], tamanio=tamanio)
+    os.makedirs(directorio(), exist_ok=True)
+    open(ruta_parcial(subida), "wb").close()
+    return subida
+
+
+def _rango(subida, content_range, largo):
+    """(inicio, fin exclusivo) de la parte, validados contra la subida antes de leer el cuerpo."""
+    coincidencia = RANGO.fullmatch((content_range or "").strip())
+    if not coincidencia:
+        raise ErrorSubida("Falta el encabezado Content-Range (bytes inicio-fin/tamaño)")
+    inicio, ultimo, total = (int(valor) for valor in coincidencia.groups())
+    if total != subida.tamanio:
+        raise ErrorSubida("El tamaño no coincide con el declarado al iniciar la subida")
+    if ultimo < inicio:
+        raise ErrorSubida("Content-Range inválido")
+    if ultimo >= subida.tamanio:
+        raise _error_tamanio(413)
+    if largo is None:
+        raise ErrorSubida("Falta el encabezado Content-Length", 411)
+    if largo != ultimo - inicio + 1:
+        raise ErrorSubida("Content-Length no coincide con Content-Range")
+    if inicio != subida.recibidos:
+        raise ErrorSubida("El offset no coincide con lo recibido", 409, offset=subida.recibidos)
+    return inicio, ultimo + 1
+
+
+def recibir_parte(subida, cuerpo, content_range, largo):
+    """
+    Escribe en el archivo parcial la parte que llega en `cuerpo` (se lee de a
+    BLOQUE bytes) y devuelve la subida con el offset nuevo. Si el cliente
+    corta antes de mandar toda la parte, queda guardado lo que llegó.
+    """
+    inicio, fin = _rango(subida, content_range, largo)
+    tipo = subida.tipo
+    # Bytes necesarios para reconocer el tipo (menos si el archivo es más corto)
+    largo_cabecera = min(LARGO_FIRMA, subida.tamanio)
+    posicion = inicio
+    with open(ruta_parcial(subida), "r+b") as archivo:
+        cabecera = b"" if tipo else archivo.read(min(inicio, largo_cabecera))
+        archivo.seek(inicio)
+        while posicion < fin:
+            bloque = cuerpo.read(min(BLOQUE, fin - posicion))
+            if not bloque:
+                break
+            if not tipo:
+                cabecera += bloque[:largo_cabecera - len(cabecera)]
+                if len(cabecera) >= largo_cabecera:
+                    tipo = tipo_archivo(cabecera)
+                    if tipo is None:
+                        archivo.close()
+                        descartar(subida)
+                        raise _error_tipo(415)
+            archivo.write(bloque)
+            posicion += len(bloque)
+
+    # Condicional: si otra parte con el mismo offset llegó antes, ésta no avanza
+    actualizadas = SubidaComprobante.objects.filter(pk=subida.pk, recibidos=inicio).update(
+        recibidos=posicion, tipo=tipo, fecha_actualizacion=timezone.now(),
+    )
+    subida.refresh_from_db()
+    if not actualizadas:
+        raise ErrorSubida("El offset no coincide con lo recibido", 409, offset=subida.recibidos)
+    return subida
+
+
+def finalizar(subida):
+    """
+    Adjunta el archivo completo a la cuota, que pasa a revisión. Devuelve la
+    cuota. El archivo parcial se copia (no se mueve) y se borra recién después
+    del commit: si la transacción se revierte, la subida sigue completa y el
+    cliente puede volver a finalizarla.
+    """
+    if subida.recibidos < subida.tamanio:
+        raise ErrorSubida("La subida no está completa", 409, offset=subida.recibidos)
+    ruta = ruta_parcial(subida)
+    if not os.path.exists(ruta):
+        raise _reiniciar(subida)
+    nombre = nombre_guardado(subida.nombre, subida.tipo)
+    with transaction.atomic():
+        cuota = Cuota.objects.select_for_update().get(pk=subida.cuota_id)
+        validar_cuota(cuota)
+        with open(ruta, "rb") as archivo:
+            adjuntar(cuota, nombre, File(archivo, name=nombre))
+        subida.delete()
+        transaction.on_commit(lambda: _borrar(ruta))
+    return cuota
+
+
+def _reiniciar(subida):
+    """
+    El archivo parcial ya no está (p. ej. se borró a mano): la subida vuelve a
+    empezar desde 0. Devuelve el 409 con el offset nuevo.
+    """
+    SubidaComprobante.objects.filter(pk=subida.pk).update(recibidos=0, tipo="", fecha_actualizacion=timezone.now())
+    os.makedirs(directorio(), exist_ok=True)
+    open(ruta_parcial(subida), "wb").close()
+    return ErrorSubida("El archivo recibido se perdió: hay que volver a subirlo", 409, offset=0)
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def adjuntar(cuota, nombre, archivo):
+    """
+    Guarda `archivo` como comprobante de la cuota, que pasa a revisión. Si
+    reemplaza a uno anterior, se libera la referencia al anterior.
+    """
+    anterior = cuota.comprobante.name
+    with transaction.atomic():
+        cuota.comprobante.save(nombre, archivo, save=False)
+        cuota.estado = Cuota.EstadoCuota.PENDIENTE_REVISION
+        cuota.save()
+        if anterior:
+            cuota.comprobante.storage.delete(anterior)
+    return cuota
+
+
+def descartar(subida):
+    """Borra la subida y su archivo parcial."""
+    ruta = ruta_parcial(subida)
+    subida.delete()
+    _borrar(ruta)
+
+
+def limpiar_vencidas():
+    """Borra las subidas (y los archivos parciales) sin partes nuevas en COMPROBANTES["VENCIMIENTO"]."""
+    limite = time.time() - configuracion()["VENCIMIENTO"]
+    borradas, _ = SubidaComprobante.objects.filter(
+        fecha_actualizacion__lt=datetime.fromtimestamp(limite, tz=dt_timezone.utc),
+    ).delete()
+    # También los archivos que quedaron sin fila (p. ej. por una cuota borrada)
+    if os.path.isdir(directorio()):
+        for entrada in os.scandir(directorio()):
+            if entrada.name.endswith(".parte") and entrada.stat().st_mtime < limite:
+                os.remove(entrada.path)
+    return borradas
+
+
+# =====================================================
+#        MULTIPART (subir_comprobante)
+# =====================================================
+class LimiteComprobanteHandler(FileUploadHandler):
+    """
+    Corta la lectura del multipart de subir_comprobante apenas el archivo
+    supera el tamaño máximo o sus primeros bytes no son de un PDF, JPG o PNG.
+    Va primero en request.upload_handlers (ver `limitar_multipart`); el
+    motivo del rechazo queda en `error` y el tipo reconocido de cada archivo,
+    en `tipos` (por nombre de campo).
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.maximo = configuracion()["TAMANIO_MAXIMO"]
+        self.cabecera = b""
+        self.error = None
+        self.tipos = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.cabecera = b""
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.maximo:
+            self._rechazar(_error_tamanio(400))
+        if len(self.cabecera) < LARGO_FIRMA:
+            self.cabecera += raw_data[:LARGO_FIRMA - len(self.cabecera)]
+            if len(self.cabecera) == LARGO_FIRMA and tipo_archivo(self.cabecera) is None:
+                self._rechazar(_error_tipo(400))
+        return raw_data
+
+    def file_complete(self, file_size):
+        tipo = tipo_archivo(self.cabecera)
+        # Archivos más cortos que la firma más larga
+        if self.error is None and tipo is None:
+            self.error = _error_tipo(400)
+        self.tipos[self.field_name] = tipo
+        return None
+
+    def _rechazar(self, error):
+        self.error = error
+        # Sin consumir el resto del cuerpo
+        raise StopUpload(connection_reset=True)
+
+
+def limitar_multipart(request):
+    """Instala LimiteComprobanteHandler en `request` (antes de leer request.FILES)."""
+    limite = LimiteComprobanteHandler(request)
+    request.upload_handlers.insert(0, limite)
+    return limite
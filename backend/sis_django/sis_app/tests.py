@@ -1,3 +1,2074 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import tempfile
+import warnings
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from . import compensaciones, exportacion
+from .benchmark_concurrencia import urlconf
+from .generacion_cuotas import generar_cuotas, procesar_job, _procesar_lote
+from .identificadores import siguiente_dni, siguiente_username
+from .importacion import importar_socios
+from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff, GeneracionCuotasJob, SubidaComprobante
+from .serializers import (
+    UsuarioSerializer, ActividadSerializer, InscripcionSerializer, CuotaSerializer, CompensacionStaffSerializer,
+)
+from .views import (
+    UsuarioViewSet, ActividadViewSet, InscripcionViewSet, CuotaViewSet, CompensacionStaffViewSet,
+)
+
+
+def crear_socios(cantidad, prefijo="socio"):
+    """Crea `cantidad` socios activos en bloque (sin pasar por el serializer)."""
+    grupo, _ = Group.objects.get_or_create(name="socio")
+    Usuario.objects.bulk_create([
+        Usuario(
+            username=f"{prefijo}{i}",
+            first_name=f"Nombre{i}",
+            last_name=f"Apellido{i}",
+            dni=f"{prefijo}{i}",
+            password="!",
+        )
+        for i in range(cantidad)
+    ])
+    socios = list(Usuario.objects.filter(username__startswith=prefijo).order_by("id"))
+    Usuario.groups.through.objects.bulk_create([
+        Usuario.groups.through(usuario_id=s.id, group_id=grupo.id) for s in socios
+    ])
+    return socios
+
+
+def crear_actividad(staff, nombre="Funcional", cargo="1500.00"):
+    inicio = timezone.now() + timedelta(days=1)
+    return Actividad.objects.create(
+        nombre=nombre,
+        descripcion="",
+        fecha_hora_inicio=inicio,
+        fecha_hora_fin=inicio + timedelta(hours=1),
+        cargo_inscripcion=Decimal(cargo),
+        usuario_staff=staff,
+    )
+
+
+# =====================================================
+#        GENERACIÓN DE CUOTAS
+# =====================================================
+class GenerarCuotasTest(TestCase):
+    url = "/api/cuotas/generar_cuotas/"
+    body = {"mes": 3, "anio": 2025, "valor_base": 5000, "dia_vencimiento": 10}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.yoga = crear_actividad(self.staff, "Yoga", "1000.00")
+        self.pesas = crear_actividad(self.staff, "Pesas", "2500.00")
+
+    def _generar(self, **kwargs):
+        """POST a generar_cuotas y procesa la corrida en el hilo del test."""
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post(self.url, self.body, format="json")
+        self.assertEqual(response.status_code, 202)
+        return procesar_job(response.data["id"], **kwargs)
+
+    def test_crea_cuotas_con_inscripciones_y_totales(self):
+        socio, otro = crear_socios(2)
+        Inscripcion.objects.create(usuario_socio=socio, actividad=self.yoga)
+        Inscripcion.objects.create(usuario_socio=socio, actividad=self.pesas)
+        Inscripcion.objects.create(usuario_socio=socio, actividad=self.pesas, estado="cancelada")
+
+        job = self._generar()
+
+        self.assertEqual(job.estado, "completado")
+        self.assertEqual(job.cuotas_creadas, 2)
+        cuota = Cuota.objects.get(usuario_socio=socio)
+        self.assertEqual(cuota.valor_total, Decimal("8500.00"))
+        self.assertEqual(cuota.inscripciones.count(), 2)
+        self.assertEqual(Cuota.objects.get(usuario_socio=otro).inscripciones.count(), 0)
+
+    def test_detalle_calculado_en_memoria(self):
+        socio, = crear_socios(1)
+        Inscripcion.objects.create(usuario_socio=socio, actividad=self.yoga)
+        Inscripcion.objects.create(usuario_socio=socio, actividad=self.pesas)
+
+        with transaction.atomic():
+            creadas = generar_cuotas(3, 2025, Decimal("5000"), timezone.now())
+
+        self.assertEqual(len(creadas), 1)
+        self.assertEqual(creadas[0]["num_inscripciones"], 2)
+        self.assertEqual(creadas[0]["valor_actividades"], 3500.0)
+        self.assertEqual(creadas[0]["valor_total"], 8500.0)
+
+    def test_omite_socios_ya_facturados_e_inactivos(self):
+        facturado, inactivo, nuevo = crear_socios(3)
+        inactivo.estado = "inactivo"
+        inactivo.save()
+        Cuota.objects.create(
+            usuario_socio=facturado,
+            fecha_vencimiento=timezone.now(),
+            valor_base=Decimal("100.00"),
+            periodo_mes=3,
+            periodo_anio=2025,
+        )
+
+        job = self._generar()
+
+        self.assertEqual(job.cuotas_creadas, 1)
+        self.assertTrue(Cuota.objects.filter(usuario_socio=nuevo).exists())
+        # Una segunda corrida sobre el mismo período no crea nada
+        self.assertEqual(self._generar().cuotas_creadas, 0)
+
+    def test_estado_de_la_corrida(self):
+        crear_socios(3)
+        job = self._generar(tamanio_lote=2)
+
+        response = self.client.get(f"/api/cuotas/generaciones/{job.id}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["estado"], "completado")
+        self.assertEqual(response.data["socios_procesados"], 3)
+        self.assertEqual(response.data["cuotas_creadas"], 3)
+        self.assertEqual(self.client.get("/api/cuotas/generaciones/999/").status_code, 404)
+
+    def test_reanuda_desde_el_punto_de_control(self):
+        socios = crear_socios(5)
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self.client.post(self.url, self.body, format="json").data["id"]
+
+        # Simula una corrida que se cortó después del primer lote de 2 socios
+        _procesar_lote(job_id, 2)
+        job = GeneracionCuotasJob.objects.get(pk=job_id)
+        self.assertEqual(job.ultimo_socio_id, socios[1].id)
+        self.assertEqual(Cuota.objects.count(), 2)
+
+        call_command("procesar_generacion_cuotas", lote=2, stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.estado, "completado")
+        self.assertEqual(job.socios_procesados, 5)
+        self.assertEqual(job.cuotas_creadas, 5)
+        self.assertEqual(Cuota.objects.count(), 5)
+
+    def test_reproceso_sin_punto_de_control_no_duplica(self):
+        crear_socios(4)
+        job = self._generar(tamanio_lote=3)
+        GeneracionCuotasJob.objects.filter(pk=job.id).update(estado="en_proceso", ultimo_socio_id=0)
+
+        job = procesar_job(job.id, tamanio_lote=3)
+
+        self.assertEqual(job.estado, "completado")
+        self.assertEqual(Cuota.objects.count(), 4)
+
+    def test_cuota_cargada_a_mano_durante_la_corrida(self):
+        from . import generacion_cuotas
+        socio, otro = crear_socios(2)
+        Inscripcion.objects.create(usuario_socio=socio, actividad=self.yoga)
+
+        def carga_manual(fecha_vencimiento):
+            # Otro request crea la cuota del socio entre el anti-join y el INSERT
+            Cuota.objects.create(usuario_socio=socio, fecha_vencimiento=fecha_vencimiento,
+                                 valor_base=Decimal("4000.00"), periodo_mes=3, periodo_anio=2025)
+            return "pendiente"
+
+        with mock.patch.object(generacion_cuotas, "estado_impaga", side_effect=carga_manual):
+            job = self._generar()
+
+        self.assertEqual(job.estado, "completado")
+        self.assertEqual(job.cuotas_creadas, 1)
+        manual = Cuota.objects.get(usuario_socio=socio)
+        self.assertEqual((manual.valor_base, manual.valor_total), (Decimal("4000.00"), Decimal("4000.00")))
+        self.assertFalse(manual.inscripciones.exists())
+        self.assertEqual(Cuota.objects.get(usuario_socio=otro).valor_base, Decimal("5000.00"))
+
+    def test_invalida_caches_al_confirmar(self):
+        from . import generacion_cuotas
+        crear_socios(2)
+        with mock.patch.object(generacion_cuotas, "invalidar_resumen") as invalidar_resumen, \
+                mock.patch.object(generacion_cuotas.cache_api, "invalidar") as invalidar_cache:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    generar_cuotas(3, 2025, Decimal("5000"), timezone.now())
+                invalidar_resumen.assert_not_called()
+                invalidar_cache.assert_not_called()
+        invalidar_resumen.assert_called_once_with()
+        invalidar_cache.assert_called_once_with(Cuota)
+
+    def test_una_corrida_activa_por_periodo(self):
+        crear_socios(2)
+        with self.captureOnCommitCallbacks(execute=False) as encoladas:
+            primera = self.client.post(self.url, self.body, format="json").data["id"]
+            segunda = self.client.post(self.url, self.body, format="json").data["id"]
+        self.assertEqual((primera, len(encoladas)), (segunda, 1))
+        # Aunque dos requests lleguen a la vez, el índice único frena el segundo INSERT
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GeneracionCuotasJob.objects.create(
+                periodo_mes=3, periodo_anio=2025, valor_base=1, fecha_vencimiento=timezone.now(),
+                periodo_activo="2025-03",
+            )
+        self.assertIsNone(procesar_job(primera).periodo_activo)
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertNotEqual(self.client.post(self.url, self.body, format="json").data["id"], primera)
+
+    def test_reencola_la_corrida_abandonada(self):
+        crear_socios(3)
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self.client.post(self.url, self.body, format="json").data["id"]
+        _procesar_lote(job_id, 2)
+        # El proceso que la tenía se reinició: la corrida quedó en proceso sin avanzar
+        GeneracionCuotasJob.objects.filter(pk=job_id).update(
+            estado="en_proceso", fecha_actualizacion=timezone.now() - timedelta(hours=1),
+        )
+        with mock.patch("sis_app.generacion_cuotas._ejecutor.submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True), self.assertLogs("sis_app.generacion_cuotas", "WARNING"):
+                self.assertEqual(self.client.post(self.url, self.body, format="json").data["id"], job_id)
+            # Ya no está abandonada: otro request no la vuelve a encolar
+            self.client.get(f"/api/cuotas/generaciones/{job_id}/")
+        submit.assert_called_once()
+        job = procesar_job(submit.call_args.args[1])
+        self.assertEqual((job.estado, job.cuotas_creadas), ("completado", 3))
+
+    def test_comando_toma_solo_las_abandonadas(self):
+        crear_socios(2)
+        with self.captureOnCommitCallbacks(execute=False):
+            activa = self.client.post(self.url, self.body, format="json").data["id"]
+            abandonada = self.client.post(self.url, {**self.body, "mes": 4}, format="json").data["id"]
+        GeneracionCuotasJob.objects.filter(pk=abandonada).update(fecha_actualizacion=timezone.now() - timedelta(hours=1))
+
+        call_command("procesar_generacion_cuotas", abandonadas=True, stdout=StringIO())
+
+        estados = dict(GeneracionCuotasJob.objects.values_list("id", "estado"))
+        self.assertEqual((estados[activa], estados[abandonada]), ("pendiente", "completado"))
+
+    def _contar_consultas(self, cantidad_socios, prefijo):
+        socios = crear_socios(cantidad_socios, prefijo)
+        Inscripcion.objects.bulk_create([
+            Inscripcion(usuario_socio=s, actividad=self.yoga) for s in socios
+        ])
+        with CaptureQueriesContext(connection) as ctx, transaction.atomic():
+            creadas = generar_cuotas(3, 2025, Decimal("5000"), timezone.now())
+        self.assertEqual(len(creadas), cantidad_socios)
+        Cuota.objects.all().delete()
+        Usuario.objects.filter(username__startswith=prefijo).update(estado="baja")
+        return len(ctx.captured_queries)
+
+    def test_cantidad_de_consultas_constante(self):
+        """Benchmark: la cantidad de consultas no depende de la cantidad de socios."""
+        # Hasta 90 socios: SQLite parte los INSERT masivos en lotes de ~100 filas
+        # (límite de parámetros), a partir de ahí se suma una consulta por lote.
+        consultas = {n: self._contar_consultas(n, f"s{n}_") for n in (10, 50, 90)}
+        self.assertEqual(len(set(consultas.values())), 1, consultas)
+        self.assertLessEqual(consultas[10], 10)
+
+
+# =====================================================
+#        TOTALES DESNORMALIZADOS DE CUOTA
+# =====================================================
+class TotalesCuotaTest(TestCase):
+    def setUp(self):
+        self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.yoga = crear_actividad(self.staff, "Yoga", "1000.00")
+        self.pesas = crear_actividad(self.staff, "Pesas", "2500.00")
+        self.socio, = crear_socios(1)
+        self.insc_yoga = Inscripcion.objects.create(usuario_socio=self.socio, actividad=self.yoga)
+        self.insc_pesas = Inscripcion.objects.create(usuario_socio=self.socio, actividad=self.pesas)
+        self.cuota = Cuota.objects.create(
+            usuario_socio=self.socio,
+            fecha_vencimiento=timezone.now(),
+            valor_base=Decimal("5000.00"),
+            periodo_mes=1,
+            periodo_anio=2025,
+        )
+
+    def assertTotales(self, valor_actividades, valor_total):
+        self.cuota.refresh_from_db()
+        self.assertEqual(self.cuota.valor_actividades, Decimal(valor_actividades))
+        self.assertEqual(self.cuota.valor_total, Decimal(valor_total))
+
+    def test_cambios_en_inscripciones(self):
+        self.assertTotales("0", "5000")
+        self.cuota.inscripciones.add(self.insc_yoga, self.insc_pesas)
+        self.assertEqual(self.cuota.valor_total, Decimal("8500.00"))  # instancia en memoria al día
+        self.assertTotales("3500", "8500")
+        self.cuota.inscripciones.remove(self.insc_pesas)
+        self.assertTotales("1000", "6000")
+        self.insc_yoga.cuotas.clear()
+        self.assertTotales("0", "5000")
+        self.insc_pesas.cuotas.add(self.cuota)
+        self.assertTotales("2500", "7500")
+
+    def test_cambio_de_cargo_de_actividad(self):
+        self.cuota.inscripciones.add(self.insc_yoga, self.insc_pesas)
+        self.yoga.cargo_inscripcion = Decimal("1200.00")
+        self.yoga.save()
+        self.assertTotales("3700", "8700")
+
+    def test_cambio_de_actividad_de_inscripcion(self):
+        self.cuota.inscripciones.add(self.insc_yoga)
+        self.insc_yoga.actividad = self.pesas
+        self.insc_yoga.save()
+        self.assertTotales("2500", "7500")
+        # También desde la API
+        response = APIClient().patch(
+            f"/api/inscripciones/{self.insc_yoga.id}/", {"actividad": self.yoga.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTotales("1000", "6000")
+        # Guardar sin cambiar la actividad no recalcula
+        self.insc_yoga.refresh_from_db()
+        with self.assertNumQueries(2):
+            self.insc_yoga.save()
+
+    def test_baja_de_inscripcion_y_cambio_de_valor_base(self):
+        self.cuota.inscripciones.add(self.insc_yoga, self.insc_pesas)
+        self.insc_pesas.delete()
+        self.assertTotales("1000", "6000")
+        self.cuota.valor_base = Decimal("4000.00")
+        self.cuota.save(update_fields=["valor_base"])
+        self.assertTotales("1000", "5000")
+
+    def test_comando_recalcular_totales(self):
+        self.cuota.inscripciones.add(self.insc_yoga)
+        Cuota.objects.update(valor_actividades=0, valor_total=0)
+        call_command("recalcular_totales", lote=1, stdout=StringIO())
+        self.assertTotales("1000", "6000")
+
+    def test_listado_sin_consultas_por_fila(self):
+        client = APIClient()
+        socios = crear_socios(20, "lst")
+        Inscripcion.objects.bulk_create([
+            Inscripcion(usuario_socio=s, actividad=self.yoga) for s in socios
+        ])
+        with transaction.atomic():
+            generar_cuotas(2, 2025, Decimal("5000"), timezone.now())
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/api/cuotas/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 22)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        fila = next(c for c in response.data if c["usuario_socio"] == socios[0].id)
+        self.assertEqual(fila["valor_total"], "6000.00")
+        self.assertEqual(fila["inscripciones_detalle"][0]["actividad"], "Yoga")
+
+
+# =====================================================
+#        LISTADO DE CUOTAS: CURSOR Y STREAMING
+# =====================================================
+class ListadoCuotasTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.socios = crear_socios(7)
+        base = timezone.now()
+        # Vencimientos en orden inverso a los ids, con un par repetido
+        for i, socio in enumerate(self.socios):
+            Cuota.objects.create(
+                usuario_socio=socio,
+                fecha_vencimiento=base - timedelta(days=min(i, 5)),
+                valor_base=Decimal("100.00"),
+                estado="atrasada" if i % 2 else "al_dia",
+                periodo_mes=1,
+                periodo_anio=2025,
+            )
+
+    def _recorrer(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [c["id"] for c in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def test_sin_parametros_devuelve_lista_completa(self):
+        response = self.client.get("/api/cuotas/")
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_paginacion_por_cursor(self):
+        ids = self._recorrer("/api/cuotas/?page_size=3")
+        self.assertEqual(ids, sorted(Cuota.objects.values_list("id", flat=True)))
+
+    def test_paginacion_por_fecha_vencimiento(self):
+        ids = self._recorrer("/api/cuotas/?page_size=2&orden=fecha_vencimiento")
+        esperado = list(Cuota.objects.order_by("fecha_vencimiento", "id").values_list("id", flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_atrasadas_paginadas(self):
+        ids = self._recorrer("/api/cuotas/atrasadas/?page_size=2")
+        self.assertEqual(ids, sorted(Cuota.objects.filter(estado="atrasada").values_list("id", flat=True)))
+
+    def test_stream_ndjson(self):
+        response = self.client.get("/api/cuotas/?stream=ndjson&estado=al_dia")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        filas = [json.loads(linea) for linea in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([f["id"] for f in filas], sorted(Cuota.objects.filter(estado="al_dia").values_list("id", flat=True)))
+        self.assertEqual(filas[0]["valor_total"], "100.00")
+
+    async def test_stream_ndjson_bajo_asgi(self):
+        # Bajo ASGI el contenido es async: sale un bloque de líneas por vez
+        with mock.patch.object(CuotaViewSet, "stream_chunk_size", 2), warnings.catch_warnings():
+            warnings.simplefilter("error")
+            response = await self.async_client.get("/api/cuotas/?stream=ndjson")
+            self.assertTrue(response.is_async)
+            bloques = [bloque async for bloque in response.streaming_content]
+        self.assertEqual([bloque.count(b"\n") for bloque in bloques], [2, 2, 2, 1])
+        filas = [json.loads(linea) for linea in b"".join(bloques).splitlines()]
+        esperado = [id async for id in Cuota.objects.order_by("id").values_list("id", flat=True)]
+        self.assertEqual([f["id"] for f in filas], esperado)
+
+
+
+class CursorVencimientosRepetidosTest(TestCase):
+    """Más de mil cuotas con el mismo vencimiento, como las de un mes generado junto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        socios = crear_socios(750, "rep")
+        vencimiento = timezone.now() - timedelta(days=20)
+        Cuota.objects.bulk_create([
+            Cuota(usuario_socio=socio, fecha_vencimiento=vencimiento, valor_base=Decimal("100.00"),
+                  estado="atrasada", periodo_mes=mes, periodo_anio=2025)
+            for socio in socios for mes in (1, 2)
+        ])
+
+    def _recorrer(self, url, clave="next"):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pagina = [c["id"] for c in response.data["results"]]
+            ids = pagina + ids if clave == "previous" else ids + pagina
+            url = response.data[clave]
+            # El cursor de DRF repetía páginas sin terminar
+            self.assertLessEqual(len(ids), 1500)
+        return ids
+
+    def test_por_fecha_vencimiento_recorre_todas(self):
+        esperado = list(Cuota.objects.order_by("fecha_vencimiento", "id").values_list("id", flat=True))
+        self.assertEqual(self._recorrer("/api/cuotas/?page_size=200&orden=fecha_vencimiento"), esperado)
+
+    def test_hacia_atras(self):
+        url = "/api/cuotas/?page_size=400&orden=-fecha_vencimiento"
+        primera = self.client.get(url).data
+        tercera = self.client.get(self.client.get(primera["next"]).data["next"]).data
+        self.assertIsNotNone(tercera["next"])
+        cuarta = self.client.get(tercera["next"]).data
+        self.assertIsNone(cuarta["next"])
+        esperado = list(Cuota.objects.order_by("-fecha_vencimiento", "-id").values_list("id", flat=True))
+        ids = self._recorrer(cuarta["previous"], "previous") + [c["id"] for c in cuarta["results"]]
+        self.assertEqual(ids, esperado)
+
+    def test_atrasadas_por_dias_de_atraso(self):
+        esperado = list(Cuota.objects.order_by("-fecha_vencimiento", "-id").values_list("id", flat=True))
+        self.assertEqual(self._recorrer("/api/cuotas/atrasadas/?page_size=300&orden=dias_atraso&fields=id,estado"),
+                         esperado)
+
+    def test_cola_de_revision(self):
+        Cuota.objects.update(estado="pendiente_revision")
+        esperado = list(Cuota.objects.order_by("fecha_vencimiento", "id").values_list("id", flat=True))
+        self.assertEqual(self._recorrer("/api/cuotas/revision/?page_size=400&orden=fecha_vencimiento"), esperado)
+
+    def test_cursor_invalido(self):
+        from rest_framework.pagination import Cursor
+        from .pagination import CuotaCursorPagination
+        paginador = CuotaCursorPagination()
+        paginador.base_url = "http://testserver/api/cuotas/"
+        for posicion in ("x", '["1"]', '["no-es-fecha", "1"]'):
+            with self.subTest(posicion=posicion):
+                url = paginador.encode_cursor(Cursor(offset=0, reverse=False, position=posicion))
+                self.assertEqual(self.client.get(url + "&orden=fecha_vencimiento").status_code, 404)
+
+# =====================================================
+#        PRESUPUESTO DE CONSULTAS POR ENDPOINT
+# =====================================================
+# Los presupuestos son del cálculo de cada respuesta, sin la caché de la API
+@override_settings(CACHE_API={"ACTIVO": False})
+class PresupuestoConsultasTest(TestCase):
+    """
+    Cada endpoint tiene un presupuesto fijo de consultas que no puede depender
+    de la cantidad de filas: si reaparece un N+1, la cuenta cambia entre 10,
+    100 y 1000 filas y el test falla.
+    """
+    # endpoint -> máximo de consultas. Usuarios, actividades, inscripciones y
+    # compensaciones suman la lectura de VersionTabla para el ETag.
+    presupuestos = {
+        "/api/usuarios/": 4,               # versión + count + página + groups
+        "/api/usuarios/{socio}/": 3,
+        "/api/actividades/": 3,            # versión + count + página (con COUNT anotado)
+        "/api/actividades/?expand=inscriptos": 4,
+        "/api/actividades/{actividad}/": 3,
+        "/api/actividades/{actividad}/inscriptos/": 2,   # actividad + página de inscriptos
+        "/api/inscripciones/": 3,
+        "/api/cuotas/": 2,                 # cuotas + inscripciones/actividad
+        "/api/cuotas/?page_size=50": 2,
+        "/api/cuotas/atrasadas/": 2,
+        "/api/cuotas/{cuota}/": 2,
+        "/api/compensaciones/": 3,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.filas = 0
+
+    def _sembrar_hasta(self, total):
+        """Agrega socios, actividades, inscripciones, cuotas y compensaciones hasta `total` de cada uno."""
+        desde, self.filas = self.filas, total
+        nuevos = range(desde, total)
+        socios = crear_socios(total - desde, f"q{desde}_")
+        inicio = timezone.now()
+        Actividad.objects.bulk_create([
+            Actividad(
+                nombre=f"Actividad {i}", descripcion="", fecha_hora_inicio=inicio,
+                fecha_hora_fin=inicio, cargo_inscripcion=Decimal("100.00"), usuario_staff=self.staff,
+            )
+            for i in nuevos
+        ])
+        actividades = list(Actividad.objects.order_by("id")[desde:total])
+        Inscripcion.objects.bulk_create([
+            Inscripcion(usuario_socio=s, actividad=a) for s, a in zip(socios, actividades)
+        ])
+        with transaction.atomic():
+            generar_cuotas(1, 2025, Decimal("1000"), inicio)
+        CompensacionStaff.objects.bulk_create([
+            CompensacionStaff(periodo="2025-01", usuario_staff=self.staff, actividad=a, monto=Decimal("10"))
+            for a in actividades
+        ])
+        self.ids = {
+            "socio": socios[0].id,
+            "actividad": actividades[0].id,
+            "cuota": Cuota.objects.values_list("id", flat=True).first(),
+        }
+
+    def _medir(self):
+        consultas = {}
+        for endpoint in self.presupuestos:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(endpoint.format(**self.ids))
+            self.assertEqual(response.status_code, 200, endpoint)
+            consultas[endpoint] = len(ctx.captured_queries)
+        return consultas
+
+    def test_presupuesto_constante(self):
+        mediciones = {}
+        for total in (10, 100, 1000):
+            self._sembrar_hasta(total)
+            mediciones[total] = self._medir()
+
+        for endpoint, presupuesto in self.presupuestos.items():
+            with self.subTest(endpoint=endpoint):
+                cuentas = {total: m[endpoint] for total, m in mediciones.items()}
+                self.assertEqual(len(set(cuentas.values())), 1, cuentas)
+                self.assertLessEqual(cuentas[10], presupuesto)
+
+
+# =====================================================
+#        ROLES CACHEADOS DE USUARIO
+# =====================================================
+class RolesUsuarioTest(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username="ana", dni="123")
+        self.usuario.groups.add(Group.objects.get(name="socio"))
+
+    def test_roles_se_consultan_una_vez(self):
+        usuario = Usuario.objects.get(pk=self.usuario.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual((usuario.es_admin, usuario.es_staff, usuario.es_socio), (False, False, True))
+
+    def test_roles_desde_prefetch(self):
+        usuario = Usuario.objects.prefetch_related("groups").get(pk=self.usuario.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario.es_socio)
+            self.assertFalse(usuario.es_admin)
+
+    def test_cambio_de_grupos_invalida_roles(self):
+        self.assertFalse(self.usuario.es_staff)
+        self.usuario.groups.add(Group.objects.get(name="staff"))
+        self.assertTrue(self.usuario.es_staff)
+        self.assertTrue(self.usuario.is_staff)
+        self.usuario.groups.clear()
+        self.assertEqual(self.usuario.roles, frozenset())
+        self.assertFalse(self.usuario.is_staff)
+
+    def test_login_emite_roles_en_el_token(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.usuario.set_password("clave-segura-123")
+        self.usuario.save()
+        response = APIClient().post(
+            "/api/auth/login/", {"username": "ana", "password": "clave-segura-123"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data["access"])["roles"], ["socio"])
+        self.assertTrue(response.data["user"]["es_socio"])
+
+
+# =====================================================
+#        DASHBOARD
+# =====================================================
+class DashboardTest(TestCase):
+    url = "/api/dashboard/resumen/?mes=4&anio=2025"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.staff.groups.add(Group.objects.get(name="staff"))
+        self.socios = crear_socios(3)
+        Usuario.objects.filter(pk=self.socios[2].pk).update(estado="baja")
+        crear_actividad(self.staff, "Yoga")
+        for socio, estado in zip(self.socios, ["al_dia", "atrasada", "al_dia"]):
+            Cuota.objects.create(
+                usuario_socio=socio, fecha_vencimiento=timezone.now(), valor_base=Decimal("1000.00"),
+                estado=estado, periodo_mes=4, periodo_anio=2025,
+            )
+
+    def test_resumen(self):
+        data = self.client.get(self.url).data
+        self.assertEqual(data["roles"], {"total": 4, "admin": 0, "staff": 1, "socios": 3})
+        self.assertEqual(data["socios_por_estado"], {"activo": 2, "inactivo": 0, "baja": 1})
+        self.assertEqual(data["cuotas"]["facturado"], Decimal("3000.00"))
+        self.assertEqual(data["cuotas"]["cobrado"], Decimal("2000.00"))
+        self.assertEqual(data["cuotas"]["por_estado"]["atrasada"], 1)
+        self.assertEqual([a["nombre"] for a in data["proximas_actividades"]], ["Yoga"])
+
+    def test_resumen_roles_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/usuarios/resumen_roles/").data
+        self.assertEqual(data, {"total": 4, "admin": 0, "staff": 1, "socios": 3})
+
+    @override_settings(CACHE_API={"ACTIVO": True})
+    def test_cache_e_invalidacion(self):
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        cuota = Cuota.objects.get(usuario_socio=self.socios[1])
+        cuota.estado = "al_dia"
+        cuota.save()
+
+        self.assertEqual(self.client.get(self.url).data["cuotas"]["cobrado"], Decimal("3000.00"))
+
+    @override_settings(CACHE_API={"ACTIVO": False})
+    def test_sin_cache_compartida_no_cachea(self):
+        # Con la caché de la API apagada (memoria por proceso) se calcula en cada request
+        for _ in range(2):
+            with self.assertNumQueries(3):
+                self.client.get(self.url)
+
+
+# =====================================================
+#        IMPORTACIÓN MASIVA DE SOCIOS
+# =====================================================
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ImportacionSociosTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Usuario.objects.create(username="juan.perez", dni="30000000", first_name="Juan", last_name="Perez")
+
+    def _csv(self, texto, nombre="socios.csv"):
+        return SimpleUploadedFile(nombre, texto.encode("utf-8"), content_type="text/csv")
+
+    def test_importa_csv_y_resuelve_colisiones(self):
+        archivo = self._csv(
+            "nombre;apellido;dni;email;password\n"
+            "Juan;Perez;31000000;juan@club.com;clave-1\n"
+            "Juan;Perez;;;\n"
+            "Ana;Gomez;30000000;;\n"       # DNI repetido
+            "Luis;Diaz;32000000;no-es-mail;\n"
+        )
+        response = self.client.post("/api/usuarios/importar/", {"archivo": archivo}, format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["total_filas"], 4)
+        self.assertEqual(response.data["creados"], 2)
+        self.assertEqual(
+            [(e["fila"], list(e["errores"])) for e in response.data["errores"]],
+            [(4, ["dni"]), (5, ["email"])],
+        )
+        nuevos = Usuario.objects.filter(first_name="Juan").exclude(username="juan.perez").order_by("id")
+        self.assertEqual([u.username for u in nuevos], ["juan.perez1", "juan.perez2"])
+        self.assertTrue(nuevos[0].check_password("clave-1"))
+        self.assertTrue(nuevos[1].check_password("Club2025!"))
+        self.assertTrue(all(u.es_socio for u in nuevos))
+        self.assertEqual(len(nuevos[1].dni), 10)
+
+    def test_consultas_no_dependen_de_las_filas(self):
+        def importar(cantidad, prefijo):
+            filas = "".join(f"{prefijo}{i},Socio,\n" for i in range(cantidad))
+            archivo = io.BytesIO(f"nombre,apellido,dni\n{filas}".encode())
+            with CaptureQueriesContext(connection) as ctx:
+                resultado = importar_socios(archivo, "socios.csv", procesos=1)
+            self.assertEqual(resultado["creados"], cantidad)
+            return len(ctx.captured_queries)
+
+        # Hasta ~60 filas: SQLite parte los INSERT de Usuario en lotes por su límite de parámetros
+        self.assertEqual(importar(10, "a"), importar(50, "b"))
+
+    def test_pool_de_procesos_y_comando(self):
+        ruta = os.path.join(tempfile.mkdtemp(), "socios.csv")
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write("nombre_completo,password\n" + "".join(f"Socia Numero{i},clave-{i}\n" for i in range(6)))
+
+        salida = StringIO()
+        call_command("importar_socios", ruta, procesos=2, lote=4, stdout=salida, stderr=StringIO())
+
+        self.assertIn("6 de 6 filas importadas", salida.getvalue())
+        socia = Usuario.objects.get(username="socia.numero3")
+        self.assertTrue(socia.check_password("clave-3"))
+
+    def test_grupo_staff_marca_is_staff(self):
+        archivo = self._csv("nombre,apellido\nPaula,Lopez\n")
+        response = self.client.post("/api/usuarios/importar/", {"archivo": archivo, "grupo": "staff"}, format="multipart")
+
+        self.assertEqual(response.data["creados"], 1)
+        paula = Usuario.objects.get(username="paula.lopez")
+        self.assertTrue(paula.is_staff)
+        self.assertEqual(paula.roles, {"staff"})
+
+    def test_alta_concurrente_es_error_de_fila(self):
+        from . import importacion
+        hashear = importacion._hashear
+
+        def alta_concurrente(pool, passwords):
+            # Otro request da de alta el mismo DNI después de la precarga
+            Usuario.objects.create(username="otra", dni="34000000")
+            return hashear(pool, passwords)
+
+        archivo = io.BytesIO("nombre,apellido,dni,password\nAna,Sosa,34000000,x\nEva,Rey,35000000,y\n".encode())
+        with mock.patch.object(importacion, "_hashear", alta_concurrente):
+            resultado = importar_socios(archivo, "socios.csv")
+
+        self.assertEqual(resultado["creados"], 1)
+        self.assertEqual(resultado["errores"], [{"fila": 2, "errores": {"dni": "Ya existe un usuario con este DNI"}}])
+        self.assertTrue(Usuario.objects.get(username="eva.rey").check_password("y"))
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+        libro = Workbook()
+        libro.active.append(["Nombre", "Apellido", "DNI", "Estado"])
+        libro.active.append(["Marta", "Ruiz", 33000000, "Inactiva"])
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        archivo = SimpleUploadedFile("socios.xlsx", contenido.getvalue())
+
+        response = self.client.post("/api/usuarios/importar/", {"archivo": archivo}, format="multipart")
+
+        self.assertEqual(response.data["creados"], 1)
+        marta = Usuario.objects.get(username="marta.ruiz")
+        self.assertEqual((marta.dni, marta.estado), ("33000000", "inactivo"))
+
+    def test_formato_invalido(self):
+        archivo = SimpleUploadedFile("socios.txt", b"hola")
+        response = self.client.post("/api/usuarios/importar/", {"archivo": archivo}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+
+
+# =====================================================
+#        ASIGNACIÓN DE USERNAME / DNI
+# =====================================================
+class IdentificadoresTest(TestCase):
+    def test_siguiente_username_en_una_consulta(self):
+        Usuario.objects.bulk_create([
+            Usuario(username=u, dni=str(i)) for i, u in enumerate(
+                ["juan.perez", "juan.perez1", "juan.perez7", "juan.perez.garcia", "juan.perezz"]
+            )
+        ])
+        with self.assertNumQueries(1):
+            self.assertEqual(siguiente_username("juan.perez"), "juan.perez8")
+        self.assertEqual(siguiente_username("ana.gomez"), "ana.gomez")
+
+    def test_siguiente_dni(self):
+        self.assertEqual(siguiente_dni(), "9000000001")
+        Usuario.objects.bulk_create([
+            Usuario(username="a", dni="9123456789"),
+            Usuario(username="b", dni="95123456"),  # DNI real que empieza con 9
+        ])
+        self.assertEqual(siguiente_dni(), "9123456790")
+
+    def test_alta_reintenta_ante_colision(self):
+        Usuario.objects.create(username="ana.gomez", dni="1")
+        serializer = UsuarioSerializer(data={"first_name": "Ana", "last_name": "Gomez", "dni": "2"})
+        serializer.is_valid(raise_exception=True)
+
+        # Simula otra alta concurrente que tomó 'ana.gomez' entre el cálculo y el INSERT
+        with mock.patch("sis_app.serializers.siguiente_username", side_effect=["ana.gomez", "ana.gomez1"]):
+            usuario = serializer.save()
+
+        self.assertEqual(usuario.username, "ana.gomez1")
+
+    def test_alta_no_reintenta_si_choca_el_dni_enviado(self):
+        from rest_framework.exceptions import ValidationError
+        serializer = UsuarioSerializer(data={"first_name": "Ana", "last_name": "Gomez", "dni": "2"})
+        serializer.is_valid(raise_exception=True)
+        # Otra alta concurrente tomó el DNI enviado después de la validación
+        Usuario.objects.create(username="otra", dni="2")
+
+        with mock.patch("sis_app.serializers.siguiente_username", return_value="ana.gomez") as generar:
+            with self.assertRaises(ValidationError) as error:
+                serializer.save()
+
+        self.assertEqual(list(error.exception.detail), ["dni"])
+        self.assertEqual(generar.call_count, 1)
+
+    def test_dnis_de_importacion_y_alta_con_el_mismo_esquema(self):
+        from .identificadores import AsignadorEnMemoria
+        Usuario.objects.create(username="a", dni="9000000005")
+        asignador = AsignadorEnMemoria(["a"], ["9000000005", "95123456"])
+        self.assertEqual([asignador.dni(), asignador.dni()], ["9000000006", "9000000007"])
+        Usuario.objects.create(username="b", dni="9000000007")
+        self.assertEqual(siguiente_dni(), "9000000008")
+
+    def test_alta_via_api(self):
+        Usuario.objects.bulk_create([Usuario(username=f"juan.perez{i or ''}", dni=str(i)) for i in range(300)])
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().post(
+                "/api/usuarios/", {"first_name": "Juan", "last_name": "Pérez", "dni": "40111222"}, format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["username"], "juan.perez300")
+        self.assertLess(len(ctx.captured_queries), 10)
+
+
+# =====================================================
+#        PLANES DE EJECUCIÓN (EXPLAIN)
+# =====================================================
+def tablas_con_full_scan(queryset):
+    """
+    Tablas que el motor recorre completas para ejecutar `queryset`, según
+    EXPLAIN. Soporta SQLite (EXPLAIN QUERY PLAN) y MySQL (EXPLAIN FORMAT=JSON);
+    con otros motores devuelve None.
+    """
+    if connection.vendor == "sqlite":
+        # "SCAN tabla" sin índice es un recorrido completo; "SEARCH ..." o
+        # "SCAN tabla USING [COVERING] INDEX ..." usan un índice.
+        return {
+            linea.split()[linea.split().index("SCAN") + 1]
+            for linea in queryset.explain().splitlines()
+            if "SCAN" in linea.split() and "USING" not in linea
+        }
+    if connection.vendor == "mysql":
+        tablas = set()
+
+        def recorrer(nodo):
+            if isinstance(nodo, dict):
+                if nodo.get("access_type") == "ALL":
+                    tablas.add(nodo.get("table_name"))
+                for valor in nodo.values():
+                    recorrer(valor)
+            elif isinstance(nodo, list):
+                for valor in nodo:
+                    recorrer(valor)
+
+        recorrer(json.loads(queryset.explain(format="JSON")))
+        return tablas
+    return None
+
+
+class PlanesDeConsultaTest(TestCase):
+    """
+    Ejecuta el get_queryset de cada ViewSet con sus filtros habituales y
+    verifica con EXPLAIN que la tabla principal se lea por índice.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        socios = crear_socios(200, "pl")
+        actividades = [crear_actividad(cls.staff, f"Act {i}") for i in range(5)]
+        Inscripcion.objects.bulk_create([
+            Inscripcion(usuario_socio=s, actividad=actividades[i % 5]) for i, s in enumerate(socios)
+        ])
+        with transaction.atomic():
+            generar_cuotas(1, 2025, Decimal("1000"), timezone.now())
+        CompensacionStaff.objects.bulk_create([
+            CompensacionStaff(periodo=f"2025-{m:02d}", usuario_staff=cls.staff, actividad=a, monto=Decimal("10"))
+            for m in range(1, 13) for a in actividades
+        ])
+        cls.socio = socios[0]
+        cls.actividad = actividades[0]
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")  # estadísticas para el planificador, como en producción
+
+    def setUp(self):
+        if tablas_con_full_scan(Usuario.objects.all()) is None:
+            self.skipTest(f"EXPLAIN no soportado en {connection.vendor}")
+
+    def _queryset(self, viewset, params):
+        request = Request(RequestFactory().get("/", params))
+        view = viewset()
+        view.request, view.format_kwarg, view.kwargs = request, None, {}
+        return view.get_queryset()
+
+    def test_filtros_de_los_viewsets_usan_indices(self):
+        s, a, st = self.socio.id, self.actividad.id, self.staff.id
+        casos = [
+            (UsuarioViewSet, {"estado": "baja"}, Usuario),
+            (ActividadViewSet, {"estado": "finalizada"}, Actividad),
+            (ActividadViewSet, {"estado": "activa", "usuario_staff": st}, Actividad),
+            (InscripcionViewSet, {"usuario_socio": s, "estado": "confirmada"}, Inscripcion),
+            (InscripcionViewSet, {"actividad": a, "estado": "cancelada"}, Inscripcion),
+            (CuotaViewSet, {"estado": "pendiente_revision"}, Cuota),
+            (CuotaViewSet, {"usuario_socio": s, "estado": "atrasada"}, Cuota),
+            (CompensacionStaffViewSet, {"periodo": "2025-03"}, CompensacionStaff),
+        ]
+        for viewset, params, modelo in casos:
+            with self.subTest(viewset=viewset.__name__, params=params):
+                queryset = self._queryset(viewset, params)
+                self.assertNotIn(modelo._meta.db_table, tablas_con_full_scan(queryset), queryset.explain())
+
+    def test_totales_del_periodo_usan_indice(self):
+        queryset = Cuota.objects.filter(periodo_mes=1, periodo_anio=2025, estado="al_dia").values("valor_total")
+        self.assertNotIn(Cuota._meta.db_table, tablas_con_full_scan(queryset), queryset.explain())
+
+
+# =====================================================
+#        DATOS SINTÉTICOS Y BENCHMARK
+# =====================================================
+class BenchmarkApiTest(TestCase):
+    """
+    Genera un volumen chico de datos sintéticos y corre el benchmark de la API
+    comparando sólo estado HTTP y cantidad de consultas contra la línea base
+    guardada (la latencia depende de la máquina: se controla con benchmark_api).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("generar_datos_prueba", socios=60, actividades=10, meses=3, stdout=StringIO())
+
+    def test_generador_crea_todos_los_modelos(self):
+        self.assertEqual(Usuario.objects.filter(groups__name="socio").count(), 60)
+        self.assertEqual(Actividad.objects.count(), 10)
+        self.assertTrue(Inscripcion.objects.exists())
+        activos = Usuario.objects.filter(groups__name="socio", estado="activo").count()
+        self.assertEqual(Cuota.objects.count(), activos * 3)
+        self.assertEqual(CompensacionStaff.objects.count(), 10 * 3)
+        # Los totales desnormalizados coinciden con las inscripciones de cada cuota
+        cuota = Cuota.objects.filter(valor_actividades__gt=0).first()
+        cargos = sum(i.actividad.cargo_inscripcion for i in cuota.inscripciones.all())
+        self.assertEqual(cuota.valor_actividades, cargos)
+
+    def test_sin_regresiones_de_consultas(self):
+        from . import benchmark
+        resultados = benchmark.ejecutar(iteraciones=2)
+        base = benchmark.cargar_baseline()
+        self.assertEqual(set(resultados), set(base["escenarios"]))
+        self.assertEqual(benchmark.comparar(resultados, base, solo_consultas=True), [])
+
+    def test_comparar_detecta_regresiones(self):
+        from .benchmark import comparar
+        base = {"escenarios": {"x": {"estado": 200, "consultas": 2, "p95_ms": 10.0, "memoria_kb": 100.0}}}
+        igual = {"x": {"estado": 200, "consultas": 2, "p95_ms": 12.0, "memoria_kb": 120.0}}
+        peor = {"x": {"estado": 500, "consultas": 3, "p95_ms": 100.0, "memoria_kb": 1000.0}}
+        self.assertEqual(comparar(igual, base), [])
+        self.assertEqual(len(comparar(peor, base)), 4)
+        self.assertEqual(len(comparar(peor, base, solo_consultas=True)), 2)
+
+
+# =====================================================
+#        INSTRUMENTACIÓN POR REQUEST
+# =====================================================
+@override_settings(INSTRUMENTACION={"MUESTREO": 1.0, "METRICAS_TOKEN": "secreto"})
+class InstrumentacionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        crear_actividad(cls.staff)
+
+    def setUp(self):
+        from .instrumentacion import registro
+        registro.reiniciar()
+
+    def test_server_timing_y_log_con_vista_y_accion(self):
+        with self.assertLogs("sis_app.instrumentacion", "INFO") as logs:
+            response = self.client.get("/api/actividades/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ consultas, \d+ repetidas", ser;dur=')
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((registro["vista"], registro["accion"]), ("ActividadViewSet", "list"))
+        self.assertGreater(registro["sql_consultas"], 0)
+        self.assertEqual(registro["bytes"], len(response.content))
+
+        with self.assertLogs("sis_app.instrumentacion", "INFO") as logs:
+            self.client.get(f"/api/actividades/{Actividad.objects.get().pk}/inscriptos/")
+        self.assertEqual(json.loads(logs.records[-1].getMessage())["accion"], "inscriptos")
+
+    def test_detecta_consultas_repetidas(self):
+        from .instrumentacion import Medicion, firma
+        self.assertEqual(
+            firma("SELECT * FROM t WHERE id IN (%s, %s, %s)"), firma("SELECT * FROM t WHERE id IN (%s)")
+        )
+        medicion = Medicion()
+        with connection.execute_wrapper(medicion.registrar_consulta):
+            for socio in Usuario.objects.all():
+                for _ in range(5):
+                    list(socio.actividades_dictadas.all())
+        self.assertEqual(medicion.consultas, 6)
+        self.assertEqual(medicion.duplicadas, 4)
+        self.assertEqual(len(medicion.sospechosas(5)), 1)
+
+    @override_settings(INSTRUMENTACION={"MUESTREO": 0.0})
+    def test_requests_no_muestreados_no_miden_sql(self):
+        response = self.client.get("/api/actividades/")
+        self.assertTrue(response["Server-Timing"].startswith("total;dur="))
+
+    def test_metricas_prometheus_con_token(self):
+        self.client.get("/api/actividades/")
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secreto")
+        self.assertEqual(response.status_code, 200)
+        texto = response.content.decode()
+        self.assertIn(
+            'sis_http_requests_total{vista="ActividadViewSet",accion="list",metodo="GET",estado="200"} 1', texto
+        )
+        self.assertIn('sis_http_duracion_segundos_bucket{vista="ActividadViewSet",accion="list",'
+                      'metodo="GET",le="+Inf"} 1', texto)
+        self.assertIn('sis_sql_consultas_total{vista="ActividadViewSet",accion="list"}', texto)
+        # Desde el proxy local, sin token o con otro, no responde
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer otro").status_code, 403)
+        with override_settings(INSTRUMENTACION={"METRICAS_TOKEN": "secreto", "METRICAS_IPS": ["127.0.0.1"]}):
+            self.assertEqual(
+                self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secreto", REMOTE_ADDR="10.0.0.8").status_code,
+                403,
+            )
+
+    @override_settings(INSTRUMENTACION={})
+    def test_metricas_sin_token_configurado(self):
+        from .instrumentacion import DEFAULTS
+        self.assertLess(DEFAULTS["MUESTREO"], 1.0)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+
+# =====================================================
+#        AUTENTICACIÓN JWT SIN CONSULTAS
+# =====================================================
+class AutenticacionJWTTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(
+            username="admin1", password="Clave2025!", dni="1", first_name="Ada", estado="activo",
+        )
+        cls.usuario.groups.add(Group.objects.get_or_create(name="admin")[0])
+
+    def setUp(self):
+        from .autenticacion import usuarios_recientes
+        usuarios_recientes.limpiar()
+        response = self.client.post(
+            "/api/auth/login/", {"username": "admin1", "password": "Clave2025!"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.access = response.cookies["access_token"].value
+
+    def _request(self, metodo="get", **extra):
+        request = getattr(RequestFactory(), metodo)("/", **extra)
+        request.COOKIES["access_token"] = self.access
+        return Request(request)
+
+    def test_usuario_desde_claims_sin_consultas(self):
+        from .autenticacion import CookieJWTAuthentication
+        with self.assertNumQueries(0):
+            user, _ = CookieJWTAuthentication().authenticate(self._request())
+            self.assertEqual(user.id, self.usuario.id)
+            self.assertTrue(user.is_authenticated)
+            self.assertTrue(user.es_admin and user.is_staff)
+            self.assertFalse(user.es_socio)
+            self.assertEqual(user.estado, "activo")
+        # Un atributo que no está en el token carga la fila completa (usuario + grupos)
+        with self.assertNumQueries(2):
+            self.assertEqual(user.first_name, "Ada")
+        with self.assertNumQueries(0):
+            self.assertEqual(user.dni, "1")
+
+    def test_perfil_usa_lru_e_invalida_al_guardar(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get("/api/auth/profile/").json()["username"], "admin1")
+        with self.assertNumQueries(0):
+            self.client.get("/api/auth/profile/")
+        self.usuario.first_name = "Adela"
+        self.usuario.save()
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get("/api/auth/profile/").json()["first_name"], "Adela")
+
+    def test_cookie_exige_csrf_en_metodos_no_seguros(self):
+        from rest_framework.exceptions import PermissionDenied
+        from .autenticacion import CookieJWTAuthentication
+        with self.assertRaises(PermissionDenied):
+            CookieJWTAuthentication().authenticate(self._request("post"))
+        # Con el encabezado Authorization no aplica (no lo envía el navegador por sí solo)
+        request = Request(RequestFactory().post("/", HTTP_AUTHORIZATION=f"Bearer {self.access}"))
+        user, _ = CookieJWTAuthentication().authenticate(request)
+        self.assertEqual(user.id, self.usuario.id)
+
+    def test_token_invalido(self):
+        self.client.cookies["access_token"] = "no-es-un-jwt"
+        response = self.client.get("/api/auth/profile/")
+        self.assertEqual((response.status_code, response.json()), (401, {"error": "Token inválido"}))
+
+    def test_login_y_logout_con_cookie_vencida(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        vencido = AccessToken.for_user(self.usuario)
+        vencido.set_exp(lifetime=-timedelta(minutes=1))
+        self.client.cookies["access_token"] = str(vencido)
+        response = self.client.post(
+            "/api/auth/login/", {"username": "admin1", "password": "Clave2025!"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.cookies["access_token"] = str(vencido)
+        self.assertEqual(self.client.post("/api/auth/logout/").status_code, 200)
+
+    def test_login_con_cookie_valida_no_exige_csrf(self):
+        from django.test import Client
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.cookies["access_token"] = self.access
+        response = cliente.post(
+            "/api/auth/login/", {"username": "admin1", "password": "Clave2025!"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+# =====================================================
+#        REVISIÓN MASIVA DE COMPROBANTES
+# =====================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RevisionPagosTest(TestCase):
+    def setUp(self):
+        crear_socios(5, "rev")
+        with transaction.atomic():
+            generar_cuotas(3, 2025, Decimal("1000"), timezone.now())
+        self.cuotas = list(Cuota.objects.order_by("id"))
+        for cuota in self.cuotas[:3]:
+            cuota.comprobante = SimpleUploadedFile(f"comp{cuota.id}.pdf", b"%PDF-1.4")
+            cuota.estado = "pendiente_revision"
+            cuota.save()
+
+    def test_cola_paginada_por_cursor(self):
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/cuotas/revision/?page_size=2").json()
+        self.assertEqual([c["id"] for c in data["results"]], [c.id for c in self.cuotas[:2]])
+        self.assertEqual(set(data["results"][0]), {
+            "id", "usuario_socio", "socio", "periodo_mes", "periodo_anio",
+            "fecha_vencimiento", "valor_total", "comprobante_url",
+        })
+        siguiente = self.client.get(data["next"]).json()
+        self.assertEqual([c["id"] for c in siguiente["results"]], [self.cuotas[2].id])
+        self.assertIsNone(siguiente["next"])
+
+    def test_aprobar_en_bloque_informa_por_id(self):
+        pendiente, atrasada = self.cuotas[0].id, self.cuotas[4].id
+        response = self.client.post(
+            "/api/cuotas/aprobar_pagos/", {"ids": [pendiente, atrasada, 999999, pendiente]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {
+            "procesadas": 1,
+            "resultados": [
+                {"id": pendiente, "resultado": "ok"},
+                {"id": atrasada, "resultado": "omitida", "estado": "atrasada"},
+                {"id": 999999, "resultado": "no_encontrada"},
+            ],
+        })
+        cuota = Cuota.objects.get(pk=pendiente)
+        self.assertEqual(cuota.estado, "al_dia")
+        self.assertIsNotNone(cuota.fecha_pago)
+        # Una segunda aprobación del mismo lote no vuelve a aplicar
+        response = self.client.post("/api/cuotas/aprobar_pagos/", {"ids": [pendiente]}, content_type="application/json")
+        self.assertEqual(response.json()["resultados"][0]["resultado"], "omitida")
+
+    def test_rechazar_en_bloque_borra_archivos_en_segundo_plano(self):
+        from . import revision_pagos
+        rutas = [c.comprobante.path for c in self.cuotas[:3]]
+        self.assertTrue(all(os.path.exists(r) for r in rutas))
+        # El borrado consulta ArchivoComprobante: fuera de la transacción del
+        # test no vería sus filas, así que la tarea se corre en este hilo
+        with mock.patch.object(revision_pagos._ejecutor, "submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/api/cuotas/rechazar_pagos/", {"ids": [c.id for c in self.cuotas[:3]]},
+                    content_type="application/json",
+                )
+        self.assertEqual(response.json()["procesadas"], 3)
+        self.assertTrue(all(os.path.exists(r) for r in rutas))
+        submit.assert_called_once()
+        submit.call_args.args[0](*submit.call_args.args[1:])
+        self.assertFalse(any(os.path.exists(r) for r in rutas))
+        self.assertEqual(
+            set(Cuota.objects.filter(pk__in=[c.id for c in self.cuotas[:3]]).values_list("estado", "comprobante")),
+            {("atrasada", None)},
+        )
+
+    def test_valida_ids(self):
+        self.assertEqual(self.client.post("/api/cuotas/aprobar_pagos/", {}, content_type="application/json").status_code, 400)
+        response = self.client.post("/api/cuotas/aprobar_pagos/", {"ids": ["x"]}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+# =====================================================
+#        SUBIDA DE COMPROBANTES
+# =====================================================
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    COMPROBANTES={"TAMANIO_MAXIMO": 100 * 1024, "DIRECTORIO_SUBIDAS": tempfile.mkdtemp()},
+)
+class SubidaComprobanteTest(TestCase):
+    PDF = b"%PDF-1.4\n" + bytes(range(256)) * 200
+
+    def setUp(self):
+        socio, = crear_socios(1, "sub")
+        self.cuota = Cuota.objects.create(
+            usuario_socio=socio, valor_base=Decimal("1000"), fecha_vencimiento=timezone.now(),
+            periodo_mes=3, periodo_anio=2025,
+        )
+        self.base = f"/api/cuotas/{self.cuota.id}/subidas/"
+
+    def iniciar(self, tamanio, nombre="comprobante.pdf"):
+        return self.client.post(self.base, {"nombre": nombre, "tamanio": tamanio}, content_type="application/json")
+
+    def parte(self, url, contenido, inicio, total):
+        return self.client.put(
+            url, contenido, content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {inicio}-{inicio + len(contenido) - 1}/{total}",
+        )
+
+    def test_subida_por_partes_reanudable(self):
+        from .subida_comprobantes import ruta_parcial
+        response = self.iniciar(len(self.PDF))
+        self.assertEqual(response.status_code, 201)
+        subida = response.json()
+        self.assertEqual((subida["offset"], subida["tamanio"]), (0, len(self.PDF)))
+        url = subida["url"]
+
+        self.assertEqual(self.parte(url, self.PDF[:20000], 0, len(self.PDF)).json()["offset"], 20000)
+        # Una parte repetida (p. ej. reenviada tras un corte) no se escribe: 409 con el offset actual
+        response = self.parte(url, self.PDF[:20000], 0, len(self.PDF))
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 20000))
+        # Para reanudar se consulta el offset
+        self.assertEqual(self.client.get(url).json()["offset"], 20000)
+        self.assertEqual(self.parte(url, self.PDF[20000:], 20000, len(self.PDF)).json()["offset"], len(self.PDF))
+
+        parcial = ruta_parcial(SubidaComprobante.objects.get())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{self.base}{subida['id']}/finalizar/")
+        self.assertEqual(response.status_code, 200)
+        self.cuota.refresh_from_db()
+        self.assertEqual(self.cuota.estado, "pendiente_revision")
+        with self.cuota.comprobante.open("rb") as archivo:
+            self.assertEqual(archivo.read(), self.PDF)
+        self.assertFalse(SubidaComprobante.objects.exists())
+        self.assertFalse(os.path.exists(parcial))
+
+    def test_rechaza_tipo_por_los_primeros_bytes(self):
+        from .subida_comprobantes import ruta_parcial
+        url = self.iniciar(4000, nombre="foto.png").json()["url"]
+        parcial = ruta_parcial(SubidaComprobante.objects.get())
+        response = self.parte(url, b"MZ\x90\x00" + bytes(3996), 0, 4000)
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(SubidaComprobante.objects.exists())
+        self.assertFalse(os.path.exists(parcial))
+
+    def test_rechaza_tamanio_antes_de_leer(self):
+        self.assertEqual(self.iniciar(100 * 1024 + 1).status_code, 413)
+        self.assertEqual(self.iniciar(100, nombre="virus.exe").status_code, 400)
+        url = self.iniciar(len(self.PDF)).json()["url"]
+        # Una parte que se pasa del tamaño declarado
+        self.assertEqual(self.parte(url, self.PDF + b"x", 0, len(self.PDF) + 1).status_code, 400)
+        response = self.client.put(
+            url, self.PDF + b"x", content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes 0-{len(self.PDF)}/{len(self.PDF)}",
+        )
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.client.get(url).json()["offset"], 0)
+
+    def test_finalizar_incompleta(self):
+        subida = self.iniciar(len(self.PDF)).json()
+        self.parte(subida["url"], self.PDF[:100], 0, len(self.PDF))
+        response = self.client.post(f"{self.base}{subida['id']}/finalizar/")
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 100))
+        self.cuota.refresh_from_db()
+        self.assertEqual(self.cuota.estado, "pendiente")
+
+    def _completa(self):
+        subida = self.iniciar(len(self.PDF)).json()
+        self.parte(subida["url"], self.PDF, 0, len(self.PDF))
+        return SubidaComprobante.objects.get(pk=subida["id"])
+
+    def test_finalizar_revertido_se_puede_reintentar(self):
+        from . import subida_comprobantes
+        subida = self._completa()
+        with mock.patch.object(Cuota, "save", side_effect=RuntimeError("caída")):
+            with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+                subida_comprobantes.finalizar(subida)
+        # La transacción se revirtió y el archivo parcial sigue ahí
+        subida.refresh_from_db()
+        self.assertTrue(os.path.exists(subida_comprobantes.ruta_parcial(subida)))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{self.base}{subida.id}/finalizar/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(os.path.exists(subida_comprobantes.ruta_parcial(subida)))
+
+    def test_finalizar_sin_archivo_parcial_reinicia(self):
+        from .subida_comprobantes import ruta_parcial
+        subida = self._completa()
+        os.remove(ruta_parcial(subida))
+        response = self.client.post(f"{self.base}{subida.id}/finalizar/")
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 0))
+        self.assertEqual(self.client.get(f"{self.base}{subida.id}/").json()["offset"], 0)
+        self.assertEqual(self.parte(f"{self.base}{subida.id}/", self.PDF, 0, len(self.PDF)).status_code, 200)
+
+    def test_multipart_guarda_con_la_extension_del_tipo(self):
+        png = b"\x89PNG\r\n\x1a\n" + bytes(100)
+        response = self.client.post(
+            f"/api/cuotas/{self.cuota.id}/subir_comprobante/", {"comprobante": SimpleUploadedFile("x.pdf", png)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.cuota.refresh_from_db()
+        self.assertTrue(self.cuota.comprobante.name.endswith(".png"))
+        self.assertEqual(self.client.get(self.cuota.comprobante.url)["Content-Type"], "image/png")
+
+    def test_multipart_controla_tipo_y_tamanio(self):
+        url = f"/api/cuotas/{self.cuota.id}/subir_comprobante/"
+        falso = SimpleUploadedFile("foto.png", b"<html>no es una imagen</html>")
+        response = self.client.post(url, {"comprobante": falso})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Tipo de archivo", response.json()["error"])
+        grande = SimpleUploadedFile("grande.pdf", self.PDF * 3)
+        response = self.client.post(url, {"comprobante": grande})
+        self.assertEqual(response.json(), {"error": "El archivo no debe superar los 100KB"})
+        self.cuota.refresh_from_db()
+        self.assertFalse(self.cuota.comprobante)
+
+        response = self.client.post(url, {"comprobante": SimpleUploadedFile("comp.pdf", self.PDF)})
+        self.assertEqual(response.status_code, 200)
+        self.cuota.refresh_from_db()
+        self.assertEqual(self.cuota.estado, "pendiente_revision")
+
+    def test_limpiar_subidas_vencidas(self):
+        from .subida_comprobantes import ruta_parcial
+        self.iniciar(len(self.PDF))
+        subida = SubidaComprobante.objects.get()
+        SubidaComprobante.objects.update(fecha_actualizacion=timezone.now() - timedelta(days=2))
+        os.utime(ruta_parcial(subida), (0, 0))
+        call_command("limpiar_subidas", stdout=StringIO())
+        self.assertFalse(SubidaComprobante.objects.exists())
+        self.assertFalse(os.path.exists(ruta_parcial(subida)))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class AlmacenamientoComprobantesTest(TestCase):
+    PNG = b"\x89PNG\r\n\x1a\n" + b"captura de la transferencia"
+
+    def setUp(self):
+        crear_socios(2, "alm")
+        with transaction.atomic():
+            generar_cuotas(3, 2025, Decimal("1000"), timezone.now())
+        self.cuotas = list(Cuota.objects.order_by("id"))
+
+    def subir(self, cuota, contenido=PNG, nombre="transferencia.png"):
+        response = self.client.post(
+            f"/api/cuotas/{cuota.id}/subir_comprobante/", {"comprobante": SimpleUploadedFile(nombre, contenido)},
+        )
+        self.assertEqual(response.status_code, 200)
+        cuota.refresh_from_db()
+        return cuota.comprobante
+
+    def test_mismo_archivo_se_guarda_una_vez(self):
+        from .models import ArchivoComprobante
+        digest = hashlib.sha256(self.PNG).hexdigest()
+        primero = self.subir(self.cuotas[0])
+        segundo = self.subir(self.cuotas[1], nombre="otra.PNG")
+        self.assertEqual(primero.name, f"comprobantes/{digest[:2]}/{digest}.png")
+        self.assertEqual(segundo.name, primero.name)
+        self.assertEqual(ArchivoComprobante.objects.get().referencias, 2)
+
+        # Rechazar una cuota no borra el archivo de la otra
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/cuotas/{self.cuotas[0].id}/rechazar_pago/")
+        self.assertTrue(os.path.exists(primero.path))
+        self.assertEqual(ArchivoComprobante.objects.get().referencias, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/cuotas/{self.cuotas[1].id}/rechazar_pago/")
+        self.assertFalse(os.path.exists(primero.path))
+        self.assertFalse(ArchivoComprobante.objects.exists())
+
+    def test_reemplazar_comprobante_libera_el_anterior(self):
+        from .models import ArchivoComprobante
+        anterior = self.subir(self.cuotas[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = self.subir(self.cuotas[0], contenido=b"%PDF-1.4 otro", nombre="comp.pdf")
+        self.assertFalse(os.path.exists(anterior.path))
+        self.assertEqual(list(ArchivoComprobante.objects.values_list("nombre", "referencias")), [(nuevo.name, 1)])
+
+    def test_subida_entre_liberar_y_borrar_conserva_el_archivo(self):
+        from .models import ArchivoComprobante
+        comprobante = self.subir(self.cuotas[0])
+        with self.captureOnCommitCallbacks() as pendientes:
+            self.client.post(f"/api/cuotas/{self.cuotas[0].id}/rechazar_pago/")
+        # El mismo contenido llega antes de que se borre el archivo liberado
+        self.subir(self.cuotas[1])
+        for callback in pendientes:
+            callback()
+        self.assertTrue(os.path.exists(comprobante.path))
+        self.assertEqual(ArchivoComprobante.objects.get().referencias, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/cuotas/{self.cuotas[1].id}/rechazar_pago/")
+        self.assertFalse(os.path.exists(comprobante.path))
+        self.assertFalse(ArchivoComprobante.objects.exists())
+
+    def test_comprobante_anterior_sin_contador_se_borra(self):
+        cuota = self.cuotas[0]
+        ruta = os.path.join(cuota.comprobante.storage.location, "comprobantes", "viejo.pdf")
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as archivo:
+            archivo.write(b"%PDF-1.4")
+        Cuota.objects.filter(pk=cuota.pk).update(comprobante="comprobantes/viejo.pdf", estado="pendiente_revision")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/cuotas/{cuota.id}/rechazar_pago/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_servido_por_el_servidor_web(self):
+        comprobante = self.subir(self.cuotas[0])
+        url = self.client.get(f"/api/cuotas/{self.cuotas[0].id}/").json()["comprobante_url"]
+        self.assertTrue(url.endswith(f"/api/{comprobante.name}"))
+
+        with override_settings(COMPROBANTES={"SENDFILE": "x-accel-redirect", "SENDFILE_PREFIJO": "/protegido/"}):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protegido/{comprobante.name}")
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+        self.assertEqual(response.content, b"")
+        with override_settings(COMPROBANTES={"SENDFILE": "x-sendfile"}):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Sendfile"], comprobante.path)
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+
+        # Sin servidor web delante (desarrollo) lo manda Django
+        response = self.client.get(url)
+        self.assertEqual(b"".join(response.streaming_content), self.PNG)
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+        # El contenido no cambia nunca: revalidación por hash
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertTrue(response["Cache-Control"].startswith("private"))
+
+        self.assertEqual(self.client.get("/api/comprobantes/../../settings.py").status_code, 404)
+        self.assertEqual(self.client.get("/api/comprobantes/no/existe.pdf").status_code, 404)
+
+
+# =====================================================
+#        MOTOR DE ESTADOS DE VENCIMIENTO
+# =====================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class EstadoCuotasTest(TestCase):
+    def setUp(self):
+        crear_socios(4, "venc")
+        ahora = timezone.now()
+        with transaction.atomic():
+            generar_cuotas(1, 2025, Decimal("1000"), ahora + timedelta(days=10))
+        self.cuotas = list(Cuota.objects.order_by("id"))
+        # Atrasos de 5, 45 y 90 días; la cuarta sigue sin vencer
+        for cuota, dias in zip(self.cuotas, (5, 45, 90)):
+            Cuota.objects.filter(pk=cuota.pk).update(fecha_vencimiento=ahora - timedelta(days=dias, hours=1))
+
+    def test_generar_cuotas_no_vencidas_quedan_pendientes(self):
+        self.assertEqual({c.estado for c in self.cuotas}, {"pendiente"})
+
+    def test_actualizar_estados_con_updates_sobre_conjuntos(self):
+        from .estado_cuotas import actualizar_estados
+        with self.assertNumQueries(2):
+            movidas = actualizar_estados()
+        self.assertEqual(movidas, {"vencidas": 3, "prorrogadas": 0})
+        self.assertEqual(
+            list(Cuota.objects.order_by("id").values_list("estado", flat=True)),
+            ["atrasada", "atrasada", "atrasada", "pendiente"],
+        )
+        # Si se corre el vencimiento al futuro, la cuota vuelve a pendiente
+        Cuota.objects.filter(pk=self.cuotas[0].pk).update(fecha_vencimiento=timezone.now() + timedelta(days=1))
+        self.assertEqual(actualizar_estados(), {"vencidas": 0, "prorrogadas": 1})
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command("actualizar_estados_cuotas", stdout=salida)
+        self.assertIn("3 cuotas vencidas", salida.getvalue())
+
+    def test_dias_atraso_calculado_en_la_base(self):
+        from .estado_cuotas import con_dias_atraso
+        cuotas = list(con_dias_atraso(Cuota.objects.order_by("id")))
+        self.assertEqual([c.dias_atraso_db for c in cuotas], [5, 45, 90, 0])
+        self.assertEqual([c.dias_atraso for c in cuotas], [Cuota.objects.get(pk=c.pk).dias_atraso for c in cuotas])
+
+    def test_atrasadas_por_rango_de_dias(self):
+        # No depende de que el motor de estados ya haya corrido
+        data = self.client.get("/api/cuotas/atrasadas/?orden=-dias_atraso").json()
+        self.assertEqual([c["dias_atraso"] for c in data], [90, 45, 5])
+        data = self.client.get("/api/cuotas/atrasadas/?dias_min=31&dias_max=60").json()
+        self.assertEqual([c["id"] for c in data], [self.cuotas[1].id])
+        self.assertEqual(self.client.get("/api/cuotas/atrasadas/?dias_min=x").status_code, 400)
+
+    def test_antiguedad_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/cuotas/antiguedad/").json()
+        self.assertEqual({t: d["cantidad"] for t, d in data.items()}, {"0-30": 1, "31-60": 1, "60+": 1})
+        self.assertEqual(Decimal(str(data["60+"]["monto"])), Decimal("1000"))
+
+    def test_rechazo_de_cuota_no_vencida_vuelve_a_pendiente(self):
+        cuota = self.cuotas[3]
+        cuota.comprobante = SimpleUploadedFile("comp.pdf", b"%PDF-1.4")
+        cuota.estado = "pendiente_revision"
+        cuota.save()
+        self.client.post(f"/api/cuotas/{cuota.id}/rechazar_pago/")
+        self.assertEqual(Cuota.objects.get(pk=cuota.pk).estado, "pendiente")
+
+
+# =====================================================
+#        INSCRIPTOS DE ACTIVIDADES GRANDES
+# =====================================================
+class InscriptosActividadTest(TestCase):
+    def setUp(self):
+        staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.actividad = crear_actividad(staff)
+        self.socios = crear_socios(5, "ins")
+        Usuario.objects.filter(pk=self.socios[0].pk).update(first_name="Ramona", last_name="Quiroga", dni="30111222")
+        Inscripcion.objects.bulk_create([Inscripcion(usuario_socio=s, actividad=self.actividad) for s in self.socios])
+        Inscripcion.objects.filter(usuario_socio=self.socios[4]).update(estado="cancelada")
+
+    def test_listado_sin_detalle_salvo_expand(self):
+        data = self.client.get("/api/actividades/").json()["results"][0]
+        self.assertNotIn("inscriptos_detalle", data)
+        self.assertEqual(data["cantidad_inscriptos"], 4)
+        data = self.client.get("/api/actividades/?expand=inscriptos").json()["results"][0]
+        self.assertEqual(len(data["inscriptos_detalle"]), 4)
+
+    def test_inscriptos_paginados_por_cursor(self):
+        url = f"/api/actividades/{self.actividad.id}/inscriptos/"
+        data = self.client.get(url + "?page_size=3").json()
+        self.assertEqual([f["usuario_socio"] for f in data["results"]], [s.id for s in self.socios[:3]])
+        self.assertEqual(data["results"][0]["nombre"], "Ramona Quiroga")
+        siguiente = self.client.get(data["next"]).json()
+        self.assertEqual([f["usuario_socio"] for f in siguiente["results"]], [self.socios[3].id])
+        self.assertIsNone(siguiente["next"])
+
+    def test_busqueda_por_nombre_o_dni(self):
+        url = f"/api/actividades/{self.actividad.id}/inscriptos/"
+        for busqueda in ("quiroga", "ramona q", "30111"):
+            with self.subTest(busqueda=busqueda):
+                data = self.client.get(url, {"buscar": busqueda}).json()
+                self.assertEqual([f["usuario_socio"] for f in data["results"]], [self.socios[0].id])
+        self.assertEqual(self.client.get("/api/actividades/999999/inscriptos/").status_code, 404)
+
+
+# =====================================================
+#        CAMPOS A PEDIDO Y LISTADOS RÁPIDOS
+# =====================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CamposDinamicosTest(TestCase):
+    def setUp(self):
+        self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.staff.groups.add(Group.objects.get_or_create(name="staff")[0])
+        actividad = crear_actividad(self.staff)
+        socios = crear_socios(3, "cd")
+        Inscripcion.objects.bulk_create([Inscripcion(usuario_socio=s, actividad=actividad) for s in socios])
+        with transaction.atomic():
+            generar_cuotas(1, 2025, Decimal("1000"), timezone.now() - timedelta(days=3))
+        cuota = Cuota.objects.order_by("id").first()
+        cuota.comprobante = SimpleUploadedFile("comp.pdf", b"%PDF-1.4")
+        cuota.save()
+        CompensacionStaff.objects.create(periodo="2025-01", usuario_staff=self.staff, actividad=actividad, monto=Decimal("10"))
+
+    def test_listado_rapido_igual_al_serializer(self):
+        casos = [
+            (UsuarioViewSet, UsuarioSerializer, "/api/usuarios/"),
+            (ActividadViewSet, ActividadSerializer, "/api/actividades/?expand=inscriptos"),
+            (InscripcionViewSet, InscripcionSerializer, "/api/inscripciones/"),
+            (CuotaViewSet, CuotaSerializer, "/api/cuotas/"),
+            (CompensacionStaffViewSet, CompensacionStaffSerializer, "/api/compensaciones/"),
+        ]
+        for viewset, serializer_class, url in casos:
+            with self.subTest(url=url):
+                request = Request(RequestFactory().get(url))
+                view = viewset()
+                view.request, view.format_kwarg, view.kwargs = request, None, {}
+                esperado = serializer_class(view.get_queryset(), many=True, context={"request": request}).data
+                data = self.client.get(url).json()
+                data = data["results"] if isinstance(data, dict) else data
+                self.assertEqual(data, json.loads(JSONRenderer().render(esperado)))
+
+    def test_fields_usa_values(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/cuotas/?fields=id,estado,dias_atraso,valor_total").json()
+        self.assertEqual(len(ctx.captured_queries), 1)  # sin prefetch de inscripciones
+        self.assertNotIn("valor_base", ctx.captured_queries[0]["sql"])
+        self.assertEqual(set(data[0]), {"id", "estado", "dias_atraso", "valor_total"})
+        self.assertEqual({c["dias_atraso"] for c in data}, {3})
+
+    def test_fields_con_campos_calculados_usa_only(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/cuotas/?fields=id,comprobante_url,periodo").json()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn("valor_base", ctx.captured_queries[0]["sql"])
+        self.assertTrue(data[0]["comprobante_url"].endswith(".pdf"))
+        self.assertEqual(data[0]["periodo"], "Enero 2025")
+
+    def test_omit(self):
+        with self.assertNumQueries(3):  # versión + count + página, sin prefetch de groups
+            data = self.client.get("/api/usuarios/?omit=es_admin,es_staff,es_socio").json()["results"]
+        self.assertNotIn("es_staff", data[0])
+        self.assertIn("dni", data[0])
+
+    def test_escrituras_ignoran_fields(self):
+        cuota = Cuota.objects.order_by("id").first()
+        response = self.client.post(f"/api/cuotas/{cuota.id}/registrar_pago/?fields=id")
+        self.assertIn("estado", response.json())
+
+
+# =====================================================
+#        GET CONDICIONAL (ETag / Last-Modified)
+# =====================================================
+class RespuestaCondicionalTest(TestCase):
+    def setUp(self):
+        # El TestCase nunca confirma: los incrementos de versión se ejecutan a mano
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+            self.actividad = crear_actividad(self.staff)
+
+    def test_304_con_etag_vigente_sin_consultar_el_listado(self):
+        response = self.client.get("/api/actividades/")
+        etag = response["ETag"]
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        with self.assertNumQueries(1):  # sólo la versión de las tablas
+            response = self.client.get("/api/actividades/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        # Otra página u otro filtro es otra representación
+        self.assertNotEqual(self.client.get("/api/actividades/?page=1")["ETag"], etag)
+
+    def test_cambios_invalidan_el_etag(self):
+        etag = self.client.get(f"/api/actividades/{self.actividad.id}/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Inscripcion.objects.create(usuario_socio=crear_socios(1, "etag")[0], actividad=self.actividad)
+        response = self.client.get(f"/api/actividades/{self.actividad.id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["cantidad_inscriptos"], 1)
+
+    def test_una_version_por_transaccion(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                self.actividad.save()
+                self.actividad.save()
+        self.assertEqual(len(callbacks), 2)  # versión y caché de la API, una vez cada una
+        # Una transacción revertida no deja el incremento pendiente marcado
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        self.actividad.save()
+                        raise ValueError
+                except ValueError:
+                    pass
+                self.actividad.save()
+        self.assertEqual(len(callbacks), 2)
+
+
+# =====================================================
+#        CACHÉ DE LA API
+# =====================================================
+# En settings viene apagada con la memoria local; acá se prueba con un único proceso
+@override_settings(CACHE_API={"ACTIVO": True})
+class CacheApiTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .instrumentacion import registro
+        cache.clear()
+        registro.reiniciar()
+        self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.actividad = crear_actividad(self.staff)
+        self.socio = crear_socios(1, "cache")[0]
+
+    def test_segunda_lectura_desde_la_cache(self):
+        primera = self.client.get("/api/usuarios/").json()
+        with self.assertNumQueries(1):  # sólo la versión para el ETag
+            segunda = self.client.get("/api/usuarios/").json()
+        self.assertEqual(primera, segunda)
+        # Otros parámetros son otra entrada
+        self.assertEqual(len(self.client.get("/api/usuarios/?fields=id").json()["results"][0]), 1)
+        from .instrumentacion import registro
+        texto = registro.exportar()
+        self.assertIn('sis_cache_aciertos_total{espacio="UsuarioViewSet.list"} 1', texto)
+        self.assertIn('sis_cache_fallos_total{espacio="UsuarioViewSet.list"} 2', texto)
+
+    def test_senales_invalidan_solo_las_tablas_afectadas(self):
+        url = f"/api/actividades/{self.actividad.id}/inscriptos/"
+        self.assertEqual(self.client.get(url).json()["results"], [])
+        self.client.get("/api/compensaciones/")
+        Inscripcion.objects.create(usuario_socio=self.socio, actividad=self.actividad)
+        self.assertEqual(len(self.client.get(url).json()["results"]), 1)
+        with self.assertNumQueries(1):
+            self.client.get("/api/compensaciones/")
+        # Los cambios de grupo (m2m_changed) invalidan los usuarios
+        self.assertEqual(self.client.get("/api/usuarios/resumen_roles/").json()["staff"], 0)
+        self.staff.groups.add(Group.objects.get_or_create(name="staff")[0])
+        self.assertEqual(self.client.get("/api/usuarios/resumen_roles/").json()["staff"], 1)
+
+    def test_procesos_masivos_invalidan(self):
+        Cuota.objects.create(
+            usuario_socio=self.socio, fecha_vencimiento=timezone.now() - timedelta(days=3),
+            valor_base=Decimal("100.00"), periodo_mes=1, periodo_anio=2025, estado="pendiente",
+        )
+        url = f"/api/cuotas/?usuario_socio={self.socio.id}"
+        self.assertEqual(self.client.get(url).json()[0]["estado"], "pendiente")
+        from .estado_cuotas import actualizar_estados
+        actualizar_estados()  # UPDATE masivo, sin señales
+        self.assertEqual(self.client.get(url).json()[0]["estado"], "atrasada")
+
+    def test_no_guarda_la_tabla_de_cuotas_completa(self):
+        from django.core.cache import cache
+        Cuota.objects.create(
+            usuario_socio=self.socio, fecha_vencimiento=timezone.now(),
+            valor_base=Decimal("100.00"), periodo_mes=1, periodo_anio=2025,
+        )
+        for url in ("/api/cuotas/", "/api/cuotas/?estado=pendiente", "/api/cuotas/atrasadas/"):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(2):  # cuotas + inscripciones, sin lectura de caché
+                    self.client.get(url)
+        entradas = [clave for clave in cache._cache if ":api:" in clave and ":api:gen:" not in clave]
+        self.assertEqual(entradas, [])
+        self.client.get("/api/cuotas/?page_size=10")
+        with self.assertNumQueries(0):
+            self.client.get("/api/cuotas/?page_size=10")
+
+    @override_settings(CACHE_API={"ACTIVO": False})
+    def test_desactivada(self):
+        CompensacionStaff.objects.create(
+            periodo="2025-01", usuario_staff=self.staff, actividad=self.actividad, monto=Decimal("10"),
+        )
+        self.client.get("/api/compensaciones/")
+        with self.assertNumQueries(3):  # versión + count + página
+            self.client.get("/api/compensaciones/")
+
+
+# =====================================================
+#        COMPENSACIONES POR PERÍODO
+# =====================================================
+class CompensacionesPorPeriodoTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()  # bulk_create no invalida la caché de la API
+        self.profe = Usuario.objects.create(username="profe", dni="1", first_name="Ana", last_name="Paz")
+        self.otro = Usuario.objects.create(username="otro", dni="2", first_name="Luis", last_name="Sol")
+        self.yoga = crear_actividad(self.profe, "Yoga")
+        self.futbol = crear_actividad(self.otro, "Fútbol")
+        CompensacionStaff.objects.bulk_create([
+            CompensacionStaff(periodo=periodo, usuario_staff=staff, actividad=actividad, monto=Decimal(monto))
+            for periodo, staff, actividad, monto in [
+                ("2025-01", self.profe, self.yoga, "100.00"),
+                ("2025-01", self.otro, self.futbol, "50.00"),
+                ("2025-02", self.profe, self.yoga, "120.00"),
+                ("2025-12", self.profe, self.futbol, "30.00"),
+                ("2026-01", self.profe, self.yoga, "999.00"),
+            ]
+        ])
+        self.url = "/api/compensaciones/por_periodo/"
+
+    def test_periodo_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url, {"periodo": "2025-01"}).json()
+        self.assertEqual((data["total"], data["cantidad"]), (150.0, 2))
+        self.assertNotIn("compensaciones", data)
+        data = self.client.get(self.url, {"periodo": "2025-01", "expand": "compensaciones"}).json()
+        self.assertEqual([c["monto"] for c in data["compensaciones"]], ["100.00", "50.00"])
+
+    def test_rango_con_subtotales_por_staff(self):
+        with self.assertNumQueries(2):  # aggregate + subtotales
+            data = self.client.get(self.url, {"desde": "2025-01", "hasta": "2025-12", "agrupar": "usuario_staff"}).json()
+        self.assertEqual((data["total"], data["cantidad"]), (300.0, 4))
+        self.assertEqual(data["subtotales"], [
+            {"usuario_staff": self.profe.id, "usuario_staff_nombre": "Ana Paz", "total": 250.0, "cantidad": 3},
+            {"usuario_staff": self.otro.id, "usuario_staff_nombre": "Luis Sol", "total": 50.0, "cantidad": 1},
+        ])
+
+    def test_agrupar_por_varias_dimensiones(self):
+        data = self.client.get(self.url, {"desde": "2025-01", "agrupar": "usuario_staff,actividad"}).json()
+        self.assertEqual(
+            [(s["usuario_staff"], s["actividad_nombre"], s["total"]) for s in data["subtotales"]],
+            [(self.profe.id, "Yoga", 1219.0), (self.profe.id, "Fútbol", 30.0), (self.otro.id, "Fútbol", 50.0)],
+        )
+
+    def test_parametros_invalidos(self):
+        for params in ({}, {"desde": "2025-13"}, {"periodo": "2025-01", "agrupar": "socio"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class LiquidacionCompensacionesTest(TestCase):
+    def setUp(self):
+        self.profe = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+        self.yoga = crear_actividad(self.profe, "Yoga", cargo="1000.00")
+        self.futbol = crear_actividad(self.profe, "Fútbol", cargo="500.00")
+        socios = crear_socios(3, "liq")
+        Inscripcion.objects.bulk_create(
+            [Inscripcion(usuario_socio=s, actividad=self.yoga) for s in socios]
+            + [Inscripcion(usuario_socio=socios[0], actividad=self.futbol)]
+        )
+        with transaction.atomic():
+            generar_cuotas(3, 2025, Decimal("100"), timezone.now())
+        # Pagaron dos de los tres socios (el primero, con yoga y fútbol)
+        Cuota.objects.filter(usuario_socio__in=socios[:2]).update(estado="al_dia")
+
+    def test_liquida_lo_cobrado_en_una_consulta_agrupada(self):
+        with self.assertNumQueries(1):
+            cobrado = list(compensaciones.cobrado_por_actividad(3, 2025))
+        self.assertEqual([(f["inscripcion__actividad"], f["inscripciones"], f["cobrado"]) for f in cobrado],
+                         [(self.yoga.id, 2, Decimal("2000.00")), (self.futbol.id, 1, Decimal("500.00"))])
+
+        resultado = compensaciones.liquidar(3, 2025)
+        self.assertEqual((resultado["periodo"], resultado["cantidad"], resultado["total"]),
+                         ("2025-03", 2, Decimal("1750.00")))
+        montos = dict(CompensacionStaff.objects.values_list("actividad_id", "monto"))
+        self.assertEqual(montos, {self.yoga.id: Decimal("1400.00"), self.futbol.id: Decimal("350.00")})
+
+    def test_volver_a_liquidar_actualiza_sin_duplicar(self):
+        compensaciones.liquidar(3, 2025)
+        Cuota.objects.update(estado="al_dia")
+        self.client.post("/api/compensaciones/liquidar/", {"mes": 3, "anio": 2025, "porcentaje": "0.5"},
+                         content_type="application/json")
+        self.assertEqual(CompensacionStaff.objects.count(), 2)
+        self.assertEqual(CompensacionStaff.objects.get(actividad=self.yoga).monto, Decimal("1500.00"))
+
+    def test_periodo_como_anio_y_mes(self):
+        compensaciones.liquidar(3, 2025)
+        data = self.client.get("/api/compensaciones/", {"periodo": "2025-03"}).json()["results"]
+        self.assertEqual({(c["periodo"], c["periodo_anio"], c["periodo_mes"]) for c in data}, {("2025-03", 2025, 3)})
+        self.assertEqual(self.client.get("/api/compensaciones/", {"periodo": "marzo"}).status_code, 400)
+
+        alta = {"periodo": "2025-04", "usuario_staff": self.profe.id, "actividad": self.yoga.id, "monto": "10.00"}
+        response = self.client.post("/api/compensaciones/", alta, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()["periodo_anio"], response.json()["periodo_mes"]), (2025, 4))
+        for datos in ({**alta, "periodo": "2025-4"}, alta):  # formato inválido, repetida
+            with self.subTest(datos=datos):
+                response = self.client.post("/api/compensaciones/", datos, content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+
+
+# =====================================================
+#        LECTURA ASYNC DE LISTADOS
+# =====================================================
+# Las rutas con que se despliega bajo ASGI (asgi.py prende LECTURA_ASYNC)
+@override_settings(ROOT_URLCONF=urlconf(lectura_async=True))
+class LecturaAsyncTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .instrumentacion import registro
+        cache.clear()
+        registro.reiniciar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff = Usuario.objects.create(username="profe", dni="1", first_name="Profe")
+            actividades = [crear_actividad(self.staff, f"Actividad {i}") for i in range(12)]
+        self.socio, otro = crear_socios(2, "async")
+        inscripcion = Inscripcion.objects.create(usuario_socio=self.socio, actividad=actividades[0])
+        for socio, mes in ((self.socio, 1), (self.socio, 2), (otro, 1)):
+            cuota = Cuota.objects.create(
+                usuario_socio=socio, fecha_vencimiento=timezone.now(), valor_base=Decimal("100.00"),
+                periodo_mes=mes, periodo_anio=2025,
+            )
+            cuota.inscripciones.add(inscripcion)
+
+    def _sync(self, viewset, url, **extra):
+        """Respuesta del ViewSet del router, sin pasar por la vista async."""
+        response = viewset.as_view({"get": "list", "post": "create"})(RequestFactory().get(url, **extra))
+        response.render()
+        return response
+
+    def test_sin_asgi_usa_los_viewsets(self):
+        # Sin asgi.py (WSGI o runserver) LECTURA_ASYNC queda apagado
+        from asgiref.sync import iscoroutinefunction
+        from django.conf import settings
+        from django.urls import resolve
+        self.assertFalse(settings.LECTURA_ASYNC)
+        self.assertFalse(iscoroutinefunction(resolve("/api/actividades/", urlconf="sis_django.urls").func))
+        self.assertTrue(iscoroutinefunction(resolve("/api/actividades/").func))
+
+    @override_settings(CACHE_API={"ACTIVO": False})
+    async def test_misma_respuesta_que_el_viewset(self):
+        casos = [
+            (ActividadViewSet, "/api/actividades/"),
+            (ActividadViewSet, "/api/actividades/?page=2&fields=id,nombre,cantidad_inscriptos"),
+            (ActividadViewSet, "/api/actividades/?page=last&expand=inscriptos"),
+            (CuotaViewSet, f"/api/cuotas/?usuario_socio={self.socio.id}"),
+        ]
+        for viewset, url in casos:
+            with self.subTest(url=url), mock.patch.object(viewset, "dispatch", side_effect=AssertionError):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+            esperado = await sync_to_async(self._sync)(viewset, url)
+            self.assertEqual(response.json(), json.loads(esperado.content))
+            self.assertEqual(response["Allow"], esperado["Allow"])
+        self.assertEqual(len(response.json()), 2)
+
+    @override_settings(CACHE_API={"ACTIVO": True})
+    async def test_etag_y_cache_compartidos_con_la_vista_sync(self):
+        etag = (await sync_to_async(self._sync)(ActividadViewSet, "/api/actividades/"))["ETag"]
+        response = await self.async_client.get("/api/actividades/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        url = f"/api/cuotas/?usuario_socio={self.socio.id}"
+        await sync_to_async(self._sync)(CuotaViewSet, url)
+        await self.async_client.get(url)
+        from .instrumentacion import registro
+        self.assertIn('sis_cache_aciertos_total{espacio="CuotaViewSet.list"} 1', registro.exportar())
+
+    @override_settings(INSTRUMENTACION={"MUESTREO": 1.0})
+    async def test_instrumentacion_bajo_asgi(self):
+        with self.assertLogs("sis_app.instrumentacion", "INFO") as logs:
+            response = await self.async_client.get("/api/actividades/")
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ consultas, \d+ repetidas", ser;dur=')
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((registro["vista"], registro["accion"]), ("ActividadViewSet", "list"))
+        self.assertEqual(registro["sql_consultas"], 3)  # versiones + count + página
+
+    def test_delega_en_el_viewset_lo_que_no_atiende(self):
+        self.assertEqual(len(self.client.get("/api/cuotas/?page_size=1").json()["results"]), 1)
+        self.assertEqual(self.client.get("/api/actividades/?page=9").status_code, 404)
+        self.assertIn("text/html", self.client.get("/api/actividades/", HTTP_ACCEPT="text/html")["Content-Type"])
+        response = self.client.post("/api/cuotas/", {}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("usuario_socio", response.json())
+
+    def test_benchmark_concurrencia(self):
+        import asyncio
+        from django.urls import resolve
+        from .benchmark_concurrencia import medir, urlconf
+        # WSGI se mide con los ViewSets sync y ASGI con las vistas async
+        self.assertFalse(asyncio.iscoroutinefunction(resolve("/api/cuotas/", urlconf(False)).func))
+        self.assertTrue(asyncio.iscoroutinefunction(resolve("/api/cuotas/", urlconf(True)).func))
+
+        async def atender(ruta, consulta):
+            await asyncio.sleep(0.001)
+            return 500 if consulta == "falla" else 200
+
+        resultado = asyncio.run(medir(atender, [("/api/cuotas/", ""), ("/api/cuotas/", "falla")], 4, 0.05))
+        self.assertGreater(resultado["requests"], 4)
+        self.assertTrue(0 < resultado["errores"] < resultado["requests"])
+
+
+class ExportacionTest(TestCase):
+    def setUp(self):
+        self.socios = crear_socios(3)
+        self.profe = Usuario.objects.create(username="profe", dni="p1", first_name="Ana", last_name="Paz")
+        self.yoga = crear_actividad(self.profe, "Yoga")
+        ahora = timezone.now()
+        with transaction.atomic():
+            generar_cuotas(3, 2025, Decimal("1000.00"), ahora - timedelta(days=40, hours=1))
+            generar_cuotas(4, 2025, Decimal("1000.00"), ahora + timedelta(days=10))
+        Cuota.objects.filter(usuario_socio=self.socios[0], periodo_mes=3).update(estado="pagada")
+        for socio in self.socios[:2]:
+            Inscripcion.objects.create(usuario_socio=socio, actividad=self.yoga)
+        CompensacionStaff.objects.create(periodo="2025-03", usuario_staff=self.profe, actividad=self.yoga,
+                                         monto=Decimal("100.00"))
+
+    def _csv(self, url, params=None):
+        import csv
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        contenido = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(contenido.startswith("\ufeff"))
+        return response, list(csv.reader(io.StringIO(contenido[1:])))
+
+    def test_cuotas_del_periodo_en_csv(self):
+        response, filas = self._csv("/api/cuotas/exportar/", {"periodo": "2025-03"})
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="cuotas.csv"')
+        self.assertEqual(filas[0][:4], ["ID", "Año", "Mes", "Socio ID"])
+        self.assertEqual([fila[2] for fila in filas[1:]], ["3"] * 3)
+        self.assertEqual([fila[5] for fila in filas[1:]], ["Nombre0", "Nombre1", "Nombre2"])
+        _, filas = self._csv("/api/cuotas/exportar/", {"desde": "2025-04", "usuario_socio": self.socios[1].id})
+        self.assertEqual(len(filas), 2)
+
+    def test_morosidad(self):
+        _, filas = self._csv("/api/cuotas/atrasadas/exportar/", {"dias_min": 30})
+        self.assertEqual([fila[3] for fila in filas[1:]], [self.socios[1].dni, self.socios[2].dni])
+        self.assertEqual({fila[-2] for fila in filas[1:]}, {"40"})
+
+    def test_inscripciones_por_actividad(self):
+        otra = crear_actividad(self.profe, "Pilates")
+        Inscripcion.objects.create(usuario_socio=self.socios[2], actividad=otra)
+        _, filas = self._csv("/api/inscripciones/exportar/", {"actividad": self.yoga.id})
+        self.assertEqual([(fila[1], fila[3]) for fila in filas[1:]], [("Yoga", "profe")] * 2)
+        _, filas = self._csv("/api/inscripciones/exportar/")
+        self.assertEqual([fila[1] for fila in filas[1:]], ["Yoga", "Yoga", "Pilates"])
+
+    def test_compensaciones_en_xlsx(self):
+        from openpyxl import load_workbook
+        response = self.client.get("/api/compensaciones/exportar/", {"formato": "xlsx", "desde": "2025-01"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], exportacion.FORMATOS["xlsx"])
+        libro = load_workbook(io.BytesIO(b"".join(response.streaming_content)), read_only=True)
+        filas = list(libro["compensaciones"].values)
+        self.assertEqual(filas[0][:2], ("ID", "Período"))
+        self.assertEqual(filas[1][1:4], ("2025-03", self.profe.id, "Paz"))
+        self.assertEqual(Decimal(str(filas[1][-1])), Decimal("100.00"))
+
+    async def test_csv_bajo_asgi(self):
+        # Bajo ASGI la respuesta lleva un iterador async, sin leer todo antes de enviar
+        import csv
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            response = await self.async_client.get("/api/cuotas/exportar/", {"periodo": "2025-03"})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            contenido = b"".join([bloque async for bloque in response.streaming_content]).decode("utf-8")
+        filas = list(csv.reader(io.StringIO(contenido[1:])))
+        self.assertEqual(filas[0][:4], ["ID", "Año", "Mes", "Socio ID"])
+        self.assertEqual([fila[5] for fila in filas[1:]], ["Nombre0", "Nombre1", "Nombre2"])
+
+    async def test_xlsx_bajo_asgi(self):
+        from openpyxl import load_workbook
+        response = await self.async_client.get("/api/compensaciones/exportar/", {"formato": "xlsx"})
+        self.assertTrue(response.is_async)
+        contenido = b"".join([bloque async for bloque in response.streaming_content])
+        filas = list(load_workbook(io.BytesIO(contenido), read_only=True)["compensaciones"].values)
+        self.assertEqual(filas[1][1:4], ("2025-03", self.profe.id, "Paz"))
+
+    def test_respuesta_sync_bajo_wsgi(self):
+        response = self.client.get("/api/cuotas/exportar/")
+        self.assertFalse(response.is_async)
+
+    def test_lotes_por_clave(self):
+        # Con lotes de 2 filas, cada lote es una consulta que arranca después del anterior
+        cuotas = Cuota.objects.values("id", "periodo_mes")
+        orden = ("-periodo_mes", "id")
+        with self.assertNumQueries(4):
+            lotes = list(exportacion.por_lotes(cuotas, orden, tamanio=2))
+        self.assertEqual([len(lote) for lote in lotes], [2, 2, 2, 0])
+        self.assertEqual([fila["id"] for lote in lotes for fila in lote],
+                         list(cuotas.order_by(*orden).values_list("id", flat=True)))
+
+    def test_parametros_invalidos(self):
+        for url, params in [
+            ("/api/cuotas/exportar/", {"formato": "pdf"}),
+            ("/api/cuotas/exportar/", {"periodo": "2025-3"}),
+            ("/api/cuotas/atrasadas/exportar/", {"dias_min": "x"}),
+            ("/api/compensaciones/exportar/", {"hasta": "2025-13"}),
+        ]:
+            with self.subTest(url=url, params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
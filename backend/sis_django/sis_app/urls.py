@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .almacenamiento import servir_comprobante
+from .lectura_async import vista_listado
 from .views import (
     UsuarioViewSet,
     ActividadViewSet,
@@ -8,7 +11,8 @@ from .views import (
     CompensacionStaffViewSet,
     LoginView,
     LogoutView,
-    UserProfileView
+    UserProfileView,
+    DashboardView,
 )
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -25,9 +29,23 @@ router.register(r'inscripciones', InscripcionViewSet, basename='inscripcion')
 router.register(r'cuotas', CuotaViewSet, basename='cuota')
 router.register(r'compensaciones', CompensacionStaffViewSet, basename='compensacion')
 
-urlpatterns = [
+
+def rutas_lectura_async():
+    """Listados más consultados: GET async (ver lectura_async.py); lo demás, el ViewSet del router."""
+    return [
+        path('actividades/', vista_listado(ActividadViewSet), name='actividad-list'),
+        path('cuotas/', vista_listado(CuotaViewSet, parametros_sync=('cursor', 'page_size', 'stream')),
+             name='cuota-list'),
+    ]
+
+
+rutas = [
     # Incluir todas las rutas generadas por el router
     path('', include(router.urls)),
+    # Archivos de comprobantes (los bytes los envía el servidor web, ver almacenamiento.py)
+    path('comprobantes/<path:nombre>', servir_comprobante, name='comprobante-archivo'),
+    # Resumen del panel de inicio
+    path('dashboard/resumen/', DashboardView.as_view(), name='dashboard_resumen'),
     # Autenticación personalizada
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/logout/', LogoutView.as_view(), name='logout'),
@@ -36,3 +54,6 @@ urlpatterns = [
     path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
+
+# Las rutas async van antes que las del router para atender sus mismas URLs
+urlpatterns = (rutas_lectura_async() if settings.LECTURA_ASYNC else []) + rutas
@@ -0,0 +1,130 @@
+"""
+Respuestas condicionales (ETag / Last-Modified) para recursos que cambian poco.
+
+Cada tabla tiene un contador en VersionTabla que las señales de signals.py
+incrementan en cada alta, baja o modificación (y a mano después de los
+INSERT masivos, que no disparan señales). El contador vive en la base y no en
+la caché para que todos los workers vean el mismo valor.
+
+`RespuestaCondicionalMixin` arma el ETag de un listado o detalle a partir de
+las versiones de las tablas de las que depende la respuesta (una consulta por
+clave primaria). Si el cliente manda un If-None-Match que coincide, responde
+304 sin ejecutar la consulta del listado ni el serializer. La lectura async
+de los listados (lectura_async.py) arma el mismo ETag con `aversiones`.
+"""
+import hashlib
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import VersionTabla
+
+
+def incrementar(*modelos):
+    """
+    Marca un cambio en las tablas de los modelos. Dentro de una transacción
+    se aplica al confirmarla, una sola vez por tabla: así ningún cliente
+    recibe la versión nueva junto con datos todavía sin confirmar.
+    """
+    for modelo in modelos:
+        tabla = modelo._meta.db_table
+        al_confirmar(("version", tabla), partial(_incrementar, tabla))
+
+
+def al_confirmar(clave, funcion):
+    """
+    Ejecuta `funcion` ya mismo si no hay una transacción abierta, o al
+    confirmarla. Las llamadas con la misma `clave` dentro de una transacción
+    se ejecutan una sola vez.
+    """
+    conexion = transaction.get_connection()
+    if not conexion.in_atomic_block:
+        funcion()
+        return
+    pendientes = conexion.__dict__.setdefault("_al_confirmar_pendientes", {})
+    callback = pendientes.get(clave)
+    # Si la transacción se revirtió, el callback ya no está en la cola y hay que registrarlo de nuevo
+    if callback is None or not any(entrada[1] is callback for entrada in conexion.run_on_commit):
+        pendientes[clave] = callback = partial(_ejecutar_pendiente, pendientes, clave, funcion)
+        transaction.on_commit(callback)
+
+
+def _ejecutar_pendiente(pendientes, clave, funcion):
+    pendientes.pop(clave, None)
+    funcion()
+
+
+def _incrementar(tabla):
+    ahora = timezone.now()
+    actualizadas = VersionTabla.objects.filter(tabla=tabla).update(version=F("version") + 1, modificado=ahora)
+    if not actualizadas:
+        VersionTabla.objects.get_or_create(tabla=tabla, defaults={"version": 1, "modificado": ahora})
+
+
+def versiones(modelos):
+    """{tabla: (versión, modificado)} de los modelos, en una sola consulta."""
+    tablas = [modelo._meta.db_table for modelo in modelos]
+    return {
+        tabla: (version, modificado)
+        for tabla, version, modificado in VersionTabla.objects.filter(tabla__in=tablas)
+        .values_list("tabla", "version", "modificado")
+    }
+
+
+async def aversiones(modelos):
+    """Como `versiones`, con el ORM async."""
+    tablas = [modelo._meta.db_table for modelo in modelos]
+    return {
+        tabla: (version, modificado)
+        async for tabla, version, modificado in VersionTabla.objects.filter(tabla__in=tablas)
+        .values_list("tabla", "version", "modificado")
+    }
+
+
+def validadores(request, modelos, estado):
+    """(ETag, Last-Modified como timestamp) de la respuesta a `request` según `estado` (ver versiones())."""
+    firma = "|".join(
+        f"{tabla}:{estado.get(tabla, (0, None))[0]}"
+        for tabla in sorted(m._meta.db_table for m in modelos)
+    )
+    # La URL completa entra en el ETag: cada filtro y página es una representación distinta
+    clave = f"{request.get_full_path()}|{request.accepted_media_type}|{firma}"
+    etag = '"' + hashlib.sha1(clave.encode()).hexdigest()[:20] + '"'
+    fechas = [modificado for _, modificado in estado.values()]
+    return etag, (max(fechas).timestamp() if fechas else None)
+
+
+def con_validadores(response, etag, ultima_modificacion):
+    response["ETag"] = etag
+    if ultima_modificacion is not None:
+        response["Last-Modified"] = http_date(ultima_modificacion)
+    # El navegador guarda la respuesta pero revalida cada vez con If-None-Match
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+class RespuestaCondicionalMixin:
+    """
+    ViewSet con ETag / Last-Modified en list y retrieve. `modelos_version`
+    son todos los modelos cuyos cambios alteran la respuesta.
+    """
+    modelos_version = ()
+
+    def _condicional(self, request, vista, *args, **kwargs):
+        etag, ultima_modificacion = validadores(request, self.modelos_version, versiones(self.modelos_version))
+        response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+        if response is None:
+            response = vista(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return con_validadores(response, etag, ultima_modificacion)
+
+    def list(self, request, *args, **kwargs):
+        return self._condicional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._condicional(request, super().retrieve, *args, **kwargs)
@@ -2,24 +2,43 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.generics import get_object_or_404
 from django.contrib.auth.models import Group
 from django.db import transaction
+from django.db.models import Count, F, Prefetch, Q
 from django.db import IntegrityError
 from django.db.utils import IntegrityError as DBIntegrityError
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
 from django.middleware.csrf import get_token
 
 
-from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff
+from .models import Usuario, Actividad, Inscripcion, Cuota, CompensacionStaff, GeneracionCuotasJob, SubidaComprobante
+from .autenticacion import CookieJWTAuthentication
+from .generacion_cuotas import iniciar_job, reanudar_si_abandonada
+from .dashboard import resumen_dashboard, resumen_usuarios
+from .importacion import importar_socios, ErrorImportacion
+from .pagination import ColaRevisionPagination, CuotaCursorPagination, InscriptosCursorPagination, orden_cuotas
+from . import compensaciones, estado_cuotas, exportacion, revision_pagos, subida_comprobantes
+from .campos_dinamicos import ListadoRapidoMixin
+from .versiones import RespuestaCondicionalMixin
+from .cache_api import RespuestaCacheadaMixin
+from .subida_comprobantes import ErrorSubida
 from .serializers import (
     UsuarioSerializer,
     ActividadSerializer,
     InscripcionSerializer,
+    expansiones,
     CuotaSerializer,
+    CuotaRevisionSerializer,
     CompensacionStaffSerializer,
+    GeneracionCuotasJobSerializer,
+    SubidaComprobanteSerializer,
 )
 
 """
@@ -34,14 +53,52 @@ sobreescribiendo métodos, pero acorta el código de no necesitar personalizarlo
 Como se están siguiendo los estándares de APIs REST, optamos por utilizar ViewSet.
 """
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+def responder_exportacion(request, queryset, orden, columnas, nombre):
+    """Reporte en CSV o XLSX (?formato=, por defecto csv) en streaming (ver exportacion.py)."""
+    try:
+        return exportacion.respuesta(
+            queryset, orden, columnas, nombre, request.query_params.get("formato", "csv"),
+            asincrono=exportacion.es_asgi(request),
+        )
+    except exportacion.ErrorExportacion as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def filtrar_periodo(queryset, request):
+    """
+    ?periodo=AAAA-MM sobre periodo_anio/periodo_mes (cuotas y compensaciones).
+    ValidationError si no tiene ese formato.
+    """
+    periodo = request.query_params.get("periodo")
+    if not periodo:
+        return queryset
+    if not compensaciones.periodo_valido(periodo):
+        raise ValidationError({"periodo": "Formato AAAA-MM"})
+    return compensaciones.del_periodo(queryset, periodo)
+
+
+def filtrar_rango_periodos(queryset, request):
+    """?desde=AAAA-MM / ?hasta=AAAA-MM (inclusivos) sobre periodo_anio/periodo_mes."""
+    desde = request.query_params.get("desde") or None
+    hasta = request.query_params.get("hasta") or None
+    for nombre, valor in (("desde", desde), ("hasta", hasta)):
+        if valor and not compensaciones.periodo_valido(valor):
+            raise ValidationError({nombre: "Formato AAAA-MM"})
+    return compensaciones.en_rango(queryset, desde, hasta)
+
+
+class UsuarioViewSet(RespuestaCondicionalMixin, RespuestaCacheadaMixin, ListadoRapidoMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all().order_by("id")
     serializer_class = UsuarioSerializer
     permission_classes = [AllowAny]
     authentication_classes = []   # evitar CSRF en dev
+    modelos_version = (Usuario,)
 
     def get_queryset(self):
-        qs = Usuario.objects.all().order_by("id")
+        # Los grupos precargados alimentan Usuario.roles (es_admin/es_staff/es_socio) sin consultas por fila
+        qs = Usuario.objects.order_by("id")
+        if self.pide("es_admin", "es_staff", "es_socio"):
+            qs = qs.prefetch_related("groups")
         estado = self.request.query_params.get('estado')
         if estado:
             qs = qs.filter(estado=estado)
@@ -72,7 +129,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             user.groups.add(g)
             if grupo_req in ("admin", "staff"):
                 user.is_staff = True
-            elif grupo_req == "socio" and not user.groups.filter(name="admin").exists():
+            elif grupo_req == "socio" and not user.es_admin:
                 user.is_staff = False
             user.save(update_fields=["is_staff"])
 
@@ -91,7 +148,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         usuario.groups.add(g)
         if grupo_req in ('admin', 'staff'):
             usuario.is_staff = True
-        elif grupo_req == 'socio' and not usuario.groups.filter(name='admin').exists():
+        elif grupo_req == 'socio' and not usuario.es_admin:
             usuario.is_staff = False
         usuario.save(update_fields=['is_staff'])
         return Response(UsuarioSerializer(usuario).data, status=200)
@@ -106,27 +163,105 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         usuario.save()
         return Response({"mensaje": "Contraseña actualizada"}, status=200)
 
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Alta masiva desde un archivo CSV/XLSX (campo 'archivo').
+        Opcional: 'grupo' (admin/staff/socio, por defecto socio).
+        Devuelve la cantidad de usuarios creados y los errores por fila.
+        """
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': 'No se envió ningún archivo'}, status=400)
+        grupo = request.data.get('grupo') or 'socio'
+        if grupo not in ('admin', 'staff', 'socio'):
+            return Response({'error': 'Grupo inválido (admin/staff/socio).'}, status=400)
+        try:
+            resultado = importar_socios(archivo.file, archivo.name, grupo=grupo)
+        except ErrorImportacion as e:
+            return Response({'error': str(e)}, status=400)
+        return Response(resultado, status=status.HTTP_201_CREATED if resultado['creados'] else 200)
+
     @action(detail=False, methods=['get'])
     def resumen_roles(self, request):
-        return Response({
-            "total": Usuario.objects.count(),
-            "admin": Usuario.objects.filter(groups__name='admin').distinct().count(),
-            "staff": Usuario.objects.filter(groups__name='staff').distinct().count(),
-            "socios": Usuario.objects.filter(groups__name='socio').distinct().count(),
-        })
+        # Un solo COUNT condicional en lugar de cuatro consultas (ver dashboard.py)
+        return self.respuesta_cacheada(request, lambda: Response(resumen_usuarios()["roles"]), modelos=(Usuario,))
 
 
 # =====================================================
 #        ACTIVIDADES
 # =====================================================
-class ActividadViewSet(viewsets.ModelViewSet):
+def actividades_con_inscriptos(detalle=False):
+    """
+    Actividades con la cantidad de inscriptos confirmados anotada (COUNT en la
+    misma consulta). Con `detalle`, también sus inscripciones confirmadas
+    precargadas con el socio (para ?expand=inscriptos).
+    """
+    queryset = Actividad.objects.annotate(
+        num_inscriptos=Count("inscripciones", filter=Q(inscripciones__estado="confirmada"))
+    )
+    if not detalle:
+        return queryset
+    return queryset.prefetch_related(
+        Prefetch(
+            "inscripciones",
+            queryset=Inscripcion.objects.filter(estado="confirmada").select_related("usuario_socio"),
+            to_attr="inscripciones_confirmadas",
+        )
+    )
+
+
+def inscriptos_de(actividad_id, busqueda=None):
+    """
+    Inscripciones confirmadas de una actividad con los datos del socio, como
+    dicts (values()): sin instancias de modelo ni serializer por fila.
+    `busqueda` filtra por nombre, apellido o DNI.
+    """
+    queryset = Inscripcion.objects.filter(actividad_id=actividad_id, estado="confirmada")
+    if busqueda:
+        # Cada palabra tiene que aparecer en el nombre o en el apellido
+        por_nombre = Q()
+        for palabra in busqueda.split():
+            por_nombre &= Q(usuario_socio__first_name__icontains=palabra) | Q(usuario_socio__last_name__icontains=palabra)
+        queryset = queryset.filter(Q(usuario_socio__dni__startswith=busqueda) | por_nombre)
+    return queryset.values(
+        "id", "fecha_inscripcion", "estado_pago", "usuario_socio",
+        username=F("usuario_socio__username"),
+        first_name=F("usuario_socio__first_name"),
+        last_name=F("usuario_socio__last_name"),
+        dni=F("usuario_socio__dni"),
+        email=F("usuario_socio__email"),
+        telefono=F("usuario_socio__telefono"),
+        estado_socio=F("usuario_socio__estado"),
+    )
+
+
+def fila_inscripto(fila):
+    """Fila de values() de inscriptos_de con el mismo formato que inscriptos_detalle."""
+    return {
+        "id": fila["id"],
+        "usuario_socio": fila["usuario_socio"],
+        "nombre": f"{fila['first_name']} {fila['last_name']}".strip() or fila["username"],
+        "dni": fila["dni"],
+        "email": fila["email"],
+        "telefono": fila["telefono"] or "",
+        "estado": fila["estado_socio"],
+        "estado_pago": fila["estado_pago"],
+        "fecha_inscripcion": fila["fecha_inscripcion"],
+    }
+
+
+class ActividadViewSet(RespuestaCondicionalMixin, RespuestaCacheadaMixin, ListadoRapidoMixin, viewsets.ModelViewSet):
     queryset = Actividad.objects.all().order_by("id")
     serializer_class = ActividadSerializer
     permission_classes = [AllowAny]
     authentication_classes = []
+    # cantidad_inscriptos e inscriptos_detalle dependen de inscripciones y socios
+    modelos_version = (Actividad, Inscripcion, Usuario)
 
     def get_queryset(self):
-        queryset = Actividad.objects.all().order_by("id")
+        detalle = "inscriptos" in expansiones(self.request) and self.pide("inscriptos_detalle")
+        queryset = actividades_con_inscriptos(detalle).order_by("id")
 
         estado = self.request.query_params.get("estado")
         if estado:
@@ -154,26 +289,35 @@ class ActividadViewSet(viewsets.ModelViewSet):
         actividad.save()
         return Response(self.get_serializer(actividad).data)
 
-    @action(detail=True, methods=["get"])
+    @action(detail=True, methods=["get"], pagination_class=InscriptosCursorPagination)
     def inscriptos(self, request, pk=None):
-        actividad = self.get_object()
-        inscripciones = actividad.inscripciones.filter(estado="confirmada")
-        serializer = InscripcionSerializer(inscripciones, many=True)
-        return Response(serializer.data)
+        """
+        Socios inscriptos (confirmados) de la actividad, paginados por cursor
+        (?cursor=, ?page_size=). ?buscar= filtra por nombre, apellido o DNI.
+        """
+        def calcular():
+            actividad = get_object_or_404(Actividad.objects.only("pk"), pk=pk)
+            inscriptos = inscriptos_de(actividad.pk, request.query_params.get("buscar", "").strip())
+            page = self.paginate_queryset(inscriptos)
+            return self.get_paginated_response([fila_inscripto(fila) for fila in page])
+        return self.respuesta_cacheada(request, calcular, modelos=(Actividad, Inscripcion, Usuario))
 
 
 # =====================================================
 #        INSCRIPCIONES
 # =====================================================
-class InscripcionViewSet(viewsets.ModelViewSet):
+class InscripcionViewSet(RespuestaCondicionalMixin, RespuestaCacheadaMixin, ListadoRapidoMixin, viewsets.ModelViewSet):
     queryset = Inscripcion.objects.all().order_by("id")
     serializer_class = InscripcionSerializer
     permission_classes = [AllowAny]
     authentication_classes = []
+    modelos_version = (Inscripcion,)
 
     def get_queryset(self):
-        queryset = Inscripcion.objects.all().order_by("id")
+        return self.filtrar_parametros(Inscripcion.objects.all().order_by("id")).distinct()
 
+    def filtrar_parametros(self, queryset):
+        """Filtros del listado: ?usuario_socio=, ?actividad=, ?estado=."""
         usuario_socio = self.request.query_params.get("usuario_socio")
         if usuario_socio:
             queryset = queryset.filter(usuario_socio_id=usuario_socio)
@@ -186,7 +330,18 @@ class InscripcionViewSet(viewsets.ModelViewSet):
         if estado:
             queryset = queryset.filter(estado=estado)
 
-        return queryset.distinct()
+        return queryset
+
+    @action(detail=False, methods=["get"])
+    def exportar(self, request):
+        """
+        Inscripciones por actividad en CSV o XLSX (?formato=csv|xlsx), con los
+        filtros del listado. Incluye actividad, staff y socio de cada una.
+        """
+        return responder_exportacion(
+            request, self.filtrar_parametros(Inscripcion.objects.all()), ("actividad_id", "id"),
+            exportacion.COLUMNAS_INSCRIPCIONES, "inscripciones",
+        )
 
     @action(detail=True, methods=["post"])
     def cancelar(self, request, pk=None):
@@ -201,16 +356,38 @@ class InscripcionViewSet(viewsets.ModelViewSet):
 # =====================================================
 #        CUOTAS
 # =====================================================
-class CuotaViewSet(viewsets.ModelViewSet):
+def cuotas_con_detalle(inscripciones=True):
+    """
+    Cuotas con sus inscripciones y actividades precargadas: los totales ya son
+    columnas y los días de atraso se calculan en la base, así que serializar no
+    requiere consultas ni cálculos por fila. Sin `inscripciones` no se precargan.
+    """
+    queryset = estado_cuotas.con_dias_atraso(Cuota.objects.all())
+    if not inscripciones:
+        return queryset
+    return queryset.prefetch_related(
+        Prefetch("inscripciones", queryset=Inscripcion.objects.select_related("actividad"))
+    )
+
+
+class CuotaViewSet(RespuestaCacheadaMixin, ListadoRapidoMixin, viewsets.ModelViewSet):
     queryset = Cuota.objects.all().order_by("id")
     serializer_class = CuotaSerializer
     permission_classes = [AllowAny]
     authentication_classes = []
-    pagination_class = None  # Desactivar paginación para ver todas las cuotas
+    # Sin ?cursor= ni ?page_size= devuelve la lista completa (comportamiento original)
+    pagination_class = CuotaCursorPagination
+    stream_chunk_size = 500
+    # inscripciones_detalle muestra la actividad y el cargo de cada inscripción
+    modelos_version = (Cuota, Inscripcion, Actividad)
 
     def get_queryset(self):
-        queryset = Cuota.objects.all().order_by("id")
+        queryset = cuotas_con_detalle(self.pide("inscripciones", "inscripciones_detalle"))
+        queryset = queryset.order_by(*orden_cuotas(self.request))
+        return self.filtrar_parametros(queryset).distinct()
 
+    def filtrar_parametros(self, queryset):
+        """Filtros del listado: ?usuario_socio=, ?estado=, ?periodo=AAAA-MM."""
         usuario_socio = self.request.query_params.get("usuario_socio")
         if usuario_socio:
             queryset = queryset.filter(usuario_socio_id=usuario_socio)
@@ -219,7 +396,66 @@ class CuotaViewSet(viewsets.ModelViewSet):
         if estado:
             queryset = queryset.filter(estado=estado)
 
-        return queryset.distinct()
+        return filtrar_periodo(queryset, self.request)
+
+    def clave_cache_extra(self):
+        from django.utils import timezone
+        # dias_atraso depende del día
+        return timezone.localdate().isoformat()
+
+    def cachear_listado(self, request):
+        """
+        Sin paginar, sólo se cachea el listado de un socio: el de todas las
+        cuotas (o de un estado o período para todos los socios) guardaría
+        cientos de miles de filas por cada variante de la URL y por proceso.
+        """
+        params = request.query_params
+        if params.get("stream"):
+            return False
+        paginado = self.paginator.cursor_query_param in params or self.paginator.page_size_query_param in params
+        return paginado or bool(params.get("usuario_socio"))
+
+    def list(self, request, *args, **kwargs):
+        if not self.cachear_listado(request):
+            return self._responder_listado(self.filter_queryset(self.get_queryset()))
+        return self.respuesta_cacheada(
+            request, lambda: self._responder_listado(self.filter_queryset(self.get_queryset()))
+        )
+
+    def _responder_listado(self, queryset):
+        """
+        Listado en uno de tres modos:
+        - ?stream=ndjson: una cuota JSON por línea, leída con .iterator() (memoria constante).
+        - ?cursor= / ?page_size=: páginas por cursor (ver pagination.py).
+        - sin parámetros: la lista completa, como antes.
+        En los tres, ?fields= / ?omit= acotan campos y consulta (ver campos_dinamicos.py).
+        """
+        queryset, representar = self.representacion_listado(queryset)
+        if self.request.query_params.get("stream") == "ndjson":
+            return self._stream_ndjson(queryset, representar)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([representar(cuota) for cuota in page])
+        return Response([representar(cuota) for cuota in queryset])
+
+    def _stream_ndjson(self, queryset, representar):
+        encoder = JSONEncoder(ensure_ascii=False)
+
+        def bloques():
+            # chunk_size también acota los prefetch_related a cada bloque. Se
+            # envía un bloque de líneas por vez: bajo ASGI, cada uno es un paso
+            # por el hilo sync en lugar de uno por cuota
+            lineas = []
+            for cuota in queryset.iterator(chunk_size=self.stream_chunk_size):
+                lineas.append(encoder.encode(representar(cuota)) + "\n")
+                if len(lineas) == self.stream_chunk_size:
+                    yield "".join(lineas)
+                    lineas = []
+            if lineas:
+                yield "".join(lineas)
+
+        contenido = exportacion.contenido_streaming(bloques(), exportacion.es_asgi(self.request))
+        return StreamingHttpResponse(contenido, content_type="application/x-ndjson")
 
     @action(detail=True, methods=["post"])
     def registrar_pago(self, request, pk=None):
@@ -234,8 +470,71 @@ class CuotaViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def atrasadas(self, request):
-        cuotas = Cuota.objects.filter(estado="atrasada")
-        return Response(self.get_serializer(cuotas, many=True).data)
+        """
+        Cuotas impagas ya vencidas. ?dias_min= / ?dias_max= acotan los días de
+        atraso y ?orden=-dias_atraso las trae de la más atrasada a la menos.
+        """
+        try:
+            dias_min, dias_max = self._rango_atraso(request)
+        except ValueError:
+            return Response({"error": "dias_min y dias_max deben ser números enteros"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        cuotas = cuotas_con_detalle(self.pide("inscripciones", "inscripciones_detalle"))
+        cuotas = estado_cuotas.vencidas(cuotas, dias_min=dias_min, dias_max=dias_max).order_by(*orden_cuotas(request))
+        if not self.cachear_listado(request):
+            return self._responder_listado(cuotas)
+        return self.respuesta_cacheada(request, lambda: self._responder_listado(cuotas))
+
+    def _rango_atraso(self, request):
+        """(dias_min, dias_max) de ?dias_min= / ?dias_max=. ValueError si no son enteros."""
+        dias_min = int(request.query_params.get("dias_min", 0))
+        dias_max = request.query_params.get("dias_max")
+        return dias_min, int(dias_max) if dias_max not in (None, "") else None
+
+    @action(detail=False, methods=["get"])
+    def exportar(self, request):
+        """
+        Cuotas en CSV o XLSX (?formato=csv|xlsx), con los filtros y órdenes del
+        listado (?usuario_socio=, ?estado=, ?periodo=, ?orden=) y un rango de
+        períodos (?desde= / ?hasta=, AAAA-MM).
+        """
+        cuotas = filtrar_rango_periodos(self.filtrar_parametros(Cuota.objects.all()), request)
+        return responder_exportacion(
+            request, estado_cuotas.con_dias_atraso(cuotas), orden_cuotas(request),
+            exportacion.COLUMNAS_CUOTAS, "cuotas",
+        )
+
+    @action(detail=False, methods=["get"], url_path="atrasadas/exportar")
+    def exportar_morosidad(self, request):
+        """
+        Morosidad en CSV o XLSX: las cuotas vencidas impagas de `atrasadas`
+        (?dias_min=, ?dias_max=, ?orden=) con los datos de contacto del socio.
+        Acepta también ?usuario_socio=.
+        """
+        try:
+            dias_min, dias_max = self._rango_atraso(request)
+        except ValueError:
+            return Response({"error": "dias_min y dias_max deben ser números enteros"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        from django.utils import timezone
+        ahora = timezone.now()
+        cuotas = estado_cuotas.vencidas(
+            self.filtrar_parametros(Cuota.objects.all()), ahora=ahora, dias_min=dias_min, dias_max=dias_max,
+        )
+        return responder_exportacion(
+            request, estado_cuotas.con_dias_atraso(cuotas, ahora), orden_cuotas(request),
+            exportacion.COLUMNAS_MOROSIDAD, "morosidad",
+        )
+
+    @action(detail=False, methods=["get"])
+    def antiguedad(self, request):
+        """Cantidad y monto adeudado por tramo de atraso (0-30, 31-60 y más de 60 días)."""
+        cuotas = Cuota.objects.all()
+        usuario_socio = request.query_params.get("usuario_socio")
+        if usuario_socio:
+            cuotas = cuotas.filter(usuario_socio_id=usuario_socio)
+        # valor_total cambia también con el cargo de las actividades: mismos modelos que el listado
+        return self.respuesta_cacheada(request, lambda: Response(estado_cuotas.antiguedad_deuda(cuotas)))
 
     @action(detail=True, methods=["post"])
     def subir_comprobante(self, request, pk=None):
@@ -245,37 +544,88 @@ class CuotaViewSet(viewsets.ModelViewSet):
         if cuota.estado == "al_dia":
             return Response({"error": "Esta cuota ya está pagada"}, status=status.HTTP_400_BAD_REQUEST)
         
+        # Tamaño y tipo (por los primeros bytes) se controlan mientras llega el archivo
+        limite = subida_comprobantes.limitar_multipart(request)
+        archivos = request.FILES
+        if limite.error is not None:
+            return Response({"error": str(limite.error)}, status=limite.error.estado)
+
         # Verificar que haya un archivo
-        if 'comprobante' not in request.FILES:
+        if 'comprobante' not in archivos:
             return Response({"error": "No se envió ningún archivo"}, status=status.HTTP_400_BAD_REQUEST)
         
-        archivo = request.FILES['comprobante']
+        archivo = archivos['comprobante']
         
         # Validar tipo de archivo
-        extension = archivo.name.split('.')[-1].lower()
-        tipos_validos = ['pdf', 'jpg', 'jpeg', 'png']
-        if extension not in tipos_validos:
-            return Response({
-                "error": f"Tipo de archivo no válido. Solo se permiten: {', '.join(tipos_validos)}"
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Validar tamaño (3MB = 3 * 1024 * 1024 bytes)
-        max_size = 3 * 1024 * 1024
-        if archivo.size > max_size:
-            return Response({
-                "error": "El archivo no debe superar los 3MB"
-            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            subida_comprobantes.validar_extension(archivo.name)
+        except ErrorSubida as e:
+            return Response({"error": str(e)}, status=e.estado)
         
-        # Guardar el comprobante y cambiar estado a pendiente de revisión
-        cuota.comprobante = archivo
-        cuota.estado = "pendiente_revision"
-        cuota.save()
+        # Guardar el comprobante (con la extensión del tipo reconocido) y cambiar estado a pendiente de revisión
+        nombre = subida_comprobantes.nombre_guardado(archivo.name, limite.tipos["comprobante"])
+        subida_comprobantes.adjuntar(cuota, nombre, archivo)
         
         return Response({
             "mensaje": "Comprobante subido exitosamente. Será revisado por la administración.",
             "cuota": self.get_serializer(cuota).data
         }, status=status.HTTP_200_OK)
     
+    # =====================================================
+    #        SUBIDA REANUDABLE DE COMPROBANTES
+    # =====================================================
+    def _error_subida(self, error):
+        return Response({"error": str(error), **error.datos}, status=error.estado)
+
+    def _subida(self, pk, subida_id):
+        return get_object_or_404(SubidaComprobante, pk=subida_id, cuota_id=pk)
+
+    @action(detail=True, methods=["post"], url_path="subidas")
+    def iniciar_subida(self, request, pk=None):
+        """
+        Abre una subida por partes del comprobante (ver subida_comprobantes.py).
+
+        Body: {"nombre": "comprobante.jpg", "tamanio": 2345678}
+        """
+        cuota = get_object_or_404(Cuota, pk=pk)
+        try:
+            subida = subida_comprobantes.iniciar(cuota, request.data.get("nombre"), request.data.get("tamanio"))
+        except ErrorSubida as e:
+            return self._error_subida(e)
+        return Response(SubidaComprobanteSerializer(subida, context={"request": request}).data,
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get", "put"], url_path=r"subidas/(?P<subida_id>[0-9a-f-]+)")
+    def subida(self, request, pk=None, subida_id=None):
+        """
+        GET: offset recibido (para reanudar). PUT: una parte del archivo como
+        cuerpo, con Content-Range: bytes inicio-fin/tamanio.
+        """
+        subida = self._subida(pk, subida_id)
+        if request.method == "PUT":
+            largo = request.META.get("CONTENT_LENGTH")
+            try:
+                # El cuerpo se lee de a bloques del stream, sin pasar por los parsers
+                subida = subida_comprobantes.recibir_parte(
+                    subida, request.stream, request.headers.get("Content-Range"),
+                    int(largo) if largo and largo.isdigit() else None,
+                )
+            except ErrorSubida as e:
+                return self._error_subida(e)
+        return Response(SubidaComprobanteSerializer(subida, context={"request": request}).data)
+
+    @action(detail=True, methods=["post"], url_path=r"subidas/(?P<subida_id>[0-9a-f-]+)/finalizar")
+    def finalizar_subida(self, request, pk=None, subida_id=None):
+        """Adjunta el archivo subido a la cuota, que queda pendiente de revisión."""
+        try:
+            cuota = subida_comprobantes.finalizar(self._subida(pk, subida_id))
+        except ErrorSubida as e:
+            return self._error_subida(e)
+        return Response({
+            "mensaje": "Comprobante subido exitosamente. Será revisado por la administración.",
+            "cuota": self.get_serializer(cuota).data
+        }, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=["post"])
     def aprobar_pago(self, request, pk=None):
         """Endpoint para que el admin apruebe un pago (con o sin comprobante)"""
@@ -305,10 +655,10 @@ class CuotaViewSet(viewsets.ModelViewSet):
         if not cuota.comprobante:
             return Response({"error": "No hay comprobante para rechazar"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Rechazar: eliminar comprobante y volver a atrasada
+        # Rechazar: eliminar comprobante y volver a atrasada (o pendiente si no venció)
         cuota.comprobante.delete()
         cuota.comprobante = None
-        cuota.estado = "atrasada"
+        cuota.estado = estado_cuotas.estado_impaga(cuota.fecha_vencimiento)
         cuota.save()
         
         return Response({
@@ -316,11 +666,58 @@ class CuotaViewSet(viewsets.ModelViewSet):
             "cuota": self.get_serializer(cuota).data
         }, status=status.HTTP_200_OK)
     
+    @action(detail=False, methods=["get"], pagination_class=ColaRevisionPagination)
+    def revision(self, request):
+        """
+        Cola de comprobantes pendientes de revisión, paginada por cursor
+        (?cursor=, ?page_size=, ?orden=) y con una fila compacta por cuota.
+        """
+        cuotas = (
+            Cuota.objects.filter(estado="pendiente_revision")
+            .select_related("usuario_socio")
+            .order_by(*orden_cuotas(request))
+        )
+        page = self.paginate_queryset(cuotas)
+        serializer = CuotaRevisionSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["post"])
+    def aprobar_pagos(self, request):
+        """Aprueba en bloque las cuotas en revisión de {"ids": [...]}. Devuelve el resultado por id."""
+        return self._revisar_en_bloque(request, revision_pagos.aprobar_pagos)
+
+    @action(detail=False, methods=["post"])
+    def rechazar_pagos(self, request):
+        """Rechaza en bloque los comprobantes de {"ids": [...]}. Los archivos se borran en segundo plano."""
+        return self._revisar_en_bloque(request, revision_pagos.rechazar_pagos)
+
+    def _revisar_en_bloque(self, request, operacion):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "Debe enviar una lista de ids"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = list(dict.fromkeys(int(i) for i in ids))
+        except (TypeError, ValueError):
+            return Response({"error": "Los ids deben ser números enteros"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > revision_pagos.MAX_CUOTAS_POR_LOTE:
+            return Response(
+                {"error": f"Se pueden procesar hasta {revision_pagos.MAX_CUOTAS_POR_LOTE} cuotas por vez"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        resultados = operacion(ids)
+        return Response({
+            "procesadas": sum(1 for r in resultados if r["resultado"] == "ok"),
+            "resultados": resultados,
+        })
+
     @action(detail=False, methods=["post"])
     def generar_cuotas(self, request):
         """
         Genera cuotas para todos los socios activos del mes especificado.
         Incluye las inscripciones activas de cada socio.
+
+        La generación se encola y se responde 202 con el id de la corrida;
+        su avance se consulta en GET /cuotas/generaciones/{job_id}/.
         
         Body:
         {
@@ -333,7 +730,6 @@ class CuotaViewSet(viewsets.ModelViewSet):
         from django.utils import timezone
         from datetime import datetime
         from decimal import Decimal
-        from django.db import transaction
         
         # Validar datos
         mes = request.data.get('mes')
@@ -366,85 +762,44 @@ class CuotaViewSet(viewsets.ModelViewSet):
         except ValueError as e:
             return Response({"error": f"Fecha inválida: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Obtener todos los socios activos
-        # Nota: es_socio es una property, no un campo DB, así que filtramos por grupo
-        socios = Usuario.objects.filter(
-            groups__name='socio',
-            estado='activo'
-        ).distinct()
-        
-        # Usar transacción para asegurar atomicidad
+        # La generación corre en segundo plano por lotes (ver generacion_cuotas.py).
+        # Si ya hay una corrida sin terminar para el período, se devuelve esa.
+        with transaction.atomic():
+            job = iniciar_job(mes, anio, valor_base, fecha_vencimiento)
+
+        return Response(
+            GeneracionCuotasJobSerializer(job, context={"request": request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=False, methods=["get"], url_path=r"generaciones/(?P<job_id>\d+)")
+    def estado_generacion(self, request, job_id=None):
+        """Estado de una corrida de generar_cuotas (para consultar periódicamente)."""
         try:
-            with transaction.atomic():
-                cuotas_creadas = []
-                
-                for socio in socios:
-                    # Verificar si ya existe una cuota para este período
-                    cuota_existente = Cuota.objects.filter(
-                        usuario_socio=socio,
-                        periodo_mes=mes,
-                        periodo_anio=anio
-                    ).first()
-                    
-                    # Si ya existe, omitir
-                    if cuota_existente:
-                        continue
-                    
-                    # Crear la cuota
-                    cuota = Cuota.objects.create(
-                        usuario_socio=socio,
-                        fecha_vencimiento=fecha_vencimiento,
-                        valor_base=valor_base,
-                        estado="atrasada",
-                        periodo_mes=mes,
-                        periodo_anio=anio
-                    )
-                    
-                    # Obtener inscripciones activas del socio
-                    inscripciones = Inscripcion.objects.filter(
-                        usuario_socio=socio,
-                        estado='confirmada'
-                    )
-                    
-                    # Agregar inscripciones a la cuota
-                    cuota.inscripciones.set(inscripciones)
-                    cuota.save()
-                    
-                    cuotas_creadas.append({
-                        "socio": f"{socio.first_name} {socio.last_name}",
-                        "cuota_id": cuota.id,
-                        "valor_base": float(cuota.valor_base),
-                        "valor_actividades": float(cuota.valor_actividades),
-                        "valor_total": float(cuota.valor_total),
-                        "num_inscripciones": inscripciones.count()
-                    })
-                
-                return Response({
-                    "mensaje": f"Proceso completado",
-                    "cuotas_creadas": len(cuotas_creadas),
-                    "detalle": {
-                        "creadas": cuotas_creadas
-                    }
-                }, status=status.HTTP_201_CREATED)
-                
-        except Exception as e:
-            return Response({
-                "error": f"Error al generar cuotas: {str(e)}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            job = GeneracionCuotasJob.objects.get(pk=job_id)
+        except GeneracionCuotasJob.DoesNotExist:
+            return Response({"error": "Generación no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+        # Quien consulta el avance también revive la corrida si se quedó sin hilo
+        reanudar_si_abandonada(job)
+        return Response(GeneracionCuotasJobSerializer(job, context={"request": request}).data)
 
 
 # =====================================================
 #        COMPENSACIONES STAFF
 # =====================================================
-class CompensacionStaffViewSet(viewsets.ModelViewSet):
+class CompensacionStaffViewSet(RespuestaCondicionalMixin, RespuestaCacheadaMixin, ListadoRapidoMixin, viewsets.ModelViewSet):
     queryset = CompensacionStaff.objects.all().order_by("id")
     serializer_class = CompensacionStaffSerializer
     permission_classes = [AllowAny]
     authentication_classes = []
+    modelos_version = (CompensacionStaff,)
 
     def get_queryset(self):
-        queryset = CompensacionStaff.objects.all().order_by("id")
+        # Sin DISTINCT: ningún filtro hace JOIN, y así el COUNT de la paginación no arma periodo_db en cada fila
+        return self.filtrar_parametros(compensaciones.con_periodo(CompensacionStaff.objects.all()).order_by("id"))
 
+    def filtrar_parametros(self, queryset):
+        """Filtros del listado: ?usuario_staff=, ?actividad=, ?periodo=AAAA-MM."""
         usuario_staff = self.request.query_params.get("usuario_staff")
         if usuario_staff:
             queryset = queryset.filter(usuario_staff_id=usuario_staff)
@@ -453,28 +808,109 @@ class CompensacionStaffViewSet(viewsets.ModelViewSet):
         if actividad:
             queryset = queryset.filter(actividad_id=actividad)
 
-        periodo = self.request.query_params.get("periodo")
-        if periodo:
-            queryset = queryset.filter(periodo=periodo)
+        return filtrar_periodo(queryset, self.request)
 
-        return queryset.distinct()
+    @action(detail=False, methods=["get"])
+    def exportar(self, request):
+        """
+        Compensaciones del staff en CSV o XLSX (?formato=csv|xlsx), por período,
+        con los filtros del listado y, además, ?desde= / ?hasta= (AAAA-MM).
+        """
+        queryset = filtrar_rango_periodos(self.filtrar_parametros(CompensacionStaff.objects.all()), request)
+        return responder_exportacion(
+            request, compensaciones.con_periodo(queryset), ("periodo_anio", "periodo_mes", "id"),
+            exportacion.COLUMNAS_COMPENSACIONES, "compensaciones",
+        )
 
     @action(detail=False, methods=["get"])
     def por_periodo(self, request):
-        periodo = self.request.query_params.get("periodo")
-        if not periodo:
-            return Response({"error": "Debe especificar un periodo"}, status=status.HTTP_400_BAD_REQUEST)
-        compensaciones = CompensacionStaff.objects.filter(periodo=periodo)
-        total = sum(c.monto for c in compensaciones)
-        serializer = self.get_serializer(compensaciones, many=True)
-        return Response(
-            {
-                "periodo": periodo,
-                "total": total,
-                "cantidad": compensaciones.count(),
-                "compensaciones": serializer.data,
-            }
-        )
+        """
+        Total y cantidad de compensaciones de un período (?periodo=AAAA-MM) o
+        de un rango de meses (?desde=AAAA-MM&hasta=AAAA-MM).
+        ?agrupar=usuario_staff,actividad,periodo agrega subtotales por esas
+        dimensiones y ?expand=compensaciones incluye el detalle de las filas.
+        """
+        periodo = request.query_params.get("periodo")
+        desde = request.query_params.get("desde") or None
+        hasta = request.query_params.get("hasta") or None
+        if not (periodo or desde or hasta):
+            return Response({"error": "Debe especificar un periodo o un rango (desde/hasta)"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if any(valor and not compensaciones.periodo_valido(valor) for valor in (periodo, desde, hasta)):
+            return Response({"error": "periodo, desde y hasta deben tener el formato AAAA-MM"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        dimensiones = [d.strip() for d in request.query_params.get("agrupar", "").split(",") if d.strip()]
+        invalidas = [d for d in dimensiones if d not in compensaciones.AGRUPACIONES]
+        if invalidas:
+            return Response(
+                {"error": f"No se puede agrupar por {', '.join(invalidas)} "
+                          f"(opciones: {', '.join(compensaciones.AGRUPACIONES)})"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        def calcular():
+            queryset = CompensacionStaff.objects.all()
+            if periodo:
+                queryset = compensaciones.del_periodo(queryset, periodo)
+            queryset = compensaciones.en_rango(queryset, desde, hasta)
+            datos = {"periodo": periodo, "desde": desde, "hasta": hasta, **compensaciones.totales(queryset)}
+            if dimensiones:
+                datos["subtotales"] = compensaciones.subtotales(queryset, dimensiones)
+            if "compensaciones" in expansiones(request):
+                queryset, representar = self.representacion_listado(
+                    compensaciones.con_periodo(queryset).order_by("periodo_anio", "periodo_mes", "id")
+                )
+                datos["compensaciones"] = [representar(c) for c in queryset]
+            return Response(datos)
+        # Los subtotales muestran nombres de staff y actividades
+        return self.respuesta_cacheada(request, calcular, modelos=(CompensacionStaff, Usuario, Actividad))
+
+    @action(detail=False, methods=["post"])
+    def liquidar(self, request):
+        """
+        Calcula las compensaciones del mes a partir de lo cobrado en cada
+        actividad y las crea o actualiza (ver compensaciones.liquidar).
+
+        Body: {"mes": 3, "anio": 2025, "porcentaje": 0.7 (opcional)}
+        """
+        from decimal import Decimal, InvalidOperation
+        try:
+            mes = int(request.data.get("mes"))
+            anio = int(request.data.get("anio"))
+            porcentaje = Decimal(str(request.data.get("porcentaje", compensaciones.PORCENTAJE_STAFF)))
+            if not (1 <= mes <= 12):
+                raise ValueError("El mes debe estar entre 1 y 12")
+            if not (0 < porcentaje <= 1):
+                raise ValueError("El porcentaje debe estar entre 0 y 1")
+        except (ValueError, TypeError, InvalidOperation) as e:
+            return Response({"error": f"Parámetros inválidos: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(compensaciones.liquidar(mes, anio, porcentaje))
+
+
+# =====================================================
+#        DASHBOARD
+# =====================================================
+class DashboardView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        """
+        Resumen del panel de inicio: usuarios por rol, socios por estado,
+        facturado vs. cobrado del período (?mes=&anio=, por defecto el actual)
+        y próximas actividades. Cacheado por poco tiempo si la caché de la API
+        está activa (ver dashboard.py).
+        """
+        from django.utils import timezone
+        hoy = timezone.localdate()
+        try:
+            mes = int(request.query_params.get("mes", hoy.month))
+            anio = int(request.query_params.get("anio", hoy.year))
+            if not (1 <= mes <= 12):
+                raise ValueError("El mes debe estar entre 1 y 12")
+        except (ValueError, TypeError) as e:
+            return Response({"error": f"Parámetros inválidos: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumen_dashboard(mes, anio))
 
 
 # =====================================================
@@ -482,6 +918,8 @@ class CompensacionStaffViewSet(viewsets.ModelViewSet):
 # =====================================================
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    # Sin autenticación: una cookie vencida o inválida no debe impedir el login ni el logout
+    authentication_classes = []
     
     def post(self, request):
         # Asegurar que se envíe el token CSRF
@@ -498,6 +936,11 @@ class LoginView(APIView):
             return Response({'error': 'Credenciales inválidas'}, status=401)
         
         refresh = RefreshToken.for_user(user)
+        # Roles y estado como claims: el access token los hereda y CookieJWTAuthentication
+        # arma el usuario sin consultar la base. Se actualizan en el próximo login
+        # (un refresh conserva los del token original).
+        refresh['roles'] = sorted(user.roles)
+        refresh['estado'] = user.estado
         access_token = refresh.access_token
         
         response = Response({
@@ -532,6 +975,8 @@ class LoginView(APIView):
 
 class LogoutView(APIView):
     permission_classes = [AllowAny]
+    # Sin autenticación: una cookie vencida o inválida no debe impedir el login ni el logout
+    authentication_classes = []
     
     def post(self, request):
         response = Response({'message': 'Logout exitoso'})
@@ -564,22 +1009,19 @@ class LogoutView(APIView):
 
 class UserProfileView(APIView):
     permission_classes = [AllowAny]
-    
+    authentication_classes = []
+
     def get(self, request):
         # Asegurar que se envíe el token CSRF
         get_token(request)
         
         # Verificar si hay token en las cookies
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
+        if not request.COOKIES.get('access_token'):
             return Response({'error': 'No autenticado'}, status=401)
         
-        # Verificar el token manualmente
-        from rest_framework_simplejwt.tokens import AccessToken
+        # El token se valida sin consultar la base; la fila completa sale del LRU de usuarios recientes
         try:
-            token = AccessToken(access_token)
-            user_id = token['user_id']
-            user = Usuario.objects.get(id=user_id)
-            return Response(UsuarioSerializer(user).data)
-        except:
+            user, _ = CookieJWTAuthentication().authenticate(request)
+            return Response(UsuarioSerializer(user.usuario).data)
+        except (APIException, Usuario.DoesNotExist):
             return Response({'error': 'Token inválido'}, status=401)
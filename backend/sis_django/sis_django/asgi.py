@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sis_django.settings')
+# Las vistas async de los listados (sis_app/lectura_async.py) sólo convienen bajo ASGI
+os.environ.setdefault('SIS_LECTURA_ASYNC', '1')
 
 application = get_asgi_application()
@@ -4,6 +4,7 @@ Django settings for sis_django project.
 Generated by 'django-admin startproject' using Django 5.2.7.
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'sis_app.instrumentacion.InstrumentacionMiddleware',  # Métricas por request (SQL, tiempos)
 ]
 
 ROOT_URLCONF = 'sis_django.urls'
@@ -79,6 +81,15 @@ DATABASES = {
     }
 }
 
+# Alternativa sin Docker (pruebas de carga, benchmarks): SIS_DB=sqlite
+if os.environ.get('SIS_DB') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SIS_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
 # Validadores de contraseña
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -105,7 +116,8 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT (cookie o encabezado) con el usuario armado desde los claims, sin consulta por request
+        'sis_app.autenticacion.CookieJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # Usa sesiones de Django
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -145,8 +157,17 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# LRU por proceso de usuarios completos para CookieJWTAuthentication (TAMANIO 0 lo desactiva)
+AUTENTICACION_CACHE_USUARIOS = {
+    'TAMANIO': 256,
+    'TTL': 60,  # segundos
+}
+
 # 🔐 Configuración de CORS y CSRF
 CORS_ALLOW_ALL_ORIGINS = True  # 🔧 Permitir todo durante desarrollo
+# Content-Range: partes de la subida de comprobantes (ver sis_app/subida_comprobantes.py)
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'content-range')
 # En producción reemplazar por:
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:5173",
@@ -171,3 +192,81 @@ CSRF_COOKIE_SECURE = False  # Cambiar a True en producción con HTTPS
 import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Comprobantes de pago, su subida por partes (ver sis_app/subida_comprobantes.py) y su envío.
+# Las partes se guardan fuera de MEDIA_ROOT hasta que se completa la subida
+COMPROBANTES = {
+    'TAMANIO_MAXIMO': 3 * 1024 * 1024,  # bytes
+    'TAMANIO_PARTE': 512 * 1024,        # sugerido a los clientes
+    'DIRECTORIO_SUBIDAS': os.path.join(BASE_DIR, 'subidas'),
+    'VENCIMIENTO': 24 * 3600,           # segundos sin partes nuevas hasta borrar la subida
+    # Envío de los archivos a cargo del servidor web (ver sis_app/almacenamiento.py):
+    # 'x-accel-redirect' (nginx), 'x-sendfile' (Apache, lighttpd) o vacío (los manda Django)
+    'SENDFILE': os.environ.get('SIS_SENDFILE') or None,
+    'SENDFILE_PREFIJO': os.environ.get('SIS_SENDFILE_PREFIJO', '/protegido/'),
+}
+
+# 🗄️ Caché: memoria local por proceso por defecto. Con varios workers conviene
+# un backend compartido, p. ej. SIS_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# y SIS_CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHE_BACKEND = os.environ.get('SIS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('SIS_CACHE_LOCATION', 'sis'),
+        'TIMEOUT': 300,
+    }
+}
+
+# Caché de respuestas y agregados de la API (ver sis_app/cache_api.py). Las
+# generaciones que la invalidan viven en la misma caché: con memoria local, un
+# cambio atendido por un worker no descarta lo que guardaron los demás. Por eso
+# sólo se activa sola con un backend compartido; con memoria local hay que pedirla
+# con SIS_CACHE_API=1, y sólo es correcta con un único proceso.
+CACHE_API = {
+    'ACTIVO': os.environ.get('SIS_CACHE_API', '0' if CACHE_BACKEND.endswith('LocMemCache') else '1') == '1',
+    'ALIAS': 'default',
+    'TTL': 300,  # segundos
+}
+
+# Listados de cuotas y actividades con vistas async (ver sis_app/lectura_async.py).
+# Sólo asgi.py lo prende: bajo WSGI (incluido runserver) cada vista async correría
+# en un event loop propio por request
+LECTURA_ASYNC = os.environ.get('SIS_LECTURA_ASYNC', '0') == '1'
+
+# 📊 Instrumentación por request (ver sis_app/instrumentacion.py)
+INSTRUMENTACION = {
+    # Fracción de requests medidos en detalle (SQL, serialización, logs)
+    'MUESTREO': float(os.environ.get('SIS_METRICAS_MUESTREO', '0.1')),
+    'SERVER_TIMING': True,
+    'LOG': True,
+    'UMBRAL_N_MAS_1': 5,
+    # /metrics exige "Authorization: Bearer <SIS_METRICAS_TOKEN>" (en Prometheus,
+    # `authorization: {credentials: ...}` del scrape). Sin token, /metrics responde 403.
+    # Detrás de nginx todos los requests llegan desde 127.0.0.1, así que
+    # METRICAS_IPS sola no alcanza: es sólo una restricción adicional.
+    'METRICAS_TOKEN': os.environ.get('SIS_METRICAS_TOKEN', ''),
+    'METRICAS_IPS': None,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_true': {'()': 'django.utils.log.RequireDebugTrue'},
+    },
+    'handlers': {
+        # En producción (DEBUG=False) reemplazar por un handler hacia el colector de logs
+        'metricas': {
+            'class': 'logging.StreamHandler',
+            'filters': ['require_debug_true'],
+        },
+    },
+    'loggers': {
+        'sis_app.instrumentacion': {
+            'handlers': ['metricas'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -3,9 +3,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from sis_app.instrumentacion import metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include("sis_app.urls")),   # App principal
+    path('metrics', metricas, name='metricas'),   # Métricas para Prometheus (con token, ver INSTRUMENTACION)
 ]
 
 # Servir archivos media en desarrollo
@@ -68,6 +68,7 @@ const PaymentModal = ({ isOpen, onClose, members = [], onSave }) => {
       case 'pagada': return 'bg-green-100 text-green-800';
       case 'al_dia': return 'bg-green-100 text-green-800';
       case 'atrasada': return 'bg-red-100 text-red-800';
+      case 'pendiente': return 'bg-gray-100 text-gray-800';
       case 'pendiente_revision': return 'bg-blue-100 text-blue-800';
       default: return 'bg-gray-100 text-gray-800';
     }
@@ -78,13 +79,14 @@ const PaymentModal = ({ isOpen, onClose, members = [], onSave }) => {
       case 'pagada': return 'Pagada';
       case 'al_dia': return 'Al Día';
       case 'atrasada': return 'Atrasada';
+      case 'pendiente': return 'Por vencer';
       case 'pendiente_revision': return 'Pendiente Revisión';
       default: return estado;
     }
   };
   
   const puedeSeleccionarCuota = (estado) => {
-    return estado === 'atrasada' || estado === 'pendiente_revision';
+    return estado === 'atrasada' || estado === 'pendiente' || estado === 'pendiente_revision';
   };
 
   return (
@@ -285,6 +285,7 @@ const PaymentsPanel = ({
               <option value="Pagado">Pagado</option>
               <option value="Pendiente">Pendiente</option>
               <option value="Atrasado">Atrasado</option>
+              <option value="Por vencer">Por vencer</option>
             </select>
 
             <select
@@ -371,6 +372,7 @@ const PaymentsPanel = ({
                     <span className={`inline-flex px-2 py-1 text-xs font-semibold rounded-full ${
                       payment.status === 'Pagado' ? 'bg-green-100 text-green-800' :
                       payment.status === 'Pendiente' ? 'bg-yellow-100 text-yellow-800' :
+                      payment.status === 'Por vencer' ? 'bg-gray-100 text-gray-800' :
                       'bg-red-100 text-red-800'
                     }`}>
                       {payment.status}
@@ -415,7 +417,7 @@ const PaymentsPanel = ({
                               </button>
                             </>
                           )}
-                          {payment.status === 'Atrasado' && !payment.comprobanteUrl && (
+                          {(payment.status === 'Atrasado' || payment.status === 'Por vencer') && !payment.comprobanteUrl && (
                             <span className="text-gray-400 text-xs">Sin comprobante</span>
                           )}
                           {payment.status === 'Pagado' && (
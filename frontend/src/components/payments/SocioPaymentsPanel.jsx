@@ -59,10 +59,11 @@ const SocioPaymentsPanel = ({ cuotas = [], onUploadComprobante }) => {
 
   // Calcular totales
   const totalPagado = cuotas.filter(c => c.estado === 'al_dia').length;
-  const totalPendiente = cuotas.filter(c => c.estado === 'atrasada' || c.estado === 'pendiente_revision').length;
+  const adeudada = (c) => ['atrasada', 'pendiente', 'pendiente_revision'].includes(c.estado);
+  const totalPendiente = cuotas.filter(adeudada).length;
   const montoTotal = cuotas.reduce((sum, c) => sum + parseFloat(c.valor_base || 0), 0);
   const montoPendiente = cuotas
-    .filter(c => c.estado === 'atrasada' || c.estado === 'pendiente_revision')
+    .filter(adeudada)
     .reduce((sum, c) => sum + parseFloat(c.valor_base || 0), 0);
 
   return (
@@ -176,17 +177,21 @@ const SocioPaymentsPanel = ({ cuotas = [], onUploadComprobante }) => {
                           ? 'bg-green-100 text-green-800' 
                           : cuota.estado === 'pendiente_revision'
                           ? 'bg-yellow-100 text-yellow-800'
+                          : cuota.estado === 'pendiente'
+                          ? 'bg-gray-100 text-gray-800'
                           : 'bg-red-100 text-red-800'
                       }`}>
                         {cuota.estado === 'al_dia' 
                           ? 'Pagada' 
                           : cuota.estado === 'pendiente_revision'
                           ? 'Pendiente Revisión'
+                          : cuota.estado === 'pendiente'
+                          ? 'Por vencer'
                           : 'Pendiente'}
                       </span>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
-                      {cuota.estado === 'atrasada' ? (
+                      {cuota.estado === 'atrasada' || cuota.estado === 'pendiente' ? (
                         <button
                           onClick={() => handleUploadClick(cuota)}
                           className="text-blue-600 hover:text-blue-800 text-sm font-medium"
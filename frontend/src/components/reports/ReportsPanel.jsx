@@ -1,6 +1,15 @@
-import React from 'react';
+import React, { useState } from 'react';
+import { descargarReporte } from '../../services/reportes';
+
+const REPORTES = [
+  { id: 'cuotas', titulo: 'Cuotas del período', conPeriodo: true },
+  { id: 'morosidad', titulo: 'Morosidad' },
+  { id: 'inscripciones', titulo: 'Inscripciones por actividad' },
+  { id: 'compensaciones', titulo: 'Compensaciones del staff', conPeriodo: true },
+];
 
 const ReportsPanel = ({ members, classes }) => {
+  const [periodo, setPeriodo] = useState(new Date().toISOString().slice(0, 7));
   const activeMembers = members.filter(m => m.status === 'Activo').length;
   const totalRevenue = members.length * 50;
   const classUtilization = classes.reduce((acc, c) => acc + (c.enrolled / c.capacity), 0) / classes.length * 100;
@@ -68,6 +77,36 @@ const ReportsPanel = ({ members, classes }) => {
           </div>
         </div>
       </div>
+
+      <div className="bg-white rounded-lg border border-gray-200 p-6 mt-6">
+        <div className="flex justify-between items-center mb-4">
+          <h3 className="text-lg font-semibold">Exportar</h3>
+          <input
+            type="month"
+            value={periodo}
+            onChange={(e) => setPeriodo(e.target.value)}
+            className="border border-gray-300 rounded px-2 py-1 text-sm"
+          />
+        </div>
+        <div className="space-y-3">
+          {REPORTES.map((reporte) => (
+            <div key={reporte.id} className="flex justify-between items-center">
+              <span>{reporte.titulo}</span>
+              <div className="space-x-2">
+                {['csv', 'xlsx'].map((formato) => (
+                  <button
+                    key={formato}
+                    onClick={() => descargarReporte(reporte.id, reporte.conPeriodo && periodo ? { periodo } : {}, formato)}
+                    className="px-3 py-1 text-sm rounded border border-blue-300 text-blue-700 hover:bg-blue-50"
+                  >
+                    {formato.toUpperCase()}
+                  </button>
+                ))}
+              </div>
+            </div>
+          ))}
+        </div>
+      </div>
     </div>
   );
 };
@@ -1,4 +1,5 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
+import { listarInscriptos } from '../../services/actividades';
 
 const StaffActivityList = ({ myClasses }) => {
   const [filterStatus, setFilterStatus] = useState('todas');
@@ -6,10 +7,39 @@ const StaffActivityList = ({ myClasses }) => {
   const [sortBy, setSortBy] = useState('date');
   const [sortOrder, setSortOrder] = useState('desc');
 
-  // Obtener socios inscriptos reales para cada actividad
+  // Socios inscriptos por actividad: { [id]: { items, next, cargando } }.
+  // Se piden paginados al backend, sólo para las actividades que se muestran.
+  const [rosters, setRosters] = useState({});
+
+  const cargarInscriptos = async (activityId, url = null) => {
+    setRosters(prev => ({ ...prev, [activityId]: { items: [], next: null, ...prev[activityId], cargando: true } }));
+    try {
+      const data = await listarInscriptos(activityId, {}, url);
+      setRosters(prev => ({
+        ...prev,
+        [activityId]: {
+          items: [...(url ? prev[activityId]?.items || [] : []), ...(data.results || [])],
+          next: data.next,
+          cargando: false,
+        },
+      }));
+    } catch (e) {
+      console.error(e);
+      setRosters(prev => ({ ...prev, [activityId]: { ...prev[activityId], cargando: false } }));
+    }
+  };
+
+  const idsActividades = myClasses.map(c => c.id).join(',');
+  useEffect(() => {
+    myClasses.forEach(c => {
+      if (!rosters[c.id]) cargarInscriptos(c.id);
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [idsActividades]);
+
+  // Obtener socios inscriptos (ya cargados) de una actividad
   const getEnrolledMembers = (activity) => {
-    // Usar los datos reales que vienen del backend
-    return activity.inscriptosDetalle || [];
+    return rosters[activity.id]?.items || [];
   };
 
   // Filtrar y ordenar clases
@@ -43,8 +73,8 @@ const StaffActivityList = ({ myClasses }) => {
           bValue = new Date(b.date);
           break;
         case 'enrolled':
-          aValue = getEnrolledMembers(a.id).length;
-          bValue = getEnrolledMembers(b.id).length;
+          aValue = a.enrolled || 0;
+          bValue = b.enrolled || 0;
           break;
         default:
           aValue = a[sortBy];
@@ -65,7 +95,7 @@ const StaffActivityList = ({ myClasses }) => {
 
   // Calcular métricas
   const totalClasses = filteredClasses.length;
-  const totalEnrollments = filteredClasses.reduce((sum, cls) => sum + (cls.inscriptosDetalle || []).length, 0);
+  const totalEnrollments = filteredClasses.reduce((sum, cls) => sum + (cls.enrolled || 0), 0);
   const averageEnrollment = totalClasses > 0 ? (totalEnrollments / totalClasses).toFixed(1) : 0;
 
   return (
@@ -161,7 +191,8 @@ const StaffActivityList = ({ myClasses }) => {
         {filteredClasses.length > 0 ? (
           filteredClasses.map((classItem) => {
             const enrolledMembers = getEnrolledMembers(classItem);
-            const enrollmentCount = enrolledMembers.length;
+            const enrollmentCount = classItem.enrolled || 0;
+            const roster = rosters[classItem.id];
             
             return (
               <div key={classItem.id} className="bg-white rounded-lg border border-gray-200 overflow-hidden shadow-sm">
@@ -256,6 +287,15 @@ const StaffActivityList = ({ myClasses }) => {
                           </div>
                         </div>
                       ))}
+                      {roster?.next && (
+                        <button
+                          onClick={() => cargarInscriptos(classItem.id, roster.next)}
+                          disabled={roster.cargando}
+                          className="px-3 py-2 text-sm font-medium text-blue-600 bg-blue-50 rounded-lg hover:bg-blue-100 transition-colors disabled:opacity-50"
+                        >
+                          {roster.cargando ? 'Cargando...' : 'Ver más inscriptos'}
+                        </button>
+                      )}
                     </div>
                   ) : (
                     <div className="text-center py-8">
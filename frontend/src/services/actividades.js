@@ -17,3 +17,12 @@ export async function actualizarActividad(id, payload) {
 export async function eliminarActividad(id) {
   return api.delete(`/actividades/${id}/`);
 }
+
+// Socios inscriptos de una actividad, paginados por cursor: { next, previous, results }.
+// params: { buscar, page_size }. Para la página siguiente, pasar la URL `next`.
+export async function listarInscriptos(actividadId, params = {}, url = null) {
+  const { data } = url
+    ? await api.get(url)
+    : await api.get(`/actividades/${actividadId}/inscriptos/`, { params });
+  return data;
+}
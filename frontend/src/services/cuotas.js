@@ -1,9 +1,16 @@
 import api from "./api";
 
 // Listar cuotas con filtros opcionales
+// Se recorre el listado por cursor (páginas de 500) en lugar de pedir toda la tabla de una vez
 export async function listarCuotas(params = {}) {
-  const { data } = await api.get("/cuotas/", { params });
-  return Array.isArray(data) ? data : (data.results ?? []);
+  const cuotas = [];
+  let { data } = await api.get("/cuotas/", { params: { page_size: 500, ...params } });
+  while (!Array.isArray(data)) {
+    cuotas.push(...(data.results ?? []));
+    if (!data.next) return cuotas;
+    ({ data } = await api.get(data.next));
+  }
+  return data;
 }
 
 // Obtener cuotas por socio
@@ -18,17 +25,38 @@ export async function registrarPagoCuota(cuotaId, fechaPago = null) {
   });
 }
 
-// Subir comprobante de pago (nueva función)
-export async function subirComprobantePago(cuotaId, file) {
-  const formData = new FormData();
-  formData.append('comprobante', file);
-  formData.append('cuota_id', cuotaId);
-  
-  return api.post(`/cuotas/${cuotaId}/subir_comprobante/`, formData, {
-    headers: {
-      'Content-Type': 'multipart/form-data',
-    },
+// Subir comprobante de pago por partes (ver sis_app/subida_comprobantes.py).
+// Si se corta la conexión se reintenta la parte; si el servidor ya tenía más
+// bytes responde 409 con su offset y se sigue desde ahí.
+export async function subirComprobantePago(cuotaId, file, reintentos = 5) {
+  const { data: subida } = await api.post(`/cuotas/${cuotaId}/subidas/`, {
+    nombre: file.name,
+    tamanio: file.size,
   });
+  const url = `/cuotas/${cuotaId}/subidas/${subida.id}/`;
+  let offset = subida.offset;
+  let fallos = 0;
+  while (offset < file.size) {
+    const fin = Math.min(offset + subida.tamanio_parte, file.size);
+    try {
+      ({ data: { offset } } = await api.put(url, file.slice(offset, fin), {
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'Content-Range': `bytes ${offset}-${fin - 1}/${file.size}`,
+        },
+      }));
+      fallos = 0;
+    } catch (error) {
+      if (error.response?.status === 409) {
+        offset = error.response.data.offset;
+        continue;
+      }
+      // Los rechazos del servidor (tipo o tamaño de archivo) no se reintentan
+      if (error.response || ++fallos > reintentos) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * fallos));
+    }
+  }
+  return api.post(`${url}finalizar/`);
 }
 
 // Obtener cuotas atrasadas
@@ -46,13 +74,49 @@ export async function rechazarPagoCuota(cuotaId) {
   return api.post(`/cuotas/${cuotaId}/rechazar_pago/`);
 }
 
+// Cola de comprobantes pendientes de revisión, paginada por cursor (Admin)
+// Para la página siguiente, pasar el `next` de la respuesta anterior como cursorUrl.
+export async function obtenerColaRevision(cursorUrl = null, pageSize = 50) {
+  if (cursorUrl) return api.get(cursorUrl);
+  return api.get('/cuotas/revision/', { params: { page_size: pageSize } });
+}
+
+// Aprobar en bloque los comprobantes de varias cuotas (Admin)
+// Responde { procesadas, resultados: [{ id, resultado: 'ok' | 'omitida' | 'no_encontrada' }] }
+export async function aprobarPagosCuotas(ids) {
+  return api.post('/cuotas/aprobar_pagos/', { ids });
+}
+
+// Rechazar en bloque los comprobantes de varias cuotas (Admin)
+export async function rechazarPagosCuotas(ids) {
+  return api.post('/cuotas/rechazar_pagos/', { ids });
+}
+
+// Consultar el estado de una generación de cuotas (Admin)
+export async function obtenerEstadoGeneracion(jobId) {
+  return api.get(`/cuotas/generaciones/${jobId}/`);
+}
+
 // Generar cuotas para un período (Admin)
-export async function generarCuotas(mes, anio, valorBase, diaVencimiento = 10) {
-  return api.post('/cuotas/generar_cuotas/', {
+// El backend encola la generación (202) y acá se consulta su estado hasta que termina.
+export async function generarCuotas(mes, anio, valorBase, diaVencimiento = 10, intervaloMs = 1000) {
+  const response = await api.post('/cuotas/generar_cuotas/', {
     mes,
     anio,
     valor_base: valorBase,
     dia_vencimiento: diaVencimiento
   });
-}
 
+  let job = response.data;
+  while (job.estado === 'pendiente' || job.estado === 'en_proceso') {
+    await new Promise((resolve) => setTimeout(resolve, intervaloMs));
+    ({ data: job } = await obtenerEstadoGeneracion(job.id));
+  }
+
+  if (job.estado === 'error') {
+    const error = new Error(job.error);
+    error.response = { data: { error: `Error al generar cuotas: ${job.error}` } };
+    throw error;
+  }
+  return { ...response, data: job };
+}
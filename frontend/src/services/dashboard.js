@@ -1,12 +1,15 @@
-import { resumenRoles } from "./usuarios";
+import api from "./api";
 
-export async function getDashboardSummary() {
-  const roles = await resumenRoles();
+// Resumen del panel de inicio en una sola llamada (roles, cuotas del mes y próximas actividades)
+export async function getDashboardSummary(params = {}) {
+  const { data } = await api.get("/dashboard/resumen/", { params });
   return {
-    totalSocios: roles.socios,
-    miembrosStaff: roles.staff,
-    totalAdmins: roles.admin,
-    ingresosMensuales: 0,          
-    proximasActividades: [],       
+    totalSocios: data.roles.socios,
+    miembrosStaff: data.roles.staff,
+    totalAdmins: data.roles.admin,
+    sociosPorEstado: data.socios_por_estado,
+    ingresosMensuales: Number(data.cuotas.cobrado),
+    facturadoMensual: Number(data.cuotas.facturado),
+    proximasActividades: data.proximas_actividades,
   };
 }
@@ -0,0 +1,21 @@
+import api from "./api";
+
+// Rutas de exportación de cada reporte (ver sis_app/exportacion.py)
+export const REPORTES = {
+  cuotas: "/cuotas/exportar/",
+  morosidad: "/cuotas/atrasadas/exportar/",
+  inscripciones: "/inscripciones/exportar/",
+  compensaciones: "/compensaciones/exportar/",
+};
+
+// Descargar un reporte en CSV o XLSX con los mismos filtros que el listado
+// (p. ej. { periodo: "2025-03" }). El navegador guarda la respuesta a medida
+// que llega, sin armar el archivo en memoria como haría un Blob de axios.
+export function descargarReporte(reporte, params = {}, formato = "csv") {
+  const link = document.createElement("a");
+  link.href = api.getUri({ url: REPORTES[reporte], params: { ...params, formato } });
+  link.download = `${reporte}.${formato}`;
+  document.body.appendChild(link);
+  link.click();
+  link.remove();
+}